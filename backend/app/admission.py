@@ -0,0 +1,157 @@
+# app/admission.py
+"""
+Admission control for generation and grading in the offload workers.
+
+Without it, a classroom's worth of /answer requests all land in the
+ProcessPool's unbounded queue, each behind every SymPy job before it, and
+they time out together. Each slow-path kind gets a Gate instead:
+- at most `limit` of the kind's jobs run in the workers at once
+- at most `queue` more wait for a slot, in arrival order
+- a request whose expected wait (jobs ahead of it x the kind's recent job
+  time / limit) is past the deadline is turned away at once, and one that
+  queues gives up when the deadline passes
+
+A turned-away request raises Overloaded, and the caller degrades:
+- problem endpoints: a ready pooled problem at the nearest other difficulty
+  (ProblemPool.take with a gate)
+- grading: the problem's numeric_check(), which needs no SymPy
+  (Admission.grade)
+- otherwise a 503 with Retry-After (the handler in main.py)
+
+Fast-path kinds, bank draws, pooled problems and quick_check() hits never
+reach a gate. CALCDUO_ADMIT=0 turns admission off (gate() returns None),
+for comparisons.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+
+from app import offload
+from app.calcduo.registry import get_kind, kind_of
+
+ADMIT = os.environ.get("CALCDUO_ADMIT", "1") != "0"
+ADMIT_LIMIT = int(os.environ.get("CALCDUO_ADMIT_LIMIT", "0")) or offload.WORKERS  # per kind
+ADMIT_QUEUE = int(os.environ.get("CALCDUO_ADMIT_QUEUE", "0")) or 4 * ADMIT_LIMIT
+ADMIT_DEADLINE_MS = float(os.environ.get("CALCDUO_ADMIT_DEADLINE_MS", "1000"))
+
+JOB_TIME_WEIGHT = 0.2  # EWMA weight of the newest job time
+
+
+class Overloaded(Exception):
+    """No worker slot within the deadline; retry_after is a hint in whole seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"overloaded, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class Gate:
+    """Bounded concurrency plus a bounded, deadline-limited queue; use as `async with gate.slot():`."""
+
+    def __init__(self, limit: int = ADMIT_LIMIT, queue: int = ADMIT_QUEUE,
+                 deadline_ms: float = ADMIT_DEADLINE_MS):
+        self.limit = max(1, limit)
+        self.queue = queue
+        self.deadline = deadline_ms / 1000.0
+        self.active = 0
+        self.job_time = 0.0   # EWMA of seconds from slot to release
+        self._waiters = deque()  # futures, first come first served
+        self.counts = Counter()  # admitted / queued / shed / expired
+
+    def expected_wait(self) -> float:
+        return (len(self._waiters) + 1) * self.job_time / self.limit
+
+    def retry_after(self) -> int:
+        backlog = (self.active + len(self._waiters)) * self.job_time / self.limit
+        return max(1, math.ceil(backlog))
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the kind's worker slots; raises Overloaded if none comes up in time."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+        else:
+            if len(self._waiters) >= self.queue or self.expected_wait() > self.deadline:
+                self.counts["shed"] += 1
+                raise Overloaded(self.retry_after())
+            await self._wait()
+        self.counts["admitted"] += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.job_time += JOB_TIME_WEIGHT * (elapsed - self.job_time) if self.job_time else elapsed
+            self._release()
+
+    async def _wait(self):
+        self.counts["queued"] += 1
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await asyncio.wait_for(fut, self.deadline)
+        except BaseException as e:
+            if fut.done() and not fut.cancelled():
+                self._release()  # handed a slot just as we gave up: pass it on
+            else:
+                try:
+                    self._waiters.remove(fut)
+                except ValueError:
+                    pass
+            if isinstance(e, TimeoutError):
+                self.counts["expired"] += 1
+                raise Overloaded(self.retry_after()) from None
+            raise
+
+    def _release(self):
+        while self._waiters:  # hand the slot straight to the next live waiter
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active -= 1
+
+    def report(self) -> dict:
+        return {"limit": self.limit, "active": self.active, "queued": len(self._waiters),
+                "job_ms": round(self.job_time * 1e3, 1), **self.counts}
+
+
+class Admission:
+    def __init__(self, limit: int = ADMIT_LIMIT, queue: int = ADMIT_QUEUE,
+                 deadline_ms: float = ADMIT_DEADLINE_MS, enabled: bool = ADMIT):
+        self.limit = limit
+        self.queue = queue
+        self.deadline_ms = deadline_ms
+        self.enabled = enabled
+        self._gates = {}  # kind_key -> Gate
+        self.degraded = Counter()  # answers graded by numeric_check (ProblemPool counts its stand-ins)
+
+    def gate(self, kind_key: str):
+        """The kind's Gate; None for fast-path kinds or with admission off."""
+        if not self.enabled:
+            return None
+        gate = self._gates.get(kind_key)
+        if gate is None:
+            if get_kind(kind_key).fast_path:
+                return None
+            gate = self._gates[kind_key] = Gate(self.limit, self.queue, self.deadline_ms)
+        return gate
+
+    async def grade(self, problem, answer: str):
+        """offload.grade through the kind's gate; numeric_check() if turned away, else Overloaded."""
+        try:
+            return await offload.grade(problem, answer, self.gate(kind_of(problem).key))
+        except Overloaded:
+            result = problem.numeric_check(answer)
+            if result is None:
+                raise
+            self.degraded["numeric"] += 1
+            return result
+
+    def report(self) -> dict:
+        return {"enabled": self.enabled, "deadline_ms": self.deadline_ms,
+                "degraded": dict(self.degraded),
+                "kinds": {k: g.report() for k, g in self._gates.items()}}
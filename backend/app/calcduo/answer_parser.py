@@ -0,0 +1,263 @@
+# calcduo/answer_parser.py
+"""
+Parser for typed symbolic answers (the deriv_form kind and the tutor).
+
+A Pratt parser over a regex tokenizer. It builds SymPy expressions as it
+goes, in one pass, with no Python tokenize step and no eval. The grammar:
+
+  numbers     3   2.5   .5   1e-3
+  names       x, e (E), pi
+  functions   sin cos tan sec csc cot exp ln log sqrt   (log(x, b) takes a base)
+  operators   + - * / and ^ or ** (right-associative, binds tighter than unary -)
+  implicit *  2x   3sin(x)   x(x+1)   (x+1)(x-1)   (x+1)2   xe^x   2pi x
+
+Implicit multiplication has the same precedence as * and /, so 1/2x is x/2.
+A number is only multiplied implicitly after ')': "x2" and "2 3" are
+errors rather than products, since they are rarely what was meant.
+
+A function can be applied without parentheses. The argument runs up to the
+next operator or function name, so "sin 2x" is sin(2x) and
+"2sin x cos x" is 2 sin(x) cos(x). "sin^2(x)" and "sin^2 x" mean sin(x)^2.
+
+Names are matched longest-first against the known names, so "sinx" is
+sin(x) and "pix" is pi*x. Any other letter is an error, so stray symbols
+are reported rather than graded. Errors are AnswerSyntaxError, which
+carries the 0-based position of the offending character. Answers longer
+than MAX_LENGTH characters, or nested deeper than MAX_DEPTH (parentheses,
+signs, function arguments, exponents), are errors too: the parser recurses
+once per level. So are numbers with more than MAX_EXPONENT exponent
+digits: making 1e9999999 exact, or a SymPy Float, takes seconds to minutes.
+
+The parser only combines values with Python operators (+ - * / ** and unary
+-). What it builds is set by an Atoms: how numbers, names and functions
+become values. SYMPY, the default, gives SymPy expressions; calcduo.basis
+builds exact coefficient maps through the same grammar.
+"""
+import re
+
+import sympy as sp
+
+x = sp.symbols("x")
+
+CONSTANTS = {"x": x, "e": sp.E, "E": sp.E, "pi": sp.pi}
+FUNCTIONS = {
+    "sin": sp.sin, "cos": sp.cos, "tan": sp.tan,
+    "sec": sp.sec, "csc": sp.csc, "cot": sp.cot,
+    "exp": sp.exp, "ln": sp.log, "log": sp.log, "sqrt": sp.sqrt,
+}
+_MAX_ARGS = {"log": 2}  # everything else takes exactly one
+MAX_LENGTH = 500
+MAX_DEPTH = 64
+MAX_EXPONENT = 3  # digits: 1e999 is a number, 1e1000 an error
+
+
+class Atoms:
+    """Leaf constructors for the parser: number(text), and values for every constant and function name."""
+    __slots__ = ("number", "constants", "functions")
+
+    def __init__(self, number, constants, functions):
+        self.number = number
+        self.constants = constants
+        self.functions = functions
+
+
+def _sympy_number(text: str):
+    return sp.Integer(text) if text.isdigit() else sp.Float(text)
+
+
+SYMPY = Atoms(_sympy_number, CONSTANTS, FUNCTIONS)
+
+
+# Unicode look-alikes, one character for one so positions still match the input
+_TRANSLATE = str.maketrans({"−": "-", "–": "-", "—": "-", "×": "*", "·": "*"})
+
+_NAME = re.compile("|".join(sorted(list(CONSTANTS) + list(FUNCTIONS), key=len, reverse=True)))
+_TOKEN = re.compile(
+    r"\s*(?:"
+    r"(?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)"
+    r"|(?P<word>[A-Za-z]+)"
+    r"|(?P<op>\*\*|[-+*/^(),])"
+    r")?"
+)
+
+# binding powers
+_BP_SUM, _BP_PRODUCT, _BP_UNARY, _BP_POWER = 10, 20, 30, 40
+_BINARY = {"+": _BP_SUM, "-": _BP_SUM, "*": _BP_PRODUCT, "/": _BP_PRODUCT,
+           "^": _BP_POWER, "**": _BP_POWER}
+
+
+class AnswerSyntaxError(ValueError):
+    """An answer that doesn't parse; `pos` is the 0-based offset of the problem."""
+
+    def __init__(self, message: str, pos: int):
+        super().__init__(f"{message} (at character {pos + 1})")
+        self.message = message
+        self.pos = pos
+
+
+def _split_word(word: str, start: int, tokens):
+    """Letters run together ("xsin", "pix") split into known names, longest first."""
+    i = 0
+    while i < len(word):
+        m = _NAME.match(word, i)
+        if m is None:
+            raise AnswerSyntaxError(f"unknown name {word!r}", start)
+        tokens.append(("name", m.group(0), start + i))
+        i = m.end()
+
+
+def tokenize(text: str):
+    """[(kind, text, pos), ...] ending with ("end", "", len(text)); kind is num / name / op."""
+    tokens = []
+    pos, n = 0, len(text)
+    while True:
+        m = _TOKEN.match(text, pos)
+        kind = m.lastgroup
+        if kind is None:
+            if m.end() >= n:
+                tokens.append(("end", "", n))
+                return tokens
+            raise AnswerSyntaxError(f"unexpected {text[m.end()]!r}", m.end())
+        if kind == "word":
+            _split_word(m.group(kind), m.start(kind), tokens)
+        else:
+            tokens.append((kind, m.group(kind), m.start(kind)))
+        pos = m.end()
+
+
+class _Parser:
+    __slots__ = ("tokens", "i", "atoms", "depth")
+
+    def __init__(self, tokens, atoms: Atoms):
+        self.tokens = tokens
+        self.i = 0
+        self.atoms = atoms
+        self.depth = 0
+
+    def peek(self):
+        return self.tokens[self.i]
+
+    def take(self):
+        tok = self.tokens[self.i]
+        self.i += 1
+        return tok
+
+    def close(self, opened: int):
+        """Consume the ')' matching the '(' at `opened`."""
+        kind, text, _ = self.take()
+        if kind != "op" or text != ")":
+            raise AnswerSyntaxError("'(' is never closed", opened)
+
+    def _starts_factor(self, after_paren: bool, bare_arg: bool = False) -> bool:
+        """Can the next token begin an implicitly multiplied factor?"""
+        kind, text, _ = self.peek()
+        if kind == "name":
+            return not (bare_arg and text in FUNCTIONS)
+        if kind == "op":
+            return text == "("
+        return kind == "num" and after_paren
+
+    def expr(self, min_bp: int = 0):
+        if self.depth >= MAX_DEPTH:
+            raise AnswerSyntaxError("the answer is nested too deeply", self.peek()[2])
+        self.depth += 1
+        try:
+            return self._expr(min_bp)
+        finally:
+            self.depth -= 1
+
+    def _expr(self, min_bp: int):
+        left = self.prefix()
+        while True:
+            kind, text, pos = self.peek()
+            if kind == "op" and text in _BINARY:
+                bp = _BINARY[text]
+                if bp <= min_bp:
+                    return left
+                self.take()
+                # right-associative power: parse the exponent one notch lower
+                right = self.expr(bp - 1 if bp == _BP_POWER else bp)
+                if text == "+":
+                    left = left + right
+                elif text == "-":
+                    left = left - right
+                elif text == "*":
+                    left = left * right
+                elif text == "/":
+                    left = left / right
+                else:
+                    left = left ** right
+            elif self._starts_factor(self.tokens[self.i - 1][1] == ")"):
+                if _BP_PRODUCT <= min_bp:
+                    return left
+                left = left * self.expr(_BP_PRODUCT)
+            elif kind == "num":
+                raise AnswerSyntaxError(f"missing operator before {text!r}", pos)
+            else:
+                return left
+
+    def prefix(self):
+        kind, text, pos = self.take()
+        if kind == "num":
+            if len(text.lower().partition("e")[2].lstrip("+-")) > MAX_EXPONENT:
+                raise AnswerSyntaxError(f"the exponent of {text!r} is too large", pos)
+            return self.atoms.number(text)
+        if kind == "name":
+            if text in FUNCTIONS:
+                return self.call(text, pos)
+            return self.atoms.constants[text]
+        if text == "-":
+            return -self.expr(_BP_UNARY)
+        if text == "+":
+            return self.expr(_BP_UNARY)
+        if text == "(":
+            inner = self.expr()
+            self.close(pos)
+            return inner
+        if kind == "end":
+            raise AnswerSyntaxError("the answer ends too early", pos)
+        raise AnswerSyntaxError(f"unexpected {text!r}", pos)
+
+    def call(self, name: str, pos: int):
+        power = None
+        kind, text, _ = self.peek()
+        if kind == "op" and text in ("^", "**"):  # sin^2(x)
+            self.take()
+            power = self.expr(_BP_POWER - 1)
+            kind, text, _ = self.peek()
+        if kind == "op" and text == "(":
+            opened = self.take()[2]
+            args = [self.expr()]
+            while self.peek()[1] == ",":
+                self.take()
+                args.append(self.expr())
+            self.close(opened)
+            if len(args) > _MAX_ARGS.get(name, 1):
+                raise AnswerSyntaxError(f"too many arguments for {name}", pos)
+        elif kind in ("num", "name") or text in ("-", "+"):
+            # bare argument: sin 2x, sin x^2; stops at the next operator or function
+            arg = self.expr(_BP_UNARY)
+            while self._starts_factor(self.tokens[self.i - 1][1] == ")", bare_arg=True):
+                arg = arg * self.expr(_BP_UNARY)
+            args = [arg]
+        else:
+            raise AnswerSyntaxError(f"{name} needs an argument", pos)
+        value = self.atoms.functions[name](*args)
+        return value if power is None else value ** power
+
+
+def parse_answer(answer: str, atoms: Atoms = SYMPY):
+    """The SymPy expression (or `atoms`' value) for a typed answer; raises AnswerSyntaxError."""
+    text = (answer or "").translate(_TRANSLATE)
+    if len(text) > MAX_LENGTH:
+        raise AnswerSyntaxError(f"the answer is longer than {MAX_LENGTH} characters", MAX_LENGTH)
+    parser = _Parser(tokenize(text), atoms)
+    if parser.peek()[0] == "end":
+        raise AnswerSyntaxError("empty answer", 0)
+    expr = parser.expr()
+    tok = parser.peek()
+    if tok[0] != "end":
+        if tok[1] == ")":
+            raise AnswerSyntaxError("unmatched ')'", tok[2])
+        raise AnswerSyntaxError(f"unexpected {tok[1]!r}", tok[2])
+    return expr
@@ -0,0 +1,224 @@
+# calcduo/bank.py
+"""
+Prebuilt problem bank in one memory-mapped file.
+
+`python -m app.calcduo.bank build` samples up to N distinct problems per
+(kind, difficulty), SymPy and all, and writes them out once. At runtime the
+file is mmapped read-only. The offset index is a memoryview cast over the
+mapping, so nothing is copied or parsed up front. A draw decodes one
+entry, and its prompt and miss feedback come from the file, so serving a
+symbolic problem needs no SymPy until an answer is graded. Worker processes
+that open the same file share its pages through the OS cache.
+
+Layout (little-endian):
+  header    "CDB1", entry count, bucket-table length
+  buckets   JSON [[kind, difficulty, first entry, count], ...], zero-padded to 8 bytes
+  offsets   (count + 1) uint64, entry start relative to the data section
+  data      entries: <HHHB> payload/prompt/feedback lengths and distractor count,
+            <d> numeric answer (NaN for symbolic kinds), the distractors as <d>,
+            then the codec payload, the prompt and the miss feedback, which
+            states the canonical answer (UTF-8)
+"""
+import argparse
+import json
+import math
+import mmap
+import random
+import struct
+import sys
+
+from .config import BANK_FILE
+from .dedup import problem_key
+from .registry import all_kinds, get_kind
+
+_MAGIC = b"CDB1"
+_HEADER = struct.Struct("<4sII")   # magic, entries, bucket-table bytes
+_ENTRY = struct.Struct("<HHHB")    # payload, prompt, feedback lengths; distractor count
+_VALUE = struct.Struct("<d")
+
+BUILD_ATTEMPTS = 4  # samples per wanted entry before a small space counts as exhausted
+
+
+class BankEntry:
+    """One entry, read straight from the mapping."""
+    __slots__ = ("kind", "difficulty", "payload", "prompt", "feedback", "value", "distractors")
+
+    def __init__(self, kind, difficulty, buf, off):
+        n_payload, n_prompt, n_feedback, n_dist = _ENTRY.unpack_from(buf, off)
+        off += _ENTRY.size
+        (self.value,) = _VALUE.unpack_from(buf, off)
+        off += _VALUE.size
+        self.distractors = struct.unpack_from(f"<{n_dist}d", buf, off)
+        off += 8 * n_dist
+        self.payload = buf[off:off + n_payload]  # memoryview slice: no copy
+        off += n_payload
+        self.prompt = str(buf[off:off + n_prompt], "utf-8")
+        off += n_prompt
+        self.feedback = str(buf[off:off + n_feedback], "utf-8")
+        self.kind = kind
+        self.difficulty = difficulty
+
+    def problem(self):
+        """Decode the problem and seed its prompt and miss feedback from the bank."""
+        problem = self.kind.load(self.payload)
+        problem._prompt = self.prompt
+        problem._miss = (False, self.feedback)
+        return problem
+
+
+class ProblemBank:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = self._view = memoryview(self._mm)
+        magic, count, table_len = _HEADER.unpack_from(buf)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a problem bank")
+        off = _HEADER.size
+        table = json.loads(bytes(buf[off:off + table_len]).rstrip(b"\0"))
+        off += table_len
+        self._offsets = buf[off:off + 8 * (count + 1)].cast("Q")
+        self._data = off + 8 * (count + 1)
+        self.count = count
+        self.buckets = {}  # (kind_key, difficulty) -> (first, count)
+        for kind_key, difficulty, first, n in table:
+            self.buckets[(kind_key, difficulty)] = (first, n)
+
+    @classmethod
+    def open(cls, path: str = BANK_FILE):
+        """The bank at `path`, or None if there isn't one (callers fall back to generating)."""
+        try:
+            return cls(path)
+        except FileNotFoundError:
+            return None
+
+    def __len__(self):
+        return self.count
+
+    def has(self, kind_key: str, difficulty: str) -> bool:
+        return (kind_key, difficulty) in self.buckets
+
+    def entry(self, kind_key: str, difficulty: str, i: int) -> BankEntry:
+        first, n = self.buckets[(kind_key, difficulty)]
+        if not 0 <= i < n:
+            raise IndexError(i)
+        return BankEntry(get_kind(kind_key), difficulty, self._view,
+                         self._data + self._offsets[first + i])
+
+    def draw(self, kind_key: str, difficulty: str, rng=random):
+        """A random banked problem, or None if the bank has no such bucket."""
+        hit = self.buckets.get((kind_key, difficulty))
+        if hit is None:
+            return None
+        return self.entry(kind_key, difficulty, rng.randrange(hit[1])).problem()
+
+    def describe(self) -> dict:
+        return {f"{k}/{d}": n for (k, d), (_, n) in sorted(self.buckets.items())}
+
+    def close(self):
+        self._offsets.release()
+        self._view.release()
+        self._mm.close()
+
+
+# --- build step ---
+
+def _entry_bytes(kind, problem) -> bytes:
+    payload = kind.dump(problem)
+    prompt = problem.prompt().encode()
+    feedback = problem.miss()[1].encode()
+    if kind.numeric is not None:
+        value = float(kind.numeric(problem))
+        distractors = [float(d) for d in kind.distractors(problem, value)] if kind.distractors else []
+    else:
+        value, distractors = math.nan, []
+    return b"".join((
+        _ENTRY.pack(len(payload), len(prompt), len(feedback), len(distractors)),
+        _VALUE.pack(value),
+        struct.pack(f"<{len(distractors)}d", *distractors),
+        payload, prompt, feedback,
+    ))
+
+
+def _sample_bucket(kind_key: str, difficulty: str, per_bucket: int, seed: int):
+    """Up to per_bucket distinct problems' entry bytes (fewer if the space is small)."""
+    random.seed(seed)
+    kind = get_kind(kind_key)
+    keys, out = set(), []
+    for _ in range(per_bucket * BUILD_ATTEMPTS):
+        problem = kind.create(difficulty)
+        key = problem_key(problem)
+        if key in keys:
+            continue
+        keys.add(key)
+        out.append(_entry_bytes(kind, problem))
+        if len(out) >= per_bucket:
+            break
+    return kind_key, difficulty, out
+
+
+def build(path: str, per_bucket: int, kinds=None, workers: int = 0, seed: int = 0):
+    """Sample every (kind, difficulty) and write the bank; returns {bucket: entries}."""
+    jobs = [
+        (k.key, d, per_bucket, seed + i)
+        for i, (k, d) in enumerate((k, d) for k in all_kinds() for d in k.difficulties)
+        if kinds is None or k.key in kinds
+    ]
+    if workers > 1:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as ex:
+            results = list(ex.map(_sample_bucket, *zip(*jobs)))
+    else:
+        results = [_sample_bucket(*job) for job in jobs]
+
+    table, entries = [], []
+    for kind_key, difficulty, rows in results:
+        table.append([kind_key, difficulty, len(entries), len(rows)])
+        entries.extend(rows)
+    table_blob = json.dumps(table).encode()
+    table_blob += b"\0" * (-(_HEADER.size + len(table_blob)) % 8)  # keep the offsets 8-aligned
+
+    offsets, pos = [], 0
+    for e in entries:
+        offsets.append(pos)
+        pos += len(e)
+    offsets.append(pos)
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(entries), len(table_blob)))
+        f.write(table_blob)
+        f.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+        for e in entries:
+            f.write(e)
+    return {f"{k}/{d}": n for k, d, _, n in table}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m app.calcduo.bank")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="sample problems and write the bank file")
+    b.add_argument("--out", default=BANK_FILE)
+    b.add_argument("--per-bucket", type=int, default=2000)
+    b.add_argument("--kinds", nargs="*", help="kind keys (default: all)")
+    b.add_argument("--workers", type=int, default=0, help="processes for sampling (SymPy kinds are slow)")
+    b.add_argument("--seed", type=int, default=0)
+    i = sub.add_parser("info", help="entries per bucket")
+    i.add_argument("path", nargs="?", default=BANK_FILE)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        counts = build(args.out, args.per_bucket, args.kinds, args.workers, args.seed)
+    else:
+        bank = ProblemBank(args.path)
+        counts = bank.describe()
+        bank.close()
+    for bucket, n in counts.items():
+        print(f"{bucket:<22} {n:>7}")
+    print(f"{'total':<22} {sum(counts.values()):>7}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+# calcduo/basis.py
+"""
+Exact derivative check for deriv_form, by coefficient maps instead of simplify.
+
+Every generated f' is a rational combination of a few basis functions:
+  x^n   sin(kx+b)   cos(kx+b)   e^(kx+b)   1/(x+c)
+with b, c rational and k > 0. (k = 0 gives the constants e^b: SymPy
+splits e^(2x+3) into exp(3)*exp(2*x).) term_result() gives f' as a map
+from basis key to coefficient, straight from the term specs. The typed
+answer goes through the answer parser with BASIS atoms, which expands it
+into the same kind of map in one pass. Coefficients are exact ints and
+Fractions, and no SymPy is involved. Two maps are the same function
+exactly when they are equal, because the basis functions are linearly
+independent over the rationals (for the phases, by Lindemann–Weierstrass).
+
+Normal forms keep equal functions on equal keys:
+- sin(-u) = -sin(u) and cos(-u) = cos(u), so k > 0
+- 1/(ax+b) = (1/a) * 1/(x + b/a), and 1/(ax) = (1/a) x^-1
+- e^(k1 x + b1) e^(k2 x + b2) = e^((k1+k2) x + b1 + b2)
+
+Anything outside the basis raises OutOfBasis as soon as it is built:
+- products of two non-polynomial parts, such as x sin(x)
+- pi, and irrational constants such as sin(1) and sqrt(2)
+- ln, tan and the other functions
+- non-integer powers
+- numbers longer than MAX_NUMBER characters (the parser already rejects
+  long exponents), and products of more than MAX_TERMS term pairs, so the
+  check stays cheap enough to run on the event loop
+same_derivative() then returns None and the caller falls back to SymPy.
+Decimals are exact: 0.5 is 1/2.
+"""
+from fractions import Fraction
+from functools import lru_cache
+
+from .answer_parser import FUNCTIONS, Atoms, AnswerSyntaxError, parse_answer
+from .solution import RULE_COS, RULE_EXP, RULE_POWER, RULE_SIN, term_result
+
+MAX_POWER = 32  # larger integer exponents are left to SymPy
+MAX_TERMS = 256  # products with more term pairs than this are left to SymPy
+MAX_NUMBER = 20  # characters in a number literal
+
+_ONE = ("x", 0)
+_PI = ("pi",)  # only meaningful inside something SymPy can simplify; left alone it leaves the basis
+_TRIG_CODES = {RULE_SIN: "sin", RULE_COS: "cos", RULE_EXP: "exp"}
+
+
+class OutOfBasis(Exception):
+    """The answer can't be written in the basis; grade it the general way."""
+
+
+def _key_mul(a, b):
+    """Basis key of the product of two basis functions."""
+    if a == _ONE:
+        return b
+    if b == _ONE:
+        return a
+    if a[0] == b[0] == "x":
+        return ("x", a[1] + b[1])
+    if a[0] == b[0] == "exp":
+        k, c = a[1] + b[1], a[2] + b[2]
+        return ("exp", k, c) if k or c else _ONE
+    raise OutOfBasis("product of two non-polynomial parts")
+
+
+def _key_inverse(a):
+    if a[0] == "x":
+        return ("x", -a[1])
+    if a[0] == "exp":
+        return ("exp", -a[1], -a[2])
+    raise OutOfBasis("division by a non-polynomial part")
+
+
+def _exp(k, b):
+    """e^(kx + b)."""
+    return Lin({("exp", k, b): 1}) if k or b else Lin.const(1)
+
+
+class Lin:
+    """A rational combination of basis functions: {key: int or Fraction}, zeros dropped."""
+    __slots__ = ("terms",)
+
+    def __init__(self, terms):
+        self.terms = terms
+
+    @classmethod
+    def const(cls, c):
+        return cls({_ONE: c} if c else {})
+
+    def constant(self):
+        """The value if this is a plain number, else None."""
+        if not self.terms:
+            return 0
+        if len(self.terms) == 1 and _ONE in self.terms:
+            return self.terms[_ONE]
+        return None
+
+    def linear(self):
+        """(k, b) if this is k x + b, else None."""
+        if not self.terms.keys() <= {("x", 1), _ONE}:
+            return None
+        return self.terms.get(("x", 1), 0), self.terms.get(_ONE, 0)
+
+    def scaled(self, c):
+        if not c:
+            return Lin({})
+        return Lin({k: v * c for k, v in self.terms.items()})
+
+    def __add__(self, other):
+        out = dict(self.terms)
+        for k, v in other.terms.items():
+            s = out.get(k, 0) + v
+            if s:
+                out[k] = s
+            else:
+                out.pop(k, None)
+        return Lin(out)
+
+    def __neg__(self):
+        return Lin({k: -v for k, v in self.terms.items()})
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __mul__(self, other):
+        c = other.constant()
+        if c is not None:
+            return self.scaled(c)
+        c = self.constant()
+        if c is not None:
+            return other.scaled(c)
+        if len(self.terms) * len(other.terms) > MAX_TERMS:
+            raise OutOfBasis("expansion too large")
+        out = {}
+        for ka, a in self.terms.items():
+            for kb, b in other.terms.items():
+                key = _key_mul(ka, kb)
+                out[key] = out.get(key, 0) + a * b
+        return Lin({k: v for k, v in out.items() if v})
+
+    def __truediv__(self, other):
+        c = other.constant()
+        if c is not None:
+            if not c:
+                raise OutOfBasis("division by zero")
+            return self.scaled(Fraction(1) / c)
+        if len(other.terms) == 1:
+            (key, c), = other.terms.items()
+            return self * Lin({_key_inverse(key): Fraction(1) / c})
+        kb = other.linear()
+        num = self.constant()
+        if kb is not None and num is not None:
+            k, b = kb  # both non-zero here: a single term was handled above
+            return Lin({("inv", Fraction(b) / k): Fraction(num) / k}) if num else Lin({})
+        raise OutOfBasis("division by a non-linear expression")
+
+    def __pow__(self, other):
+        if len(self.terms) == 1:
+            (key, c), = self.terms.items()
+            if key[0] == "exp" and not key[1] and c == 1:  # (e^b)^u = e^(b u)
+                kb = other.linear()
+                if kb is None:
+                    raise OutOfBasis("exponential of a non-linear argument")
+                return _exp(key[2] * kb[0], key[2] * kb[1])
+        n = other.constant()
+        if n is None or n.denominator != 1 or abs(n) > MAX_POWER:
+            raise OutOfBasis("non-integer, variable or large power")
+        out = Lin.const(1)
+        for _ in range(abs(int(n))):
+            out = out * self
+        return out if n >= 0 else Lin.const(1) / out
+
+
+def _periodic(name):
+    def f(arg):
+        kb = arg.linear()
+        if kb is None:
+            raise OutOfBasis(f"{name} of a non-linear argument")
+        k, b = kb
+        if not k:
+            if b:
+                raise OutOfBasis(f"{name} of a constant")
+            return Lin.const(0 if name == "sin" else 1)
+        if k < 0:
+            return Lin({(name, -k, -b): -1 if name == "sin" else 1})
+        return Lin({(name, k, b): 1})
+    return f
+
+
+def _exp_of(arg):
+    kb = arg.linear()
+    if kb is None:
+        raise OutOfBasis("exponential of a non-linear argument")
+    return _exp(*kb)
+
+
+def _number(text):
+    if len(text) > MAX_NUMBER:
+        raise OutOfBasis("number too long")
+    return Lin.const(int(text) if text.isdigit() else Fraction(text))
+
+
+def _outside(name):
+    def f(*args):
+        raise OutOfBasis(name)
+    return f
+
+
+BASIS = Atoms(
+    _number,
+    {"x": Lin({("x", 1): 1}), "e": _exp(0, 1), "E": _exp(0, 1), "pi": Lin({_PI: 1})},
+    {**{name: _outside(name) for name in FUNCTIONS},
+     "sin": _periodic("sin"), "cos": _periodic("cos"), "exp": _exp_of},
+)
+
+
+def answer_map(answer: str):
+    """The typed answer as {basis key: coefficient}; raises OutOfBasis or AnswerSyntaxError."""
+    terms = parse_answer(answer, BASIS).terms
+    if _PI in terms:
+        raise OutOfBasis("pi")
+    return terms
+
+
+@lru_cache(maxsize=4096)
+def derivative_map(terms):
+    """f' of a sum of term specs as {basis key: coefficient}; cached, so treat it as read-only."""
+    out = Lin({})
+    for spec in terms:
+        for code, c, p, q in term_result(spec):
+            if code == RULE_POWER:
+                key = ("x", p)
+            elif code in _TRIG_CODES:
+                key = (_TRIG_CODES[code], p, q)
+            elif q:  # RULE_LN: c / (p x + q) = (c/p) / (x + q/p)
+                key, c = ("inv", Fraction(q, p)), Fraction(c, p)
+            else:
+                key, c = ("x", -1), Fraction(c, p)
+            out = out + Lin({key: c})
+    return out.terms
+
+
+def same_derivative(answer: str, terms):
+    """True / False if the answer is (not) f' for the term specs; None if it leaves the basis or doesn't parse."""
+    try:
+        return answer_map(answer) == derivative_map(terms)
+    except (OutOfBasis, AnswerSyntaxError):
+        return None
@@ -1,8 +1,9 @@
 
 from .engine.game import Game
+from .events import EventLog
 
 def main():
     print("=== Calculus Duo (terminal) ===")
     name = input("Enter your player name: ").strip() or "Player"
-    game = Game(name)
+    game = Game(name, events=EventLog.open())
     game.run()
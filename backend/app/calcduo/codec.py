@@ -0,0 +1,63 @@
+# calcduo/codec.py
+"""
+Compact binary codec for problems.
+
+Every kind encodes its own payload (Problem.encode / Problem.decode); this module
+holds the shared pieces: the difficulty byte and the kind-key prefix used by
+dumps()/loads() so an encoded problem is self-describing.
+
+Layout of dumps():  <key>:<payload>
+Payloads start with one difficulty byte (0/1/2, or 255 followed by a
+length-prefixed UTF-8 string for non-standard difficulties).
+"""
+from array import array
+
+DIFFICULTIES = ("easy", "medium", "hard")
+_DIFF_CODE = {d: i for i, d in enumerate(DIFFICULTIES)}
+_CUSTOM = 255
+
+
+def pack_difficulty(difficulty: str) -> bytes:
+    code = _DIFF_CODE.get(difficulty)
+    if code is not None:
+        return bytes((code,))
+    raw = difficulty.encode("utf-8")
+    return bytes((_CUSTOM, len(raw))) + raw
+
+
+def unpack_difficulty(data, offset=0):
+    """Return (difficulty, next_offset)."""
+    code = data[offset]
+    if code != _CUSTOM:
+        return DIFFICULTIES[code], offset + 1
+    n = data[offset + 1]
+    return bytes(data[offset + 2:offset + 2 + n]).decode("utf-8"), offset + 2 + n
+
+
+def pack_ints(values, typecode="i") -> bytes:
+    """Length-prefixed int array (count byte + raw little-endian items)."""
+    arr = array(typecode, values)
+    return bytes((len(arr),)) + arr.tobytes()
+
+
+def unpack_ints(data, offset=0, typecode="i"):
+    """Return (array, next_offset)."""
+    n = data[offset]
+    arr = array(typecode)
+    end = offset + 1 + n * arr.itemsize
+    arr.frombytes(bytes(data[offset + 1:end]))
+    return arr, end
+
+
+def dumps(problem) -> bytes:
+    """Encode a problem together with its kind key."""
+    return problem.kind.encode("ascii") + b":" + problem.encode()
+
+
+def loads(data: bytes):
+    """Rebuild a problem encoded by dumps()."""
+    from .registry import get_kind
+
+    sep = data.index(b":")
+    kind = get_kind(bytes(data[:sep]).decode("ascii"))
+    return kind.load(data[sep + 1:])
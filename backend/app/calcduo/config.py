@@ -1,8 +1,18 @@
+import os
 
-LEADERBOARD_FILE = "leaderboard.json"
+LEADERBOARD_FILE = os.environ.get("CALCDUO_LEADERBOARD", "leaderboard.json")
+REVIEW_FILE = os.environ.get("CALCDUO_REVIEWS", "reviews.bin")
+BANK_FILE = os.environ.get("CALCDUO_BANK", "problem_bank.bin")  # built by `python -m app.calcduo.bank build`
+EVENTS_DIR = os.environ.get("CALCDUO_EVENTS", "events")  # answer-event segments; empty = no event log
+SNAPSHOT_FILE = os.environ.get("CALCDUO_SNAPSHOT", "snapshot.bin")  # API live/pooled problems across restarts; empty = off
 
 # Game knobs
 HEARTS_START = 5
 STREAK_BONUS_EVERY = 5
 STREAK_BONUS_POINTS = 20
 XP_BY_DIFFICULTY = {"easy": 10, "medium": 20, "hard": 40}
+PROBLEMS_PER_STAGE = 3
+PREFETCH_DEPTH = int(os.environ.get("CALCDUO_PREFETCH", "2"))  # CLI problems built ahead on a thread; 0 = off
+
+# Numeric answers are right when |answer - exact| <= ANSWER_TOL (every numeric kind, single and bulk grading)
+ANSWER_TOL = 1e-4
@@ -0,0 +1,117 @@
+# calcduo/dedup.py
+"""
+Problem identity: canonical keys, per-session repeat filtering and a global
+frequency index.
+
+problem_key() hashes a problem's kind and canonical form (Problem.canonical():
+coefficients and points for the polynomial kinds, merged and sorted term
+specs for the symbolic one) to a 64-bit int, so two problems that read the
+same get the same key whatever order they were generated in.
+
+SeenSet is a bounded insertion-ordered set: O(1) membership and insert, and
+the oldest keys fall out once it is full. fresh() uses it to skip repeats.
+
+FrequencyIndex counts keys per (kind, difficulty) and estimates how big each
+problem space is (Chao1: distinct + f1^2 / 2f2, from how many keys were seen
+once and twice), i.e. how close a difficulty is to running out of new problems.
+"""
+from hashlib import blake2b
+
+SEEN_CAPACITY = 256    # per session; far more than one run asks
+DEDUP_TRIES = 8        # regenerate at most this often before accepting a repeat
+INDEX_MAX_KEYS = 200_000  # per (kind, difficulty); beyond it only totals grow
+
+
+def problem_key(problem) -> int:
+    h = blake2b(problem.kind.encode(), digest_size=8)
+    h.update(b":" + problem.canonical())
+    return int.from_bytes(h.digest(), "little")
+
+
+class SeenSet:
+    def __init__(self, capacity: int = SEEN_CAPACITY):
+        self.capacity = capacity
+        self._keys = {}  # dict as an ordered set; oldest first
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def add(self, key) -> bool:
+        """Remember a key; False if it was already there."""
+        if key in self._keys:
+            return False
+        if len(self._keys) >= self.capacity:
+            del self._keys[next(iter(self._keys))]
+        self._keys[key] = None
+        return True
+
+
+def fresh(make, seen: SeenSet | None, tries: int = DEDUP_TRIES):
+    """Call make() until it returns a problem not in `seen` (at most `tries` times)."""
+    problem = make()
+    if seen is None:
+        return problem
+    for _ in range(tries - 1):
+        if seen.add(problem_key(problem)):
+            return problem
+        problem = make()
+    seen.add(problem_key(problem))
+    return problem  # space looks exhausted for this session; a repeat beats stalling
+
+
+class _Bucket:
+    __slots__ = ("counts", "total", "f1", "f2", "capped")
+
+    def __init__(self):
+        self.counts = {}  # key -> times seen
+        self.total = 0
+        self.f1 = 0       # keys seen exactly once
+        self.f2 = 0       # keys seen exactly twice
+        self.capped = False
+
+
+class FrequencyIndex:
+    def __init__(self, max_keys: int = INDEX_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = {}  # (kind_key, difficulty) -> _Bucket
+
+    def record(self, problem, key: int | None = None):
+        b = self._buckets.get((problem.kind, problem.difficulty))
+        if b is None:
+            b = self._buckets[(problem.kind, problem.difficulty)] = _Bucket()
+        b.total += 1
+        key = problem_key(problem) if key is None else key
+        n = b.counts.get(key, 0)
+        if n == 0 and len(b.counts) >= self.max_keys:
+            b.capped = True
+            return
+        b.counts[key] = n + 1
+        if n == 0:
+            b.f1 += 1
+        elif n == 1:
+            b.f1 -= 1
+            b.f2 += 1
+        elif n == 2:
+            b.f2 -= 1
+
+    def report(self) -> dict:
+        """Per "kind/difficulty": generated, distinct, repeat rate, estimated space and saturation."""
+        out = {}
+        for (kind, difficulty), b in sorted(self._buckets.items()):
+            distinct = len(b.counts)
+            if b.f2:
+                space = distinct + b.f1 * b.f1 / (2 * b.f2)
+            else:
+                space = distinct + b.f1 * (b.f1 - 1) / 2
+            out[f"{kind}/{difficulty}"] = {
+                "generated": b.total,
+                "distinct": distinct,
+                "repeat_rate": round(1 - distinct / b.total, 4) if b.total else 0.0,
+                "est_space": round(space),
+                "saturation": round(distinct / space, 4) if space else 0.0,
+                "capped": b.capped,
+            }
+        return out
@@ -0,0 +1,112 @@
+# calcduo/engine/adaptive.py
+"""
+Adaptive difficulty: an Elo-style skill model per player and problem kind.
+
+Each player has one rating per kind; each (kind, difficulty) has an item rating.
+An answer moves both towards the observed outcome (constant work per answer),
+with a step size that shrinks as the player accumulates attempts on that kind,
+Glicko-style, so early answers move the rating quickly and later ones fine-tune.
+
+pick() chooses the (kind, difficulty) whose predicted success is closest to the
+target rate. Player state is two flat arrays (int16 rating + uint8 attempt
+count per kind), about 3 bytes per kind plus the id mapping, so millions of
+players fit in memory.
+"""
+import math
+import random
+from array import array
+
+from ..registry import all_kinds
+
+TARGET_SUCCESS = 0.75
+START_RATING = 1500
+ITEM_START = {"easy": 1300, "medium": 1500, "hard": 1700}
+K_MAX = 64.0    # step size for a new player on a kind
+K_MIN = 12.0    # floor once the rating has settled
+K_ITEM = 4.0    # items see many players; move them slowly
+PICK_TEMPERATURE = 0.05  # softness of the choice around the target (in probability units)
+
+
+def expected_success(player_rating: float, item_rating: float) -> float:
+    return 1.0 / (1.0 + 10.0 ** ((item_rating - player_rating) / 400.0))
+
+
+class SkillModel:
+    def __init__(self, target: float = TARGET_SUCCESS, kinds=None):
+        self.target = target
+        self.kinds = list(kinds if kinds is not None else [k for k in all_kinds() if k.practice])
+        self.kind_index = {k.key: i for i, k in enumerate(self.kinds)}
+        self.stride = len(self.kinds)
+        self.players = {}            # player id -> row
+        self.ratings = array("h")    # row * stride + kind index
+        self.attempts = array("B")   # same layout, saturates at 255
+        self.items = {
+            (k.key, d): float(ITEM_START.get(d, START_RATING))
+            for k in self.kinds for d in k.difficulties
+        }
+
+    def __len__(self):
+        return len(self.players)
+
+    def _row(self, player: str) -> int:
+        row = self.players.get(player)
+        if row is None:
+            row = self.players[player] = len(self.players)
+            self.ratings.extend([START_RATING] * self.stride)
+            self.attempts.extend([0] * self.stride)
+        return row
+
+    def rating(self, player: str, kind_key: str) -> int:
+        """Current rating (START_RATING for unseen players)."""
+        row = self.players.get(player)
+        if row is None:
+            return START_RATING
+        return self.ratings[row * self.stride + self.kind_index[kind_key]]
+
+    def predict(self, player: str, kind_key: str, difficulty: str) -> float:
+        return expected_success(self.rating(player, kind_key), self.items[(kind_key, difficulty)])
+
+    def record(self, player: str, kind_key: str, difficulty: str, correct: bool):
+        """Update player and item ratings for one answer; returns the new player rating."""
+        k_idx = self.kind_index.get(kind_key)
+        if k_idx is None:
+            return None  # kind not part of adaptive practice
+        i = self._row(player) * self.stride + k_idx
+        item_key = (kind_key, difficulty)
+        item = self.items.get(item_key, float(START_RATING))
+        r = self.ratings[i]
+        n = self.attempts[i]
+
+        p = expected_success(r, item)
+        outcome = 1.0 if correct else 0.0
+        k = max(K_MIN, K_MAX / math.sqrt(1.0 + n / 4.0))
+        new_r = max(-32768, min(32767, round(r + k * (outcome - p))))
+
+        self.ratings[i] = new_r
+        if n < 255:
+            self.attempts[i] = n + 1
+        if item_key in self.items:
+            self.items[item_key] = item + K_ITEM * (p - outcome)
+        return new_r
+
+    def pick(self, player: str, rng=random):
+        """(kind, difficulty) whose predicted success is nearest the target, softly sampled."""
+        row = self.players.get(player)
+        base = row * self.stride if row is not None else None
+        candidates, weights = [], []
+        for idx, kind in enumerate(self.kinds):
+            r = self.ratings[base + idx] if base is not None else START_RATING
+            for d in kind.difficulties:
+                gap = abs(expected_success(r, self.items[(kind.key, d)]) - self.target)
+                candidates.append((kind, d))
+                weights.append(math.exp(-gap / PICK_TEMPERATURE))
+        return rng.choices(candidates, weights=weights)[0]
+
+    def profile(self, player: str) -> dict:
+        return {
+            k.key: {
+                "rating": self.rating(player, k.key),
+                "success": {d: round(self.predict(player, k.key, d), 3) for d in k.difficulties},
+            }
+            for k in self.kinds
+        }
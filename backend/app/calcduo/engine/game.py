@@ -1,18 +1,23 @@
 # calcduo/engine/game.py
+import math
 import random
 import re
+import time
 from typing import Tuple
 
-from ..config import HEARTS_START, STREAK_BONUS_EVERY, STREAK_BONUS_POINTS
+from ..bank import ProblemBank
+from ..config import HEARTS_START, PREFETCH_DEPTH, REVIEW_FILE, STREAK_BONUS_EVERY, STREAK_BONUS_POINTS
+from ..dedup import SeenSet, fresh, problem_key
+from ..events import EventLog
 from ..io_leaderboard import Leaderboard
+from ..memory import SYMPY_POLICY
 from ..problems.base import Problem
-from ..problems.poly_limit import LimitProblem
-from ..problems.poly_deriv_point import DerivativeAtPointProblem
-from ..problems.poly_def_int import DefiniteIntegralProblem
-from ..problems.sympy_deriv_form import SymPyDerivativeFormProblem
+from ..registry import all_kinds, get_kind, kind_of
 from ..utils import safe_float
-from ..poly import eval_poly, derivative_coeffs
+from .adaptive import SkillModel
 from .lesson import Lesson
+from .prefetch import Prefetcher
+from .review import ReviewScheduler
 
 
 # Numeric-only input allowlist (used for numeric problems ONLY)
@@ -20,26 +25,52 @@ NUMERIC_INPUT_RE = re.compile(r"[0-9x+\-*/^().\s]+$")
 
 
 class Game:
-    def __init__(self, player_name: str):
+    def __init__(self, player_name: str, leaderboard: Leaderboard | None = None,
+                 skill: SkillModel | None = None, reviews: ReviewScheduler | None = None,
+                 bank: ProblemBank | None = None, prefetch: int = PREFETCH_DEPTH,
+                 events: EventLog | None = None):
         self.player = player_name
         self.score = 0
         self.xp = 0
         self.streak = 0
         self.hearts = HEARTS_START
-        self.leaderboard = Leaderboard()
+        self.leaderboard = leaderboard or Leaderboard()
+        self.skill = skill if skill is not None else SkillModel()  # drives Quick Practice difficulty
+        if reviews is None:
+            reviews = ReviewScheduler.load(REVIEW_FILE, kinds=[k.key for k in all_kinds()])
+        self.reviews = reviews
+        self.bank = bank if bank is not None else ProblemBank.open()  # None without a bank file: generate instead
+        self.seen = SeenSet()  # problems already asked this run
         self.lessons = [
-            Lesson("Limits", LimitProblem, difficulties=("easy", "medium")),
-            Lesson("Derivatives (value at x0)", DerivativeAtPointProblem, difficulties=("easy", "medium", "hard")),
-            Lesson("Derivatives (symbolic, trig/ln/exp)", SymPyDerivativeFormProblem, difficulties=("easy", "medium", "hard")),
-            Lesson("Integrals", DefiniteIntegralProblem, difficulties=("easy", "medium", "hard")),
+            Lesson(kind.label, kind.problem_cls, difficulties=kind.difficulties)
+            for kind in all_kinds()
         ]
+        # None: every problem is made when it is asked (server sessions; CALCDUO_PREFETCH=0)
+        self.prefetcher = Prefetcher(self.fresh_problem, prefetch) if prefetch > 0 else None
+        self.events = events  # answer events for analytics; None = not logged
+        self._answer = ""     # what was typed for the problem being graded, and when it was shown
+        self._shown = None
+
+    def fresh_problem(self, kind, difficulty: str):
+        """A problem of `kind` (from the bank when it has one), skipping ones asked this run."""
+        if self.bank is not None and self.bank.has(kind.key, difficulty):
+            return fresh(lambda: self.bank.draw(kind.key, difficulty), self.seen)
+        return fresh(lambda: kind.create(difficulty), self.seen)
+
+    def next_problem(self, kind, difficulty: str, upcoming=()):
+        """The problem to ask now; the `upcoming` (kind, difficulty) steps get made in the background."""
+        if self.prefetcher is None:
+            return self.fresh_problem(kind, difficulty)
+        problem = self.prefetcher.take(kind, difficulty)
+        self.prefetcher.ahead(upcoming)
+        return problem
 
     def print_status(self):
         print(f"\nPlayer: {self.player} | Score: {self.score} | XP: {self.xp} | Streak: {self.streak} | Hearts: {self.hearts}")
 
     def _collect_answer(self, problem: Problem) -> str | None:
         """
-        Collect free-form input. For problems that declare `supports_letters = True`
+        Collect free-form input. For kinds registered with `supports_letters=True`
         (e.g., symbolic derivatives with sin/cos/ln/e^(...)), we DO NOT gate input.
 
         For numeric-only problems, we keep a light regex to catch obvious typos.
@@ -48,7 +79,7 @@ class Game:
         raw = input("Your answer: ").strip()
 
         # If the problem wants letters (sin, cos, ln, e, pi...), skip any strict gating
-        if getattr(problem, "supports_letters", False):
+        if kind_of(problem).supports_letters:
             return raw
 
         # Otherwise, numeric-style problems: apply a light allowlist
@@ -58,12 +89,14 @@ class Game:
         return raw
 
     def ask(self, problem: Problem):
+        SYMPY_POLICY.tick()  # long sessions: keeps SymPy's caches under CALCDUO_SYMPY_CACHE_MAX
         self.print_status()
         print("\n" + problem.prompt())
+        self._shown = time.perf_counter()
+        self._answer = ""
 
         # Only offer multiple-choice if the problem allows it
-        supports_mc = getattr(problem, "supports_mc", True)
-        if supports_mc and random.random() < 0.35:
+        if kind_of(problem).supports_mc and random.random() < 0.35:
             mc, correct = self.make_multiple_choice(problem)
             for idx, choice in enumerate(mc, start=1):
                 print(f"{idx}. {choice}")
@@ -71,7 +104,7 @@ class Game:
             if ans.isdigit():
                 i = int(ans)
                 if 1 <= i <= len(mc):
-                    picked = mc[i - 1]
+                    picked = self._answer = mc[i - 1]
                     ok, feedback = self.evaluate_mc_pick(picked, correct)
                     if ok:
                         self.on_correct(problem)
@@ -82,6 +115,7 @@ class Game:
 
         # Fallback: ask for free-form answer (numeric or expression depending on problem)
         user = self._collect_answer(problem)
+        self._answer = user or ""
         if user is None:
             # Rejected by numeric input gate
             self.on_incorrect(problem, "Invalid input format.")
@@ -93,21 +127,48 @@ class Game:
         else:
             self.on_incorrect(problem, feedback)
 
-    def on_correct(self, problem):
+    def record_correct(self, problem) -> Tuple[int, int]:
+        """Apply a correct answer to the score; returns (points gained, streak bonus)."""
+        self.skill.record(self.player, problem.kind, problem.difficulty, True)
+        self.reviews.record(self.player, problem.kind, problem.difficulty, True)
         gained = problem.xp_reward()
         self.score += gained
         self.xp += gained
         self.streak += 1
-        print(f"✅ Correct! +{gained} points.")
+        bonus = 0
         if self.streak and self.streak % STREAK_BONUS_EVERY == 0:
-            self.score += STREAK_BONUS_POINTS
-            self.xp += STREAK_BONUS_POINTS
-            print(f"🔥 Streak bonus! +{STREAK_BONUS_POINTS} points.")
+            bonus = STREAK_BONUS_POINTS
+            self.score += bonus
+            self.xp += bonus
+        return gained, bonus
 
-    def on_incorrect(self, problem, feedback):
+    def record_incorrect(self, problem):
+        self.skill.record(self.player, problem.kind, problem.difficulty, False)
+        self.reviews.record(self.player, problem.kind, problem.difficulty, False)
         self.hearts -= 1
         self.streak = 0
+
+    def log_event(self, problem, ok: bool):
+        if self.events is None:
+            return
+        ms = (time.perf_counter() - self._shown) * 1e3 if self._shown is not None else math.nan
+        self.events.emit(self.player, problem.kind, problem.difficulty, ok, self._answer, ms,
+                         problem_key(problem))
+
+    def on_correct(self, problem):
+        self.log_event(problem, True)
+        gained, bonus = self.record_correct(problem)
+        print(f"✅ Correct! +{gained} points.")
+        if bonus:
+            print(f"🔥 Streak bonus! +{bonus} points.")
+
+    def on_incorrect(self, problem, feedback):
+        self.log_event(problem, False)
+        self.record_incorrect(problem)
         print(f"❌ {feedback} - You lost a heart. Hearts left: {self.hearts}")
+        print("   Worked solution:")
+        for line in problem.solution():
+            print(f"   - {line}")
         if self.hearts <= 0:
             print("No hearts left. End of run.")
 
@@ -125,30 +186,13 @@ class Game:
         def clean(val):
             return int(val) if abs(val) % 1 < 1e-6 else round(val, 1)
 
-        # Compute correct & distractors for supported numeric problems
-        if isinstance(problem, LimitProblem):
-            true_val = eval_poly(problem.coeffs, problem.a)
-            distractors = [
-                eval_poly(problem.coeffs, problem.a + 1),
-                eval_poly(problem.coeffs, problem.a - 1),
-                eval_poly(derivative_coeffs(problem.coeffs), problem.a),
-            ]
-        elif isinstance(problem, DerivativeAtPointProblem):
-            true_val = eval_poly(problem.deriv_coeffs, problem.x0)
-            distractors = [
-                eval_poly(problem.coeffs, problem.x0),              # f(x0) not f'(x0)
-                eval_poly(problem.deriv_coeffs, problem.x0 + 1),   # off-by-one
-                true_val + random.choice([-2, -1, 1, 2]),          # small noise
-            ]
-        elif isinstance(problem, DefiniteIntegralProblem):
-            true_val = eval_poly(problem.anti, problem.b) - eval_poly(problem.anti, problem.a)
-            distractors = [
-                eval_poly(problem.anti, problem.b + 1) - eval_poly(problem.anti, problem.a),
-                eval_poly(problem.anti, problem.b) - eval_poly(problem.anti, problem.a - 1),
-                eval_poly(problem.anti, problem.a) - eval_poly(problem.anti, problem.b),  # swapped bounds
-            ]
+        # Correct value & distractors come from the kind's numeric kernel
+        kind = kind_of(problem)
+        if kind.numeric is not None:
+            true_val = kind.numeric(problem)
+            distractors = kind.distractors(problem, true_val) if kind.distractors else []
         else:
-            # For symbolic problems or unknown types we shouldn't be here
+            # For symbolic problems we shouldn't be here
             true_val = 0.0
             distractors = [1.0, -1.0, 2.0]
 
@@ -175,7 +219,7 @@ class Game:
         print("\nAvailable lessons:")
         for i, lesson in enumerate(self.lessons, start=1):
             print(f"{i}. {lesson.name}")
-        print(f"{len(self.lessons)+1}. Quick Practice (random problems)")
+        print(f"{len(self.lessons)+1}. Quick Practice (adapts to your level)")
         selection = input("Choose lesson number: ").strip()
         if not selection.isdigit():
             print("Invalid selection.")
@@ -190,30 +234,50 @@ class Game:
         else:
             print("Invalid selection.")
 
+    def due_review(self, skip=()):
+        """(kind, difficulty) of a review that is due now, or None; kind keys in skip are passed over."""
+        due = self.reviews.next_due(self.player, skip=skip)
+        if due is None:
+            return None
+        kind_key, difficulty = due
+        return get_kind(kind_key), difficulty
+
+    def next_practice(self, planned=()):
+        """Due reviews first; otherwise kind and difficulty adapt to the player's skill.
+
+        planned: steps already chosen but not answered yet. A review among them
+        is still due (answering it reschedules it), so it isn't picked again.
+        """
+        return self.due_review({kind.key for kind, _ in planned}) or self.skill.pick(self.player)
+
     def quick_practice(self, rounds=5):
         print("\n--- Quick Practice ---")
-        pool = [
-            LimitProblem,
-            DerivativeAtPointProblem,
-            SymPyDerivativeFormProblem,
-            DefiniteIntegralProblem,
-        ]
-        for _ in range(rounds):
-            cls = random.choice(pool)
-            dif = random.choice(["easy", "medium", "hard"])
-            p = cls(dif)
-            self.ask(p)
+        # Each step is picked while the one before it is on screen (as server sessions do),
+        # so its problem can be made while the player is typing
+        steps = [self.next_practice()]
+        for i in range(rounds):
+            if i + 1 < rounds:
+                steps.append(self.next_practice(steps[i:]))
+            kind, dif = steps[i]
+            self.ask(self.next_problem(kind, dif, steps[i + 1:]))
             if self.hearts <= 0:
                 break
 
     def run(self):
         print(f"Welcome, {self.player}! Let's learn Calculus. You have {self.hearts} hearts.")
-        while self.hearts > 0:
-            self.choose_lesson()
-            cont = input("Continue playing? (y/n): ").strip().lower()
-            if cont != "y":
-                break
+        try:
+            while self.hearts > 0:
+                self.choose_lesson()
+                cont = input("Continue playing? (y/n): ").strip().lower()
+                if cont != "y":
+                    break
+        finally:
+            if self.prefetcher is not None:
+                self.prefetcher.close()
+            if self.events is not None:
+                self.events.close()
         print(f"\nRun ended. Score: {self.score} | XP: {self.xp}")
         self.leaderboard.add_score(self.player, self.score)
+        self.reviews.save(REVIEW_FILE)
         self.leaderboard.print_board(10)
         print("Thanks for playing! Come back to improve your best score.")
@@ -1,3 +1,6 @@
+from ..config import PROBLEMS_PER_STAGE
+from ..registry import get_kind
+
 
 class Lesson:
     def __init__(self, name: str, problem_cls, difficulties=("easy", "medium", "hard")):
@@ -5,13 +8,30 @@ class Lesson:
         self.problem_cls = problem_cls
         self.difficulties = difficulties
 
+    def plan(self):
+        """Difficulty of each problem in order: PROBLEMS_PER_STAGE per stage."""
+        return [d for d in self.difficulties for _ in range(PROBLEMS_PER_STAGE)]
+
     def run(self, game):
         print(f"\n--- Lesson: {self.name} ---")
-        for difficulty in self.difficulties:
-            print(f"\nStage: {difficulty.capitalize()}")
-            for _ in range(3):  # 3 problems per stage
-                problem = self.problem_cls(difficulty)
-                game.ask(problem)
+        kind = get_kind(self.problem_cls.kind)
+        plan = self.plan()
+        for i, difficulty in enumerate(plan):
+            if i % PROBLEMS_PER_STAGE == 0:
+                print(f"\nStage: {difficulty.capitalize()}")
+            upcoming = [(kind, d) for d in plan[i + 1:]]
+            game.ask(game.next_problem(kind, difficulty, upcoming))
+            if game.hearts <= 0:
+                print("You've run out of hearts. Lesson paused.")
+                return
+            if (i + 1) % PROBLEMS_PER_STAGE:
+                continue
+            # Between stages, slip in one review the player is due for
+            review = game.due_review()
+            if review is not None:
+                review_kind, review_difficulty = review
+                print(f"\n🔁 Review: {review_kind.label} ({review_difficulty})")
+                game.ask(game.next_problem(review_kind, review_difficulty, upcoming))
                 if game.hearts <= 0:
                     print("You've run out of hearts. Lesson paused.")
                     return
@@ -0,0 +1,71 @@
+# calcduo/engine/prefetch.py
+"""
+Background problem making for the terminal game.
+
+A symbolic problem takes a noticeable moment to build (SymPy simplifies f and
+differentiates it), and the CLI used to build it only after the previous answer
+was graded. The Prefetcher builds the next steps on one worker thread while the
+player is typing. input() releases the GIL, so the thread gets the CPU
+exactly when the player isn't using it.
+
+Prefetched problems are keyed by (kind, difficulty). take() hands over a
+matching one, waiting for it if it is still being built. If nothing matches
+(e.g. an unplanned review), it builds one on the spot. ahead(steps) tops the
+queue up to the next `depth` steps and drops stale entries that no step
+wants any more. A single lock serializes every make() call, because make()
+updates the game's SeenSet. close() cancels whatever hasn't started.
+"""
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Prefetcher:
+    def __init__(self, make, depth: int = 2):
+        self.make = make  # (kind, difficulty) -> problem
+        self.depth = depth
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._pending = deque()  # [(kind_key, difficulty, future)], oldest first
+        self._executor = None
+
+    def _make(self, kind, difficulty: str):
+        with self._lock:
+            return self.make(kind, difficulty)
+
+    def take(self, kind, difficulty: str):
+        """A problem for (kind, difficulty): the prefetched one if there is one, else made now."""
+        for i, (key, d, future) in enumerate(self._pending):
+            if key == kind.key and d == difficulty:
+                del self._pending[i]
+                self.hits += 1
+                return future.result()
+        self.misses += 1
+        return self._make(kind, difficulty)
+
+    def ahead(self, steps):
+        """Have the next (kind, difficulty) steps in the works; entries no step wants are dropped."""
+        wanted = [(k.key, d) for k, d in steps[:self.depth]]
+        keep = deque()
+        for entry in self._pending:
+            step = entry[:2]
+            if step in wanted:
+                wanted.remove(step)
+                keep.append(entry)
+            else:
+                entry[2].cancel()  # too late if it's running; the problem is just never asked
+        self._pending = keep
+        if self._executor is None and wanted:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="calcduo-prefetch")
+        kinds = {k.key: k for k, _ in steps}
+        for key, d in wanted:
+            self._pending.append((key, d, self._executor.submit(self._make, kinds[key], d)))
+
+    def close(self):
+        for _, _, future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,206 @@
+# calcduo/engine/review.py
+"""
+Spaced-repetition review queue.
+
+A miss on a kind schedules a review of that kind for the player. Each
+correct review pushes the next one further out (interval * ease). Once the
+interval passes MASTERED_AFTER, the kind leaves the queue. Each further miss
+resets the interval and lowers the ease.
+
+State lives in flat arrays indexed by row * stride + kind, so one
+(player, kind) slot costs 12 bytes: due and interval as uint32 seconds, ease
+x100 as uint16, misses and difficulty as uint8. Each player also has a small
+heap of due * stride + kind ints (one int per entry, ordered by due). Entries
+whose due no longer matches the array are stale and are skipped when popped
+(lazy deletion). Stale entries under a live top are never popped, so a heap
+past 2 * stride entries is rebuilt from the due array; that keeps it bounded
+for a player who answers forever. next_due() and record() are therefore
+O(log k) per player (amortized).
+"""
+import heapq
+import json
+import struct
+import time
+from array import array
+
+from ..codec import DIFFICULTIES
+
+EPOCH = 1_704_067_200        # 2024-01-01 UTC; times are stored as uint32 offsets
+FIRST_INTERVAL = 10 * 60     # first review ten minutes after a miss
+MASTERED_AFTER = 30 * 86400  # drop the review once the interval passes a month
+EASE_START = 250             # x100
+EASE_MIN = 130
+
+_HEADER = struct.Struct("<4sII")  # magic, stride, player count
+_MAGIC = b"CDR1"
+
+
+def _now() -> int:
+    return int(time.time()) - EPOCH
+
+
+class ReviewScheduler:
+    def __init__(self, kinds):
+        self.kinds = list(kinds)                   # kind keys
+        self.kind_index = {k: i for i, k in enumerate(self.kinds)}
+        self.stride = len(self.kinds)
+        self.players = {}                          # player id -> row
+        self.due = array("I")                      # 0 = nothing scheduled
+        self.interval = array("I")
+        self.ease = array("H")
+        self.misses = array("B")
+        self.difficulty = array("B")
+        self.heaps = []                            # per row: [due * stride + kind_idx]
+
+    def __len__(self):
+        return len(self.players)
+
+    def _row(self, player: str) -> int:
+        row = self.players.get(player)
+        if row is None:
+            row = self.players[player] = len(self.heaps)
+            zeros = [0] * self.stride
+            self.due.extend(zeros)
+            self.interval.extend(zeros)
+            self.ease.extend([EASE_START] * self.stride)
+            self.misses.extend(zeros)
+            self.difficulty.extend(zeros)
+            self.heaps.append([])
+        return row
+
+    def record(self, player: str, kind_key: str, difficulty: str, correct: bool, now: int | None = None):
+        """Record an answer on a kind; schedules, reschedules or retires its review."""
+        k = self.kind_index.get(kind_key)
+        if k is None:
+            return
+        now = _now() if now is None else now
+        row = self.players.get(player)
+        if row is None:
+            if correct:
+                return  # nothing to review
+            row = self._row(player)
+        i = row * self.stride + k
+
+        if correct:
+            if not self.due[i]:
+                return
+            ivl = self.interval[i] * self.ease[i] // 100
+            self.ease[i] = min(self.ease[i] + 10, 65535)
+            if ivl > MASTERED_AFTER:
+                self.due[i] = 0  # mastered; heap entry goes stale
+                self.interval[i] = 0
+                return
+        else:
+            ivl = FIRST_INTERVAL
+            self.ease[i] = max(EASE_MIN, self.ease[i] - 20)
+            self.misses[i] = min(self.misses[i] + 1, 255)
+            self.difficulty[i] = DIFFICULTIES.index(difficulty) if difficulty in DIFFICULTIES else 0
+
+        due = now + ivl
+        self.interval[i] = ivl
+        self.due[i] = due
+        heap = self.heaps[row]
+        heapq.heappush(heap, due * self.stride + k)
+        if len(heap) > 2 * self.stride:
+            self.heaps[row] = self._live_heap(row)
+
+    def _live_heap(self, row: int):
+        """A fresh heap for the row: one entry per scheduled kind, none stale."""
+        base = row * self.stride
+        heap = [d * self.stride + k for k, d in enumerate(self.due[base:base + self.stride]) if d]
+        heapq.heapify(heap)
+        return heap
+
+    def _top(self, row: int):
+        heap = self.heaps[row]
+        base = row * self.stride
+        while heap:
+            due, k = divmod(heap[0], self.stride)
+            if self.due[base + k] == due:
+                return due, k
+            heapq.heappop(heap)  # stale: rescheduled or retired since it was pushed
+        return None
+
+    def next_due(self, player: str, now: int | None = None, skip=()):
+        """(kind_key, difficulty) of the most overdue review, or None; kind keys in skip are passed over."""
+        row = self.players.get(player)
+        if row is None:
+            return None
+        top = self._top(row)
+        if top is not None and self.kinds[top[1]] in skip:  # rare: scan the live entries
+            base = row * self.stride
+            live = (divmod(e, self.stride) for e in self.heaps[row])
+            top = min(((d, k) for d, k in live if self.due[base + k] == d and self.kinds[k] not in skip),
+                      default=None)
+        now = _now() if now is None else now
+        if top is None or top[0] > now:
+            return None
+        k = top[1]
+        return self.kinds[k], DIFFICULTIES[self.difficulty[row * self.stride + k]]
+
+    def pending(self, player: str, now: int | None = None):
+        """All scheduled reviews for a player, soonest first."""
+        row = self.players.get(player)
+        if row is None:
+            return []
+        now = _now() if now is None else now
+        base = row * self.stride
+        out = []
+        for k in range(self.stride):
+            due = self.due[base + k]
+            if due:
+                out.append({
+                    "kind": self.kinds[k],
+                    "difficulty": DIFFICULTIES[self.difficulty[base + k]],
+                    "due_in": due - now,
+                    "misses": self.misses[base + k],
+                })
+        out.sort(key=lambda r: r["due_in"])
+        return out
+
+    # --- persistence: header, kind keys and player ids (JSON), then the raw arrays ---
+
+    def save(self, path: str):
+        ids = [None] * len(self.players)
+        for player, row in self.players.items():
+            ids[row] = player
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, self.stride, len(ids)))
+            for blob in (json.dumps(self.kinds).encode(), json.dumps(ids).encode()):
+                f.write(struct.pack("<I", len(blob)))
+                f.write(blob)
+            for arr in (self.due, self.interval, self.ease, self.misses, self.difficulty):
+                f.write(arr.tobytes())
+
+    @classmethod
+    def load(cls, path: str, kinds=None):
+        """Load a saved queue; with `kinds`, start empty if the file is missing or for other kinds."""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            if kinds is None:
+                raise
+            return cls(kinds)
+        magic, stride, n = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a review queue file")
+        off = _HEADER.size
+        blobs = []
+        for _ in range(2):
+            (size,) = struct.unpack_from("<I", data, off)
+            blobs.append(json.loads(data[off + 4:off + 4 + size]))
+            off += 4 + size
+        saved_kinds = blobs[0]
+        if kinds is not None and list(kinds) != saved_kinds:
+            return cls(kinds)  # kind set changed; old rows don't line up
+        obj = cls(saved_kinds)
+        ids = blobs[1]
+        obj.players = {p: row for row, p in enumerate(ids)}
+        for name in ("due", "interval", "ease", "misses", "difficulty"):
+            arr = getattr(obj, name)
+            size = arr.itemsize * n * stride
+            arr.frombytes(data[off:off + size])
+            off += size
+        obj.heaps = [obj._live_heap(row) for row in range(n)]
+        return obj
@@ -0,0 +1,90 @@
+# calcduo/engine/session.py
+from ..registry import get_kind
+from .game import Game
+
+PRACTICE = "practice"
+
+
+class GameSession(Game):
+    """
+    The Game / Lesson state machine without terminal I/O, for server-side play.
+
+    A session works through a plan of (kind, difficulty) steps: a lesson for one
+    kind, or Quick Practice, whose steps are picked one at a time by the skill
+    model (due reviews first) as the session goes. The caller produces and grades the
+    problems (possibly elsewhere) and feeds results back with apply_result().
+    """
+
+    def __init__(self, player_name: str, lesson: str = PRACTICE, rounds: int = 5,
+                 leaderboard=None, skill=None, reviews=None, bank=None):
+        super().__init__(player_name, leaderboard=leaderboard, skill=skill, reviews=reviews, bank=bank, prefetch=0)
+        self.lesson = lesson
+        self.steps = self._plan(lesson)
+        self.total = rounds if lesson == PRACTICE else len(self.steps)
+        self.index = 0  # step currently being answered
+        self.ended = False
+
+    def _plan(self, lesson: str):
+        if lesson == PRACTICE:
+            return []  # filled lazily by step()
+        kind = get_kind(lesson)
+        for les in self.lessons:
+            if les.problem_cls is kind.problem_cls:
+                return [(kind, d) for d in les.plan()]
+        return []
+
+    @property
+    def finished(self) -> bool:
+        return self.hearts <= 0 or self.index >= self.total
+
+    def step(self, i: int):
+        """(kind, difficulty) of step i, or None past the end."""
+        if i >= self.total:
+            return None
+        while len(self.steps) <= i:  # Quick Practice: due reviews, then the skill model
+            self.steps.append(self.next_practice(self.steps[self.index:]))
+        return self.steps[i]
+
+    def state(self) -> dict:
+        return {
+            "score": self.score,
+            "xp": self.xp,
+            "streak": self.streak,
+            "hearts": self.hearts,
+            "index": self.index,
+            "total": self.total,
+        }
+
+    def problem_message(self, problem) -> dict:
+        kind, difficulty = self.step(self.index)
+        return {
+            "type": "problem",
+            "kind": kind.key,
+            "difficulty": difficulty,
+            "prompt": problem.prompt(),
+            "state": self.state(),
+        }
+
+    def apply_result(self, problem, ok: bool, feedback: str) -> dict:
+        gained = bonus = 0
+        if ok:
+            gained, bonus = self.record_correct(problem)
+        else:
+            self.record_incorrect(problem)
+        self.index += 1
+        return {
+            "type": "result",
+            "ok": ok,
+            "feedback": feedback,
+            "gained": gained,
+            "bonus": bonus,
+            "state": self.state(),
+        }
+
+    def finish(self) -> dict:
+        """End the run once and record the score on the leaderboard."""
+        if not self.ended:
+            self.ended = True
+            self.leaderboard.add_score(self.player, self.score)
+        reason = "hearts" if self.hearts <= 0 else "complete"
+        return {"type": "end", "reason": reason, "state": self.state()}
@@ -0,0 +1,203 @@
+# calcduo/engine/tournament.py
+"""
+Tournaments: many players, one seeded problem set, a live ranking.
+
+problem_set(seed, plan) makes the same problems for the same seed. The kinds'
+generators draw from `random`, so it is seeded while the set is built and
+restored afterwards. Every player works through the whole set at their own
+pace. A correct answer is worth the difficulty's XP plus the usual streak
+bonus. Nobody loses hearts: a miss only breaks the streak.
+
+RankIndex keeps the ranking up to date incrementally. Scores are small
+integers bounded by the set's maximum:
+- A Fenwick tree over scores counts the players above any score in O(log S).
+- Per-score buckets give the top N without sorting everyone. The buckets
+  keep insertion order, so whoever reached a score first is listed first.
+A correct answer is one move(); nothing is ever re-sorted.
+"""
+import random
+import time
+from bisect import bisect_left, insort
+
+from ..config import STREAK_BONUS_EVERY, STREAK_BONUS_POINTS, XP_BY_DIFFICULTY
+from ..dedup import SeenSet, fresh
+from ..registry import all_kinds, get_kind
+
+
+def default_plan(rounds: int, kinds=None):
+    """`rounds` (kind key, difficulty) steps cycling through `kinds` (default: the practice kinds), harder as it goes."""
+    kinds = [get_kind(k) for k in kinds] if kinds else [k for k in all_kinds() if k.practice]
+    plan = []
+    for i in range(rounds):
+        kind = kinds[i % len(kinds)]
+        level = i * len(kind.difficulties) // rounds
+        plan.append((kind.key, kind.difficulties[level]))
+    return plan
+
+
+def problem_set(seed: int, plan):
+    """The problems for `plan`, the same every time for the same seed; no repeats within the set."""
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        seen = SeenSet(capacity=max(1, len(plan)))
+        problems = [fresh(lambda k=get_kind(k), d=d: k.create(d), seen) for k, d in plan]
+    finally:
+        random.setstate(state)
+    for p in problems:
+        p.miss()  # one feedback string, shared by every player who misses it
+    return problems
+
+
+def max_score(problems) -> int:
+    """Score for answering the whole set right in one streak."""
+    base = sum(XP_BY_DIFFICULTY.get(p.difficulty, 10) for p in problems)
+    return base + (len(problems) // STREAK_BONUS_EVERY) * STREAK_BONUS_POINTS
+
+
+class RankIndex:
+    def __init__(self, max_score: int):
+        self.size = max_score + 1
+        self._tree = [0] * (self.size + 1)  # Fenwick tree: players per score, 1-based
+        self._buckets = {}  # score -> {name: None}, in the order players reached it
+        self._scores = []   # distinct non-empty scores, ascending
+        self.players = 0
+
+    def _bump(self, score: int, delta: int):
+        i = score + 1
+        while i <= self.size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def _at_most(self, score: int) -> int:
+        """Players with score <= `score`."""
+        i, n = min(score, self.size - 1) + 1, 0
+        while i > 0:
+            n += self._tree[i]
+            i -= i & -i
+        return n
+
+    def _enter(self, name: str, score: int):
+        bucket = self._buckets.get(score)
+        if bucket is None:
+            bucket = self._buckets[score] = {}
+            insort(self._scores, score)
+        bucket[name] = None
+        self._bump(score, 1)
+
+    def _leave(self, name: str, score: int):
+        bucket = self._buckets[score]
+        del bucket[name]
+        if not bucket:
+            del self._buckets[score]
+            del self._scores[bisect_left(self._scores, score)]
+        self._bump(score, -1)
+
+    def add(self, name: str, score: int = 0):
+        self._enter(name, score)
+        self.players += 1
+
+    def move(self, name: str, old: int, new: int):
+        if old != new:
+            self._leave(name, old)
+            self._enter(name, new)
+
+    def rank(self, score: int) -> int:
+        """1 + players strictly ahead of `score` (equal scores share a rank)."""
+        return 1 + self.players - self._at_most(score)
+
+    def top(self, n: int = 10):
+        """[(name, score), ...] best first."""
+        out = []
+        for score in reversed(self._scores):
+            for name in self._buckets[score]:
+                out.append((name, score))
+                if len(out) >= n:
+                    return out
+        return out
+
+
+class Entrant:
+    __slots__ = ("name", "score", "correct", "streak", "index", "finished_at")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.score = 0
+        self.correct = 0
+        self.streak = 0
+        self.index = 0  # next problem to answer
+        self.finished_at = None
+
+
+class Tournament:
+    """
+    Scoring and ranking for one tournament. It does no I/O. The server feeds
+    it answers that are already graded, via record(). The caller makes the
+    problems with problem_set().
+    """
+
+    def __init__(self, tid: str, seed: int, plan, problems, seconds: float | None = None):
+        self.id = tid
+        self.seed = seed
+        self.plan = list(plan)
+        self.problems = problems
+        self.started = time.time()
+        self.ends_at = self.started + seconds if seconds else None
+        self.entrants = {}
+        self.ranking = RankIndex(max_score(problems))
+        self.version = 0  # bumped on every ranking change
+
+    @property
+    def total(self) -> int:
+        return len(self.problems)
+
+    def over(self, now: float | None = None) -> bool:
+        return self.ends_at is not None and (now or time.time()) >= self.ends_at
+
+    def join(self, name: str) -> Entrant:
+        """The player's entry; rejoining (a dropped connection) picks up where they left off."""
+        e = self.entrants.get(name)
+        if e is None:
+            e = self.entrants[name] = Entrant(name)
+            self.ranking.add(name)
+            self.version += 1
+        return e
+
+    def record(self, e: Entrant, ok: bool):
+        """Apply a graded answer to e's current problem; returns (points gained, streak bonus)."""
+        gained = bonus = 0
+        if ok:
+            gained = XP_BY_DIFFICULTY.get(self.problems[e.index].difficulty, 10)
+            e.streak += 1
+            e.correct += 1
+            if e.streak % STREAK_BONUS_EVERY == 0:
+                bonus = STREAK_BONUS_POINTS
+            self.ranking.move(e.name, e.score, e.score + gained + bonus)
+            e.score += gained + bonus
+            self.version += 1
+        else:
+            e.streak = 0
+        e.index += 1
+        if e.index >= self.total:
+            e.finished_at = time.time()
+        return gained, bonus
+
+    def state(self, e: Entrant) -> dict:
+        return {
+            "score": e.score,
+            "correct": e.correct,
+            "streak": e.streak,
+            "index": e.index,
+            "total": self.total,
+            "rank": self.ranking.rank(e.score),
+            "players": self.ranking.players,
+        }
+
+    def standings(self, n: int = 10) -> dict:
+        return {
+            "id": self.id,
+            "players": self.ranking.players,
+            "top": [{"rank": self.ranking.rank(s), "player": name, "score": s}
+                    for name, s in self.ranking.top(n)],
+            "ends_in": None if self.ends_at is None else max(0.0, round(self.ends_at - time.time(), 1)),
+        }
@@ -0,0 +1,420 @@
+# calcduo/events.py
+"""
+Answer-event log: one compact row per graded answer, stored by column.
+
+Columns: t (unix time), ms (time to answer, NaN if unknown), problem
+(dedup.problem_key), ok, and the dictionary-encoded strings player, kind,
+difficulty and answer (cut to MAX_ANSWER characters).
+
+EventLog.emit() writes one row into the current batch. A batch is
+preallocated NumPy columns plus one intern table per string column, so an
+event costs a few array stores and dict lookups. emit() hands a full batch
+(FLUSH_ROWS) to a writer thread and moves on to the next free batch; the
+writer thread also takes the current batch once it is FLUSH_SECONDS old,
+on a timer, so a quiet log still reaches the disk without every late
+answer closing a batch. There are RING_BATCHES batches in a ring; the
+writer hands each one back once its segment is on disk. If the writer
+falls a whole ring behind, events are dropped and counted: answering never
+waits on the disk. emit() is meant to be called from one thread (the event
+loop, or the CLI); a lock keeps it apart from the writer's timer.
+
+Timed flushes leave small segments behind. Once there are COMPACT_SEGMENTS
+segments under FLUSH_ROWS rows (counting any left by earlier runs), the
+writer merges them into one, so the number of files grows with the rows
+logged, not with the number of quiet periods.
+
+Each flushed batch becomes one segment file, events-<n>.cde (little-endian):
+  header   "CDE1", row count, JSON length
+  JSON     {"columns": [[name, dtype, offset], ...], "dicts": {column: [value, ...]}}
+  columns  each column's raw array, 8-byte aligned
+The intern table of a batch is the segment's dictionary, as in Parquet's
+dictionary encoding.
+
+EventStore maps segments of FLUSH_ROWS rows or more read-only, each column
+as a NumPy view, and reads smaller ones into memory, so open files track
+full segments only. It answers aggregate queries with whole-column
+operations, and forgets segments that compaction has merged away. Rows
+still in the current batch of a live EventLog can be included; rows in a
+batch on its way to disk show up once its segment is written.
+"""
+import contextlib
+import glob
+import json
+import math
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+from .config import EVENTS_DIR
+
+FLUSH_ROWS = int(os.environ.get("CALCDUO_EVENTS_ROWS", "16384"))
+FLUSH_SECONDS = float(os.environ.get("CALCDUO_EVENTS_FLUSH_S", "10"))
+RING_BATCHES = 4
+COMPACT_SEGMENTS = 16  # small segments merged into one by the writer
+MAX_ANSWER = 64
+
+COLUMNS = (  # widest first, so every column stays aligned
+    ("t", np.float64), ("problem", np.uint64), ("ms", np.float32),
+    ("player", np.uint32), ("answer", np.uint32), ("kind", np.uint16),
+    ("difficulty", np.uint16), ("ok", np.bool_),
+)
+STRINGS = ("player", "kind", "difficulty", "answer")
+
+_MAGIC = b"CDE1"
+_HEADER = struct.Struct("<4sII")
+_PATTERN = "events-*.cde"
+
+
+class _Batch:
+    __slots__ = ("cols", "dicts", "n", "started")
+
+    def __init__(self, rows: int):
+        self.cols = {name: np.empty(rows, dtype) for name, dtype in COLUMNS}
+        self.dicts = {name: {} for name in STRINGS}  # value -> code, codes in insertion order
+        self.n = 0
+        self.started = 0.0
+
+    def reset(self):
+        for d in self.dicts.values():
+            d.clear()
+        self.n = 0
+
+    def view(self):
+        """The filled rows as (columns, dictionaries) copies, for queries."""
+        n = self.n
+        return ({k: v[:n].copy() for k, v in self.cols.items()},
+                {k: list(d) for k, d in self.dicts.items()})
+
+
+def _code(d: dict, value: str) -> int:
+    code = d.get(value)
+    if code is None:
+        code = d[value] = len(d)
+    return code
+
+
+def _segment_rows(path: str) -> int:
+    with open(path, "rb") as f:
+        return _HEADER.unpack(f.read(_HEADER.size))[1]
+
+
+def merge_parts(parts):
+    """(columns, dictionaries, rows) of several (columns, dictionaries) parts as one, strings re-encoded."""
+    dicts = {name: {} for name in STRINGS}
+    cols = {name: [] for name, _ in COLUMNS}
+    for c, d in parts:
+        for name, _ in COLUMNS:
+            col = c[name]
+            if name in dicts:
+                col = np.array([_code(dicts[name], v) for v in d[name]], dtype=col.dtype)[col]
+            cols[name].append(col)
+    cols = {name: np.concatenate(v) for name, v in cols.items()}
+    return cols, {k: list(d) for k, d in dicts.items()}, len(cols["ok"])
+
+
+def write_segment(path: str, cols: dict, dicts: dict, n: int):
+    layout, off = [], 0
+    for name, dtype in COLUMNS:
+        layout.append([name, np.dtype(dtype).str, off])
+        off += n * np.dtype(dtype).itemsize
+        off += -off % 8
+    meta = json.dumps({"columns": layout, "dicts": dicts}).encode()
+    meta += b" " * (-(_HEADER.size + len(meta)) % 8)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, n, len(meta)))
+        f.write(meta)
+        for name, _ in COLUMNS:
+            raw = cols[name][:n].tobytes()
+            f.write(raw + b"\0" * (-len(raw) % 8))
+    os.replace(tmp, path)
+
+
+class EventLog:
+    def __init__(self, path: str, rows: int = FLUSH_ROWS, flush_seconds: float = FLUSH_SECONDS,
+                 ring: int = RING_BATCHES):
+        self.path = path
+        self.rows = rows
+        self.flush_seconds = flush_seconds
+        os.makedirs(path, exist_ok=True)
+        files = sorted(glob.glob(os.path.join(path, _PATTERN)))
+        self._seq = 1 + max((int(os.path.basename(f)[7:-4]) for f in files), default=-1)
+        self._small = [f for f in files if _segment_rows(f) < rows]  # the writer merges these
+        self._free = deque(_Batch(rows) for _ in range(ring - 1))
+        self._batch = _Batch(rows)
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.RLock()  # current batch and segment files: emit() vs the writer thread
+        self._writer = None
+        self.emitted = 0
+        self.dropped = 0
+        self.segments = 0
+        self.merges = 0
+
+    @classmethod
+    def open(cls, path: str = EVENTS_DIR):
+        """An EventLog writing under `path`, or None if logging is off (CALCDUO_EVENTS empty)."""
+        return cls(path) if path else None
+
+    def emit(self, player: str, kind: str, difficulty: str, ok: bool, answer: str = "",
+             ms: float = math.nan, problem: int = 0):
+        with self._lock:
+            b = self._batch
+            if b is None:
+                b = self._batch = self._free.popleft() if self._free else None
+                if b is None:
+                    self.dropped += 1
+                    return
+            now = time.time()
+            i = b.n
+            if not i:
+                b.started = now
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="calcduo-events", daemon=True)
+                    self._writer.start()
+            c, d = b.cols, b.dicts
+            c["t"][i] = now
+            c["problem"][i] = problem
+            c["ms"][i] = ms
+            c["player"][i] = _code(d["player"], player or "")
+            c["answer"][i] = _code(d["answer"], answer[:MAX_ANSWER])
+            c["kind"][i] = _code(d["kind"], kind)
+            c["difficulty"][i] = _code(d["difficulty"], difficulty)
+            c["ok"][i] = ok
+            b.n = i + 1
+            self.emitted += 1
+            if b.n == self.rows:
+                self._hand_off()
+
+    def _hand_off(self):
+        b, self._batch = self._batch, None
+        self._queue.put((self._seq, b))
+        self._seq += 1
+
+    def _until_due(self) -> float:
+        """Seconds until the current batch is FLUSH_SECONDS old (a full period if it is empty)."""
+        with self._lock:
+            b = self._batch
+            if b is None or not b.n:
+                return self.flush_seconds
+            return max(0.0, b.started + self.flush_seconds - time.time())
+
+    def _flush_due(self):
+        with self._lock:
+            b = self._batch
+            if b is not None and b.n and time.time() - b.started >= self.flush_seconds:
+                self._hand_off()
+
+    def _write_loop(self):
+        self._compact()
+        while True:
+            try:
+                item = self._queue.get(timeout=self._until_due())
+            except queue.Empty:
+                self._flush_due()
+                continue
+            if item is None:
+                return
+            seq, b = item
+            path = os.path.join(self.path, f"events-{seq:08d}.cde")
+            write_segment(path, b.cols, {k: list(d) for k, d in b.dicts.items()}, b.n)
+            self.segments += 1
+            if b.n < self.rows:
+                self._small.append(path)
+            b.reset()
+            self._free.append(b)
+            self._compact()
+
+    def _compact(self):
+        """Merge the small segments into one once there are COMPACT_SEGMENTS of them (writer thread)."""
+        if len(self._small) < COMPACT_SEGMENTS:
+            return
+        cols, dicts, n = merge_parts([(s.cols, s.dicts) for s in map(Segment, self._small)])
+        with self._lock:
+            seq, self._seq = self._seq, self._seq + 1
+        path = os.path.join(self.path, f"events-{seq:08d}.cde")
+        tmp = os.path.join(self.path, f"merge-{seq:08d}")  # outside _PATTERN until the swap
+        write_segment(tmp, cols, dicts, n)
+        with self._lock:  # an EventStore on this log never sees both the parts and the merge
+            os.replace(tmp, path)
+            for f in self._small:
+                os.remove(f)
+        self._small = [path] if n < self.rows else []
+        self.merges += 1
+
+    def batches(self):
+        """The ring's preallocated batches that are not with the writer (for memory accounting)."""
+        with self._lock:
+            return [b for b in (self._batch, *self._free) if b is not None]
+
+    def pending(self):
+        """The current batch's rows (columns, dictionaries), or None if it is empty."""
+        with self._lock:
+            b = self._batch
+            return b.view() if b is not None and b.n else None
+
+    def flush(self):
+        """Send the current batch to the writer, however full."""
+        with self._lock:
+            if self._batch is not None and self._batch.n:
+                self._hand_off()
+
+    def close(self):
+        """Flush and wait for every segment to be written."""
+        self.flush()
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+
+class Segment:
+    __slots__ = ("path", "n", "cols", "dicts", "_mm")
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if _HEADER.unpack(f.read(_HEADER.size))[1] < FLUSH_ROWS:
+                f.seek(0)
+                self._mm = f.read()  # small: no mapping, so no file descriptor kept open
+            else:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.n, meta_len = _HEADER.unpack_from(self._mm)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not an event segment")
+        meta = json.loads(self._mm[_HEADER.size:_HEADER.size + meta_len])
+        base = _HEADER.size + meta_len
+        self.cols = {name: np.frombuffer(self._mm, dtype=dtype, count=self.n, offset=base + off)
+                     for name, dtype, off in meta["columns"]}
+        self.dicts = meta["dicts"]
+
+
+def _group_keys(cols, dicts, by, mask):
+    """(local combined key per masked row, the dictionaries' sizes) for grouping by string columns."""
+    key = np.zeros(int(mask.sum()), dtype=np.int64)
+    sizes = []
+    for name in by:
+        size = max(1, len(dicts[name]))
+        key = key * size + cols[name][mask]
+        sizes.append(size)
+    return key, sizes
+
+
+def _labels(dicts, by, sizes, k):
+    out = []
+    for name, size in zip(reversed(by), reversed(sizes)):
+        k, code = divmod(int(k), size)
+        out.append(dicts[name][code])
+    return tuple(reversed(out))
+
+
+class EventStore:
+    """Aggregate queries over an event directory (and optionally a live log's current batch)."""
+
+    def __init__(self, path: str = EVENTS_DIR, log: EventLog | None = None):
+        self.path = path
+        self.log = log
+        self._segments = {}  # file -> Segment
+        self._fixed = None
+
+    def frozen(self):
+        """A store over what is there now, live rows copied: safe to query from another thread."""
+        store = EventStore(self.path)
+        store._fixed = self.parts()
+        return store
+
+    def parts(self):
+        """(columns, dictionaries) for every segment, new ones mapped on the way, then the live rows."""
+        if self._fixed is not None:
+            return self._fixed
+        with self.log._lock if self.log is not None else contextlib.nullcontext():
+            files = sorted(glob.glob(os.path.join(self.path, _PATTERN)))
+            for f in self._segments.keys() - set(files):  # merged away by the writer
+                del self._segments[f]
+            for f in files:
+                if f not in self._segments:
+                    self._segments[f] = Segment(f)
+            live = self.log.pending() if self.log is not None else None
+        out = [(s.cols, s.dicts) for s in self._segments.values() if s.n]
+        if live is not None:
+            out.append(live)
+        return out
+
+    def count(self) -> int:
+        return sum(len(cols["ok"]) for cols, _ in self.parts())
+
+    def _filter(self, cols, dicts, since, where):
+        mask = np.ones(len(cols["ok"]), dtype=bool)
+        if since is not None:
+            mask &= cols["t"] >= since
+        for name, value in where.items():
+            if value is None:
+                continue
+            if value not in dicts[name]:
+                return None
+            mask &= cols[name] == dicts[name].index(value)
+        return mask
+
+    def accuracy(self, by=("kind", "difficulty"), since=None, **where):
+        """[{<by>..., attempts, correct, accuracy}], largest groups first."""
+        totals = {}
+        for cols, dicts in self.parts():
+            mask = self._filter(cols, dicts, since, where)
+            if mask is None:
+                continue
+            key, sizes = _group_keys(cols, dicts, by, mask)
+            attempts = np.bincount(key)
+            correct = np.bincount(key, weights=cols["ok"][mask])
+            for k in np.flatnonzero(attempts):
+                label = _labels(dicts, by, sizes, k)
+                a, c = totals.get(label, (0, 0))
+                totals[label] = (a + int(attempts[k]), c + int(correct[k]))
+        rows = [{**dict(zip(by, label)), "attempts": a, "correct": c, "accuracy": round(c / a, 4)}
+                for label, (a, c) in totals.items()]
+        return sorted(rows, key=lambda r: -r["attempts"])
+
+    def time_to_answer(self, by=("kind", "difficulty"), q=(50, 90), since=None, **where):
+        """[{<by>..., answers, p50_ms, p90_ms...}] over rows with a known time to answer."""
+        chunks = {}
+        for cols, dicts in self.parts():
+            mask = self._filter(cols, dicts, since, where)
+            if mask is None:
+                continue
+            mask &= np.isfinite(cols["ms"])
+            if not mask.any():  # e.g. only CLI / restored-problem rows, or all older than since
+                continue
+            key, sizes = _group_keys(cols, dicts, by, mask)
+            ms = cols["ms"][mask]
+            order = np.argsort(key, kind="stable")
+            key, ms = key[order], ms[order]
+            starts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+            for s, e in zip(starts, np.r_[starts[1:], len(key)]):
+                chunks.setdefault(_labels(dicts, by, sizes, key[s]), []).append(ms[s:e])
+        rows = []
+        for label, parts in chunks.items():
+            values = np.concatenate(parts)
+            pct = np.percentile(values, q)
+            rows.append({**dict(zip(by, label)), "answers": len(values),
+                         **{f"p{p}_ms": round(float(v), 1) for p, v in zip(q, pct)}})
+        return sorted(rows, key=lambda r: -r["answers"])
+
+    def common_wrong(self, n: int = 10, since=None, problem=None, **where):
+        """The n most frequent wrong answers, [{answer, count}], optionally for one kind / problem."""
+        counts = Counter()
+        for cols, dicts in self.parts():
+            mask = self._filter(cols, dicts, since, where)
+            if mask is None:
+                continue
+            mask &= ~cols["ok"]
+            if problem is not None:
+                mask &= cols["problem"] == np.uint64(problem)
+            hist = np.bincount(cols["answer"][mask])
+            answers = dicts["answer"]
+            for code in np.flatnonzero(hist):
+                counts[answers[code]] += int(hist[code])
+        return [{"answer": a, "count": c} for a, c in counts.most_common(n)]
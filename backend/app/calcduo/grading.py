@@ -0,0 +1,100 @@
+# calcduo/grading.py
+"""
+Bulk grading for the polynomial kinds (contest grading, thousands of answers at once).
+
+A batch of polynomial problems becomes a table of specs:
+- a kind code per row
+- a coefficient matrix (highest -> constant, left-padded with zeros to the
+  widest degree)
+- two point columns: the approach or evaluation point, or the integration
+  bounds a and b
+
+expected_values() evaluates every row in one NumPy pass, using Horner over
+the coefficient columns. It follows the same operation order as
+eval_poly / eval_deriv / eval_integral, so it gives bit-for-bit the values the
+problems store as `.value`. BulkGrader parses all answers in one conversion
+and compares them with the single-answer policy, |answer - expected| <=
+ANSWER_TOL. Non-numeric answers are wrong. Problems of other kinds fall back
+to their own check_answer.
+"""
+import numpy as np
+
+from .config import ANSWER_TOL
+from .utils import safe_float
+
+LIMIT, DERIV_POINT, DEF_INT = 0, 1, 2
+KIND_CODES = {"limit": LIMIT, "deriv_point": DERIV_POINT, "def_int": DEF_INT}
+
+
+def spec_table(problems):
+    """(codes, coeffs, p, q) for polynomial problems; see the module docstring."""
+    n = len(problems)
+    codes = [KIND_CODES[pr.kind] for pr in problems]
+    p = np.fromiter((pr.x0 if c == DERIV_POINT else pr.a for pr, c in zip(problems, codes)), float, n)
+    q = np.fromiter((pr.b if c == DEF_INT else 0 for pr, c in zip(problems, codes)), float, n)
+    lens = np.fromiter((len(pr.coeffs) for pr in problems), np.intp, n)
+    width = int(lens.max()) if n else 1
+    # coefficient arrays are array("i"): join their buffers, then scatter right-aligned into the matrix
+    flat = np.frombuffer(b"".join([pr.coeffs.tobytes() for pr in problems]), dtype=np.intc)
+    rows = np.repeat(np.arange(n), lens)
+    cols = np.arange(len(flat)) - np.repeat(np.cumsum(lens) - width, lens)
+    coeffs = np.zeros((n, width))
+    coeffs[rows, cols] = flat
+    return np.array(codes, dtype=np.int8), coeffs, p, q
+
+
+def expected_values(codes, coeffs, p, q):
+    """The exact answer of every row: P(p), P'(p) or the integral of P from p to q."""
+    width = coeffs.shape[1]
+    # the antiderivative's coefficients c/(k+1); only def_int rows use them
+    anti = coeffs / np.arange(width, 0, -1)
+    acc = np.zeros(len(codes))
+    dacc = np.zeros(len(codes))
+    fa = np.zeros(len(codes))
+    fb = np.zeros(len(codes))
+    for j in range(width):
+        dacc = dacc * p + acc
+        acc = acc * p + coeffs[:, j]
+        fa = fa * p + anti[:, j]
+        fb = fb * q + anti[:, j]
+    return np.where(codes == LIMIT, acc,
+                    np.where(codes == DERIV_POINT, dacc, fb * q - fa * p))
+
+
+def parse_answers(answers):
+    """Answers as float64 (NaN where an answer isn't a number)."""
+    try:
+        return np.array(answers, dtype=float)
+    except (TypeError, ValueError):
+        return np.array([np.nan if (v := safe_float(a)) is None else v for a in answers])
+
+
+class BulkGrader:
+    """Expected values for a fixed problem set, computed once; grade() takes one answer per problem."""
+
+    def __init__(self, problems):
+        self.problems = list(problems)
+        fast = [i for i, pr in enumerate(self.problems) if pr.kind in KIND_CODES]
+        self._fast = np.array(fast, dtype=np.intp)
+        self._slow = [i for i, pr in enumerate(self.problems) if pr.kind not in KIND_CODES]
+        self.expected = expected_values(*spec_table([self.problems[i] for i in fast]))
+
+    def __len__(self):
+        return len(self.problems)
+
+    def grade(self, answers, tol: float = ANSWER_TOL):
+        """Verdicts (bool array) for answers[i] against problems[i]."""
+        if len(answers) != len(self.problems):
+            raise ValueError(f"expected {len(self.problems)} answers, got {len(answers)}")
+        ok = np.zeros(len(self.problems), dtype=bool)
+        if len(self._fast):
+            values = parse_answers([answers[i] for i in self._fast])
+            ok[self._fast] = np.abs(values - self.expected) <= tol  # NaN compares False
+        for i in self._slow:
+            ok[i] = self.problems[i].check_answer(answers[i])[0]
+        return ok
+
+
+def grade_bulk(problems, answers, tol: float = ANSWER_TOL):
+    """One-shot BulkGrader(problems).grade(answers)."""
+    return BulkGrader(problems).grade(answers, tol)
@@ -6,13 +6,20 @@ class Leaderboard:
     def __init__(self, path=LEADERBOARD_FILE):
         self.path = path
         self.data = load_json(path, {})
+        self.version = 0  # bumped on every change; lets readers cache rendered views
 
     def add_score(self, player_name: str, score: int):
-        rec = self.data.get(player_name, {"best": 0, "total": 0, "plays": 0})
-        rec["best"] = max(rec["best"], score)
-        rec["total"] += score
-        rec["plays"] += 1
-        self.data[player_name] = rec
+        self.add_scores([(player_name, score)])
+
+    def add_scores(self, results):
+        """Record many (player, score) results with a single save (tournament results)."""
+        for player_name, score in results:
+            rec = self.data.get(player_name, {"best": 0, "total": 0, "plays": 0})
+            rec["best"] = max(rec["best"], score)
+            rec["total"] += score
+            rec["plays"] += 1
+            self.data[player_name] = rec
+        self.version += 1
         save_json(self.path, self.data)
 
     def top(self, n=10):
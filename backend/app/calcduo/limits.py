@@ -0,0 +1,152 @@
+# calcduo/limits.py
+"""
+Limits of N(x) / D(x) at a point a where both vanish (0/0), exactly.
+
+N is a sum of term specs (code, A, p, q): powers, and sin/cos/e^ of a
+linear argument that is 0 at a (p a + q = 0). D is a polynomial with
+integer coefficients, highest -> constant, with D(a) = 0.
+
+The exact value comes from coefficient arrays alone:
+- divide_out() strips the factor (x - a) from D by synthetic division,
+  as many times as it divides: D = (x - a)^k D_red, D_red(a) != 0
+- taylor() gives N's coefficients in powers of (x - a). The power terms are
+  summed into one polynomial, whose Taylor coefficients are the remainders
+  of repeated synthetic division. sin/cos/e^(p(x - a)) contribute
+  A p^j / j! (with sin's and cos's sign pattern).
+- N / D -> c_k / D_red(a) when c_0 .. c_{k-1} all vanish. That is the
+  factor cancellation written out: N = (x - a)^k (c_k + ...). A c_j != 0
+  for j < k means the limit is infinite or does not exist (ValueError).
+Everything is int/Fraction arithmetic on a few coefficients, so a limit
+costs microseconds and never touches SymPy.
+
+extrapolate() is the numeric cross-check. It evaluates N / D on both sides
+of a at a geometric ladder of steps h, all in one vectorized pass. The
+symmetric mean (f(a + h) + f(a - h)) / 2 = L + c2 h^2 + c4 h^4 + ... for an
+analytic f, so a Richardson table in h^2 removes the error terms one order
+at a time. The first step keeps clear of the other roots of D_red.
+"""
+import math
+from fractions import Fraction
+
+import numpy as np
+
+from .quad import spec_values
+from .solution import RULE_COS, RULE_EXP, RULE_POWER, RULE_SIN
+
+H0 = 0.25      # first step of the extrapolation ladder
+LEVELS = 7     # steps H0, H0/2, ..., H0/2^(LEVELS-1)
+
+_SIN_SIGNS = (0, 1, 0, -1)  # d^j/du^j sin(u) at u = 0
+_COS_SIGNS = (1, 0, -1, 0)
+
+
+def times_linear(coeffs, a):
+    """The coefficients of P(x) (x - a)."""
+    out = list(coeffs) + [0]
+    for i in range(len(coeffs)):
+        out[i + 1] -= a * coeffs[i]
+    return out
+
+
+def expand(factor_power, a, coeffs):
+    """(x - a)^factor_power P(x), expanded."""
+    out = list(coeffs)
+    for _ in range(factor_power):
+        out = times_linear(out, a)
+    return out
+
+
+def synthetic_division(coeffs, a):
+    """(quotient, remainder) of P(x) / (x - a); the remainder is P(a)."""
+    acc = 0
+    quotient = []
+    for c in coeffs:
+        acc = acc * a + c
+        quotient.append(acc)
+    remainder = quotient.pop()
+    return quotient, remainder
+
+
+def divide_out(coeffs, a):
+    """(Q, k) with P(x) = (x - a)^k Q(x) and Q(a) != 0; P must not be 0."""
+    k = 0
+    while len(coeffs) > 1:
+        quotient, remainder = synthetic_division(coeffs, a)
+        if remainder:
+            break
+        coeffs, k = quotient, k + 1
+    return list(coeffs), k
+
+
+def poly_part(specs):
+    """The power terms of a spec sum as one coefficient list (highest -> constant)."""
+    degree = max((p for code, _, p, _ in specs if code == RULE_POWER), default=0)
+    coeffs = [0] * (degree + 1)
+    for code, A, p, _ in specs:
+        if code == RULE_POWER:
+            coeffs[degree - p] += A
+    return coeffs
+
+
+def taylor(specs, a, order: int):
+    """[c_0 .. c_order] with N(x) = sum c_j (x - a)^j + ...; ValueError if a term isn't exact at a."""
+    out = [Fraction(0)] * (order + 1)
+    coeffs = poly_part(specs)
+    for j in range(order + 1):
+        if not coeffs:
+            break
+        coeffs, out[j] = synthetic_division(coeffs, a)
+        out[j] = Fraction(out[j])
+    for code, A, p, q in specs:
+        if code == RULE_POWER:
+            continue
+        if p * a + q != 0:
+            raise ValueError(f"Term argument {p}x + {q} is not 0 at x = {a}.")
+        if code == RULE_SIN:
+            signs = _SIN_SIGNS
+        elif code == RULE_COS:
+            signs = _COS_SIGNS
+        elif code == RULE_EXP:
+            signs = (1, 1, 1, 1)
+        else:
+            raise ValueError(f"No exact series for term code {code}.")
+        for j in range(order + 1):
+            if signs[j % 4]:
+                out[j] += Fraction(signs[j % 4] * A * p ** j, math.factorial(j))
+    return out
+
+
+def limit(num_specs, den, a):
+    """(value, k, c_k, D_red) for lim x->a N/D, the value a Fraction; ValueError if it is not finite."""
+    den_red, k = divide_out(den, a)
+    series = taylor(num_specs, a, k)
+    if any(series[:k]):
+        raise ValueError(f"The limit at x = {a} is not finite.")
+    d = synthetic_division(den_red, a)[1]
+    return series[k] / d, k, series[k], den_red
+
+
+def ratio_values(num_specs, den, X):
+    """N(X) / D(X), vectorized."""
+    with np.errstate(all="ignore"):
+        return spec_values(num_specs, X) / np.polyval(np.asarray(den, dtype=np.float64), X)
+
+
+def first_step(den_red, a, h0: float = H0) -> float:
+    """h0, or half the distance from a to D_red's nearest root if that is smaller."""
+    if len(den_red) < 2:
+        return h0
+    roots = np.roots(np.asarray(den_red, dtype=np.float64))
+    return min(h0, float(np.abs(roots - a).min()) / 2)
+
+
+def extrapolate(num_specs, den, a, h0: float = H0, levels: int = LEVELS):
+    """(estimate, error estimate) of lim x->a N/D by Richardson extrapolation of symmetric means."""
+    h = h0 * 0.5 ** np.arange(levels)
+    y = ratio_values(num_specs, den, np.concatenate((a + h, a - h)))
+    col = (y[:levels] + y[levels:]) / 2
+    diag = [col[-1]]
+    for m in range(1, levels):
+        col = col[1:] + (col[1:] - col[:-1]) / (4 ** m - 1)
+        diag.append(col[-1])
+    return float(diag[-1]), float(abs(diag[-1] - diag[-2]))
@@ -0,0 +1,264 @@
+# calcduo/memory.py
+"""
+Memory accounting: what the long-lived stores hold, SymPy's caches, and
+tracemalloc on demand.
+
+- deep_size() follows an object's containers, __dict__ and __slots__ and
+  adds up sys.getsizeof. Objects reached twice are counted once. Classes,
+  modules and functions are not followed.
+- estimate() sizes a big container from a random sample of its entries
+  (ESTIMATE_SAMPLE of them) and scales up by the entry count. Anything the
+  entries share is counted once per sample, so the estimate leans high.
+- Stores keeps named getters for the stores a process holds, and the
+  lru_cache'd functions, and reports them all at once.
+- SymPy memoizes through @cacheit: one lru_cache per cached function, well
+  over a hundred of them, each holding up to SYMPY_CACHE_SIZE expressions
+  (1000 by default, unbounded if set to None). sympy_cache() reports the
+  entries, hits and misses without importing SymPy. SymPyCachePolicy
+  clears them all once their total passes SYMPY_CACHE_MAX entries. A clear
+  costs later calls some cache misses and nothing else.
+- Tracer takes tracemalloc snapshots on demand and diffs each one against
+  the one before, by line. tracemalloc slows every allocation while it
+  runs, so it only runs between start() and stop().
+
+rss_bytes() reads /proc/self/statm. It returns None where there is no
+/proc.
+"""
+import gc
+import os
+import random
+import sys
+import tracemalloc
+from array import array
+from collections import deque
+from types import BuiltinFunctionType, FunctionType, ModuleType
+
+import numpy as np
+
+ADMIN = os.environ.get("CALCDUO_MEMORY_ADMIN", "0") == "1"  # main.py adds the /debug/memory routes
+SYMPY_CACHE_MAX = int(os.environ.get("CALCDUO_SYMPY_CACHE_MAX", "20000"))  # entries, all caches; 0 = never clear
+SYMPY_CHECK_EVERY = 32  # policy ticks between looks at the cache sizes
+ESTIMATE_SAMPLE = 256
+TRACE_FRAMES = 8
+
+_SKIP = (type, ModuleType, FunctionType, BuiltinFunctionType)
+_LEAVES = (str, bytes, bytearray, int, float, complex, bool, array, memoryview, type(None))
+_PAGE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes():
+    """Resident set size of this process, or None if it can't be read."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _slots(cls):
+    for klass in cls.__mro__:
+        slots = klass.__dict__.get("__slots__", ())
+        yield from (slots,) if isinstance(slots, str) else slots
+
+
+def deep_size(obj, seen=None) -> int:
+    """Bytes held by obj and everything it reaches (see the module docstring)."""
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _SKIP):
+            continue
+        seen.add(id(o))
+        total += sys.getsizeof(o)
+        if isinstance(o, _LEAVES):
+            continue
+        if isinstance(o, np.ndarray):
+            if o.base is not None:  # a view: the data belongs to the base
+                stack.append(o.base)
+            continue
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            stack.extend(o)
+        else:
+            d = getattr(o, "__dict__", None)
+            if d is not None:
+                stack.append(d)
+            for name in _slots(type(o)):
+                v = getattr(o, name, None)
+                if v is not None:
+                    stack.append(v)
+    return total
+
+
+def estimate(container, sample: int = ESTIMATE_SAMPLE) -> dict:
+    """{entries, bytes, sampled} for a dict, list, deque or set; bytes come from a sample when it's big."""
+    n = len(container)
+    if n <= sample:
+        return {"entries": n, "bytes": deep_size(container), "sampled": False}
+    items = list(container.items()) if isinstance(container, dict) else list(container)
+    shell = sys.getsizeof(container)
+    seen = {id(container)}
+    picked = random.sample(items, sample)
+    if isinstance(container, dict):  # key and value, not the (key, value) tuple items() made
+        per_entry = sum(deep_size(k, seen) + deep_size(v, seen) for k, v in picked) / sample
+    else:
+        per_entry = sum(deep_size(item, seen) for item in picked) / sample
+    return {"entries": n, "bytes": int(shell + per_entry * n), "sampled": True}
+
+
+def cache_info(fn) -> dict:
+    """entries / maxsize / hits / misses of an lru_cache'd function."""
+    info = fn.cache_info()
+    return {"entries": info.currsize, "maxsize": info.maxsize, "hits": info.hits, "misses": info.misses}
+
+
+class Stores:
+    """Named stores and caches of one process, reported together by report()."""
+
+    def __init__(self):
+        self._stores = {}  # name -> () -> container
+        self._caches = {}  # name -> lru_cache'd function
+
+    def track(self, name: str, get):
+        """get() returns the container to size (called on every report, so it may change)."""
+        self._stores[name] = get
+
+    def track_cache(self, name: str, fn):
+        self._caches[name] = fn
+
+    def report(self, sample: int = ESTIMATE_SAMPLE) -> dict:
+        gc.collect()
+        stores = {name: estimate(get(), sample) for name, get in self._stores.items()}
+        return {
+            "rss_bytes": rss_bytes(),
+            "stores": stores,
+            "stores_bytes": sum(s["bytes"] for s in stores.values()),
+            "caches": {name: cache_info(fn) for name, fn in self._caches.items()},
+            "sympy": sympy_cache(),
+            "gc": {"objects": len(gc.get_objects()), "counts": gc.get_count()},
+        }
+
+
+def _sympy_caches():
+    """SymPy's cached functions, or [] if this process hasn't imported SymPy."""
+    mod = sys.modules.get("sympy.core.cache")
+    return mod.CACHE if mod is not None else []
+
+
+def sympy_cache(top: int = 5) -> dict:
+    """Entries, hits and misses over SymPy's caches, with the largest few by entries."""
+    rows = []
+    for fn in _sympy_caches():
+        info = fn.cache_info()
+        rows.append((info.currsize, info.hits, info.misses, info.maxsize,
+                     f"{fn.__module__}.{fn.__qualname__}"))
+    rows.sort(reverse=True)
+    return {
+        "loaded": "sympy" in sys.modules,
+        "functions": len(rows),
+        "entries": sum(r[0] for r in rows),
+        "hits": sum(r[1] for r in rows),
+        "misses": sum(r[2] for r in rows),
+        "maxsize_each": rows[0][3] if rows else None,
+        "top": [{"function": name, "entries": n} for n, _, _, _, name in rows[:top] if n],
+    }
+
+
+def sympy_cache_entries() -> int:
+    return sum(fn.cache_info().currsize for fn in _sympy_caches())
+
+
+def clear_sympy_cache() -> int:
+    """Empty every SymPy cache; returns the entries dropped."""
+    entries = sympy_cache_entries()
+    if entries:
+        sys.modules["sympy.core.cache"].clear_cache()
+    return entries
+
+
+class SymPyCachePolicy:
+    """Clears SymPy's caches whenever their total passes max_entries, checked every `every` ticks."""
+
+    def __init__(self, max_entries: int = SYMPY_CACHE_MAX, every: int = SYMPY_CHECK_EVERY):
+        self.max_entries = max_entries
+        self.every = every
+        self.ticks = 0
+        self.clears = 0
+        self.cleared_entries = 0
+        self.peak_entries = 0
+
+    def tick(self):
+        """Call once per unit of SymPy work (a worker job, a CLI question)."""
+        self.ticks += 1
+        if self.max_entries and self.ticks % self.every == 0:
+            self.check()
+
+    def check(self) -> bool:
+        entries = sympy_cache_entries()
+        self.peak_entries = max(self.peak_entries, entries)
+        if entries <= self.max_entries:
+            return False
+        self.cleared_entries += clear_sympy_cache()
+        self.clears += 1
+        return True
+
+    def report(self) -> dict:
+        return {"max_entries": self.max_entries, "ticks": self.ticks, "clears": self.clears,
+                "cleared_entries": self.cleared_entries, "peak_entries": self.peak_entries}
+
+
+# One per process: the API's workers and the CLI tick it
+SYMPY_POLICY = SymPyCachePolicy()
+
+
+class Tracer:
+    """tracemalloc on demand: start(), then snapshot() diffs against the previous snapshot."""
+
+    def __init__(self, frames: int = TRACE_FRAMES):
+        self.frames = frames
+        self._last = None
+        self.snapshots = 0
+
+    @property
+    def running(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._last = self._take()
+        self.snapshots = 1
+
+    def stop(self):
+        self._last = None
+        tracemalloc.stop()
+
+    def _take(self):
+        gc.collect()
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    def snapshot(self, top: int = 20, group: str = "lineno") -> dict:
+        """Traced totals now, and the top allocation sites by growth since the last snapshot."""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc isn't running; start() it first.")
+        snap = self._take()
+        stats = snap.compare_to(self._last, group)
+        self._last = snap
+        self.snapshots += 1
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "growth_bytes": sum(s.size_diff for s in stats),
+            "top": [{"where": str(s.traceback[0]) if group != "traceback" else s.traceback.format(),
+                     "size_diff": s.size_diff, "size": s.size,
+                     "count_diff": s.count_diff, "count": s.count}
+                    for s in stats[:top]],
+        }
@@ -0,0 +1,224 @@
+# calcduo/plot.py
+"""
+Plots of f and f' for a problem, sampled with NumPy and downsampled with LTTB.
+
+f and f' are evaluated straight from the problem's own compact form, never
+point by point through SymPy:
+- term-spec kinds (deriv_form): each spec and each of its result terms
+  (solution.term_result) becomes one vectorized expression
+- polynomial kinds: np.polyval over the coefficients and their derivative
+- 0/0 limit kinds (limit_form): term specs over a polynomial, with f' by
+  the quotient rule
+Both curves are sampled on a DENSE-point grid over a window around the
+interesting point (x0, the limit point, the integration bounds), or
+[-WINDOW, WINDOW]. The window is clipped to ln(px + q)'s domain, px + q > 0,
+or moved onto it when the two don't overlap.
+
+Gaps are NaN. They cover points outside the domain, and values far outside
+the bulk of the curve: the pole of a/(px + q) and ln's plunge at the edge of
+the domain, or a runaway exponential. The dense curve is cut at the gaps.
+Each finite run gets a share of the target point count in proportion to its
+length and is downsampled by Largest-Triangle-Three-Buckets, which keeps
+the peaks and turns a plain stride would miss. Runs are joined with one NaN
+point, so a client draws them as separate strokes.
+
+render() is cached per (curve spec, window, points, format). Identical
+problems share an entry, and nothing is recomputed for a repeat request.
+
+Binary format (little-endian): "CDP1", <H> curve count, <dd> x range, then
+per curve <B> name length, the name (UTF-8), <I> n, float32 x[n], float32 y[n].
+"""
+import json
+import os
+import struct
+from functools import lru_cache
+
+import numpy as np
+
+from .solution import RULE_COS, RULE_EXP, RULE_LN, RULE_POWER, RULE_SIN, term_result
+
+WINDOW = 5.0           # half-width of the plotted x range
+DENSE = 4096           # samples per curve before downsampling
+OUTLIER_SPAN = 3.0     # values beyond the 2nd-98th percentile band by this many band widths are cut
+PLOT_CACHE = int(os.environ.get("CALCDUO_PLOT_CACHE", "2048"))
+
+_MAGIC = b"CDP1"
+
+
+def _eval_specs(specs, X, derivative: bool):
+    """Sum of term specs (code, A, p, q) at X; with `derivative`, of their result terms instead."""
+    rows = [r for spec in specs for r in term_result(spec)] if derivative else specs
+    out = np.zeros_like(X)
+    with np.errstate(all="ignore"):
+        for code, c, p, q in rows:
+            if code == RULE_POWER:
+                out += c * X ** p
+                continue
+            u = p * X + q
+            if code == RULE_SIN:
+                out += c * np.sin(u)
+            elif code == RULE_COS:
+                out += c * np.cos(u)
+            elif code == RULE_EXP:
+                out += c * np.exp(u)
+            elif derivative:  # RULE_LN result: c / (p x + q)
+                out += c / u
+            else:
+                out += c * np.log(u)
+    return out
+
+
+def _ln_domain(specs, lo: float, hi: float):
+    """(lo, hi) moved inside every ln term's domain p x + q > 0, or None if the domains don't meet.
+
+    The window is clipped to the domain; if the domain lies wholly outside it,
+    a window of the same width starts at the domain's edge instead.
+    """
+    d_lo, d_hi = -np.inf, np.inf
+    for code, _, p, q in specs:
+        if code != RULE_LN:
+            continue
+        edge = -q / p
+        if p > 0:
+            d_lo = max(d_lo, edge)
+        else:
+            d_hi = min(d_hi, edge)
+    if d_hi <= d_lo:
+        return None
+    width = hi - lo
+    lo, hi = max(lo, d_lo), min(hi, d_hi)
+    if hi <= lo:
+        lo, hi = (d_lo, min(d_hi, d_lo + width)) if d_lo >= hi else (max(d_lo, d_hi - width), d_hi)
+    pad = (hi - lo) * 1e-4  # a domain edge is a pole
+    return float(lo + pad if lo == d_lo else lo), float(hi - pad if hi == d_hi else hi)
+
+
+def plot_spec(problem):
+    """(curve spec, (lo, hi)) for render(); ValueError if the kind has nothing to plot."""
+    den = getattr(problem, "den", None)
+    if den is not None:
+        spec = ("ratio", (tuple(tuple(t) for t in problem.num), tuple(den)))
+        return spec, (float(problem.a - WINDOW), float(problem.a + WINDOW))
+    terms = getattr(problem, "terms", None)
+    if terms is not None:
+        spec = ("terms", tuple(tuple(t) for t in terms))
+        window = _ln_domain(terms, -WINDOW, WINDOW)
+        if window is None:
+            raise ValueError("f has no real values to plot.")
+        return spec, window
+    coeffs = getattr(problem, "coeffs", None)
+    if coeffs is None:
+        raise ValueError(f"No plot for {problem.kind!r} problems.")
+    if hasattr(problem, "x0"):
+        lo, hi = problem.x0 - WINDOW, problem.x0 + WINDOW
+    elif hasattr(problem, "b"):  # integration bounds, with some room on either side
+        pad = max(1.0, (problem.b - problem.a) / 2)
+        lo, hi = problem.a - pad, problem.b + pad
+    elif hasattr(problem, "a"):
+        lo, hi = problem.a - WINDOW, problem.a + WINDOW
+    else:
+        lo, hi = -WINDOW, WINDOW
+    return ("poly", tuple(coeffs)), (float(lo), float(hi))
+
+
+def _curves(spec, X):
+    kind, body = spec
+    if kind == "terms":
+        return _eval_specs(body, X, False), _eval_specs(body, X, True)
+    if kind == "ratio":
+        num, den = body
+        den = np.array(den, dtype=np.float64)
+        n, dn = _eval_specs(num, X, False), _eval_specs(num, X, True)
+        d, dd = np.polyval(den, X), np.polyval(np.polyder(den), X)
+        with np.errstate(all="ignore"):
+            return n / d, (dn * d - n * dd) / (d * d)
+    coeffs = np.array(body, dtype=np.float64)
+    deriv = np.polyder(coeffs) if len(coeffs) > 1 else np.zeros(1)
+    return np.polyval(coeffs, X), np.polyval(deriv, X)
+
+
+def _cut(y):
+    """y with non-finite values and far outliers replaced by NaN."""
+    y = np.where(np.isfinite(y), y, np.nan)
+    finite = y[np.isfinite(y)]
+    if len(finite) < 2:
+        return y
+    lo, hi = np.percentile(finite, (2, 98))
+    span = max(hi - lo, 1e-9)
+    with np.errstate(invalid="ignore"):
+        far = (y < lo - OUTLIER_SPAN * span) | (y > hi + OUTLIER_SPAN * span)
+    y[far] = np.nan
+    return y
+
+
+def lttb(x, y, n: int):
+    """Largest-Triangle-Three-Buckets: indices of n points of (x, y) that keep its shape."""
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+    if n < 3:
+        return np.array([0, size - 1][:max(n, 1)])
+    edges = np.linspace(1, size - 1, n - 1).astype(np.intp)  # n - 2 buckets between the end points
+    # each bucket's third point is the mean of the next bucket (the last point, for the last one)
+    counts = np.diff(np.r_[edges, size])
+    mx = np.add.reduceat(x, edges) / counts
+    my = np.add.reduceat(y, edges) / counts
+    out = np.empty(n, dtype=np.intp)
+    out[0], out[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay, bx, by = x[a], y[a], mx[i + 1], my[i + 1]
+        area = np.abs((ax - bx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (by - ay))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def downsample(x, y, points: int):
+    """(x, y) cut to about `points` points, run by finite run, NaN between runs."""
+    finite = np.isfinite(y)
+    edges = np.flatnonzero(np.diff(np.r_[False, finite, False].astype(np.int8)))
+    runs = list(zip(edges[::2], edges[1::2]))  # [start, end) of each finite run
+    total = int(finite.sum())
+    xs, ys = [], []
+    for k, (s, e) in enumerate(runs):
+        share = max(2, round(points * (e - s) / total))
+        idx = s + lttb(x[s:e], y[s:e], share)
+        if k:
+            xs.append([(x[runs[k - 1][1] - 1] + x[s]) / 2])
+            ys.append([np.nan])
+        xs.append(x[idx])
+        ys.append(y[idx])
+    if not xs:
+        return np.empty(0, np.float32), np.empty(0, np.float32)
+    return np.concatenate(xs).astype(np.float32), np.concatenate(ys).astype(np.float32)
+
+
+def sample(spec, window, points: int):
+    """[(name, x, y)] for f and f', downsampled to about `points` points each."""
+    X = np.linspace(window[0], window[1], DENSE)
+    f, fp = _curves(spec, X)
+    return [(name, *downsample(X, _cut(y), points)) for name, y in (("f", f), ("f'", fp))]
+
+
+def _json_values(a):
+    return [None if v != v else v for v in np.round(a.astype(np.float64), 5).tolist()]
+
+
+@lru_cache(maxsize=PLOT_CACHE)
+def render(spec, window, points: int, fmt: str = "json") -> bytes:
+    """The encoded plot ("json" or "f32" binary); cached, so repeat requests cost a dict lookup."""
+    if fmt not in ("json", "f32"):
+        raise ValueError("format must be 'json' or 'f32'.")
+    curves = sample(spec, window, points)
+    if fmt == "f32":
+        parts = [_MAGIC, struct.pack("<Hdd", len(curves), *window)]
+        for name, x, y in curves:
+            raw = name.encode()
+            parts += [struct.pack("<B", len(raw)), raw, struct.pack("<I", len(x)), x.tobytes(), y.tobytes()]
+        return b"".join(parts)
+    return json.dumps({
+        "x_range": list(window),
+        "curves": [{"name": name, "x": _json_values(x), "y": _json_values(y)} for name, x, y in curves],
+    }, separators=(",", ":")).encode()
@@ -1,5 +1,6 @@
 
 import random
+from functools import lru_cache
 from typing import List
 import sympy as sp
 
@@ -14,18 +15,18 @@ def coeffs_to_sympy_expr(coeffs: List[float]):
         expr += c * (x ** p)
     return sp.simplify(expr)
 
+@lru_cache(maxsize=None)
+def _coeff_pools(lo: int, hi: int):
+    vals = tuple(range(lo, hi + 1))
+    return vals, tuple(v for v in vals if v)
+
 def gen_poly(degree: int, coeff_range=(-5, 5)):
-    coeffs = []
-    for i in range(degree + 1):
-        if i == 0 and degree > 0:
-            c = 0
-            while c == 0:  # leading coeff must be non-zero
-                c = random.randint(*coeff_range)
-        else:
-            c = random.randint(*coeff_range)  # inner zeros allowed
-        coeffs.append(c)
-    if degree == 0 and coeffs[0] == 0:  # avoid all-zero constant
-        coeffs[0] = random.choice([-3, -2, -1, 1, 2, 3])
+    vals, nonzero = _coeff_pools(*coeff_range)
+    choice = random.choice  # cheaper than randint, which goes through randrange
+    if degree == 0:
+        return [choice(nonzero)]  # avoid all-zero constant
+    coeffs = [choice(nonzero)]  # leading coeff must be non-zero
+    coeffs += [choice(vals) for _ in range(degree)]  # inner zeros allowed
     return coeffs
 
 def poly_to_string(coeffs):
@@ -76,3 +77,22 @@ def antiderivative_coeffs(coeffs):
         anti.append(c / (powr + 1))  # coefficient for x^(powr+1)
     anti.append(0.0)  # +C
     return anti  # highest -> constant
+
+def eval_deriv(coeffs, xval):
+    """p'(xval) without building the derivative (Horner for p and p' together)."""
+    acc = dacc = 0.0
+    for c in coeffs:
+        dacc = dacc * xval + acc
+        acc = acc * xval + c
+    return dacc
+
+def eval_integral(coeffs, a, b):
+    """Integral of p from a to b, i.e. F(b) - F(a) with F(x) = x * sum c/(k+1) x^k."""
+    k = len(coeffs)  # power + 1 of the current term
+    fa = fb = 0.0
+    for c in coeffs:
+        ci = c / k
+        k -= 1
+        fa = fa * a + ci
+        fb = fb * b + ci
+    return fb * b - fa * a
@@ -0,0 +1,114 @@
+# calcduo/probe.py
+"""
+Numeric derivative check for deriv_form: the typed answer against f' at probe points.
+
+This is the grader of last resort when the server is too busy for SymPy
+(app/admission.py). It needs no SymPy at all: the answer parser builds the
+answer directly as a NumPy array of its values at the probes (NUMERIC
+atoms), and f' is evaluated from the term specs' result terms.
+
+Agreement at all N_PROBES points, within REL_TOL, counts as the same
+function. An answer that isn't a finite real number at every probe (outside
+its domain, or overflowing) can't be judged this way and gets None.
+
+The probe points, the term evaluation (eval_rows) and the agreement test
+(close) are shared with calcduo.tutor, which matches answers against its
+candidate slips the same way.
+"""
+import numpy as np
+
+from .answer_parser import AnswerSyntaxError, Atoms, parse_answer
+from .solution import RULE_COS, RULE_EXP, RULE_LN, RULE_POWER, RULE_SIN, term_result
+
+N_PROBES = 12
+PROBE_STEP = 0.23
+PROBE_START = -1.3
+LN_MARGIN = 0.2  # probes start this far inside ln's domain
+REL_TOL = 1e-9   # tight: an e^(5x) term can dwarf the rest of f' on the probes
+LOG = 5          # evaluation-only code: c*ln(p x + q), an undifferentiated ln term
+
+
+def _log(u, base=None):
+    return np.log(u) if base is None else np.log(u) / np.log(base)
+
+
+FUNCTIONS = {
+    "sin": np.sin, "cos": np.cos, "tan": np.tan,
+    "sec": lambda u: 1 / np.cos(u), "csc": lambda u: 1 / np.sin(u), "cot": lambda u: 1 / np.tan(u),
+    "exp": np.exp, "ln": _log, "log": _log, "sqrt": np.sqrt,
+}
+
+
+def numeric_atoms(probes):
+    """Atoms that evaluate an answer at the probe points (numbers are float64, so bad powers give nan)."""
+    return Atoms(np.float64, {"x": probes, "e": np.e, "E": np.e, "pi": np.pi}, FUNCTIONS)
+
+
+def probe_points(terms):
+    """N_PROBES points PROBE_STEP apart, starting inside every ln term's domain."""
+    lo = PROBE_START
+    for code, _, p, q in terms:
+        if code == RULE_LN:
+            lo = max(lo, -q / p + LN_MARGIN)
+    return lo + PROBE_STEP * np.arange(N_PROBES)
+
+
+def eval_rows(arr, X):
+    """Result-term rows (code, c, p, q) evaluated at per-row points X (rows x probes); RULE_LN is c / u."""
+    code = arr[:, 0]
+    c, p, q = arr[:, 1:2], arr[:, 2:3], arr[:, 3:4]
+    out = np.zeros(X.shape)
+    with np.errstate(all="ignore"):
+        for k in (RULE_POWER, RULE_SIN, RULE_COS, RULE_EXP, RULE_LN, LOG):
+            m = code == k
+            if not m.any():
+                continue
+            if k == RULE_POWER:
+                v = c[m] * X[m] ** p[m]
+            else:
+                u = p[m] * X[m] + q[m]
+                if k == RULE_SIN:
+                    v = c[m] * np.sin(u)
+                elif k == RULE_COS:
+                    v = c[m] * np.cos(u)
+                elif k == RULE_EXP:
+                    v = c[m] * np.exp(u)
+                elif k == RULE_LN:
+                    v = c[m] / u
+                else:
+                    v = c[m] * np.log(u)
+            out[m] = v
+    return out
+
+
+def derivative_values(terms, probes):
+    """f' at the probes, from the term specs' result terms."""
+    rows = [r for spec in terms for r in term_result(spec)]
+    if not rows:
+        return np.zeros_like(probes)
+    arr = np.array(rows, dtype=np.float64)
+    return eval_rows(arr, np.broadcast_to(probes, (len(arr), len(probes)))).sum(axis=0)
+
+
+def close(got, want):
+    """Elementwise agreement within REL_TOL (relative, with an absolute floor of REL_TOL)."""
+    return np.abs(got - want) <= REL_TOL * (1.0 + np.abs(want))
+
+
+def same_values(answer: str, terms):
+    """
+    True / False if the answer does (not) match f' on the probes, None if it can't be
+    evaluated there; raises AnswerSyntaxError.
+    """
+    probes = probe_points(terms)
+    try:
+        with np.errstate(all="ignore"):
+            got = np.broadcast_to(parse_answer(answer, numeric_atoms(probes)), probes.shape)
+    except AnswerSyntaxError:
+        raise
+    except (ArithmeticError, TypeError, ValueError):
+        return None
+    if np.iscomplexobj(got) or not np.isfinite(got).all():
+        return None
+    with np.errstate(all="ignore"):
+        return bool(close(got, derivative_values(terms, probes)).all())
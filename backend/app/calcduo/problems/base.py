@@ -1,16 +1,85 @@
 
 from typing import Tuple
 from ..config import XP_BY_DIFFICULTY
+from ..solution import render
+
+# Shared result tuples: the same objects are returned for every problem
+CORRECT = (True, "Correct!")
+NEED_NUMBER = (False, "Please enter a numeric value.")
 
 class Problem:
+    # Slotted: we keep many live problems, a per-instance __dict__ adds up
+    __slots__ = ("difficulty", "_miss", "_trace", "_solutions", "_prompt")
+
+    kind = None  # registry key, set by register_kind()
+
     def __init__(self, difficulty: str):
         self.difficulty = difficulty
 
     def prompt(self) -> str:
+        try:
+            return self._prompt  # set when the problem comes from a prebuilt bank
+        except AttributeError:
+            return self.render_prompt()
+
+    def render_prompt(self) -> str:
         raise NotImplementedError
 
     def check_answer(self, answer: str) -> Tuple[bool, str]:
         raise NotImplementedError
 
+    def quick_check(self, answer: str):
+        """check_answer()'s result if it can be had without SymPy, else None (the default)."""
+        return None
+
+    def numeric_check(self, answer: str):
+        """A SymPy-free grade for when the server is overloaded; None (the default) if there is none."""
+        return None
+
+    def miss(self) -> Tuple[bool, str]:
+        """(False, feedback) for a wrong answer; built on first use and kept with the problem."""
+        try:
+            return self._miss
+        except AttributeError:
+            self._miss = (False, self.miss_feedback())
+            return self._miss
+
+    def miss_feedback(self) -> str:
+        raise NotImplementedError
+
+    def trace(self) -> tuple:
+        """Worked-solution steps (see calcduo.solution); built once, kept with the problem."""
+        try:
+            return self._trace
+        except AttributeError:
+            self._trace = self.build_trace()
+            return self._trace
+
+    def build_trace(self) -> tuple:
+        raise NotImplementedError
+
+    def solution(self, fmt: str = "text") -> Tuple[str, ...]:
+        """The trace rendered as lines of text or LaTeX; rendered on first request per format."""
+        try:
+            cache = self._solutions
+        except AttributeError:
+            cache = self._solutions = {}
+        lines = cache.get(fmt)
+        if lines is None:
+            lines = cache[fmt] = render(self.trace(), fmt)
+        return lines
+
     def xp_reward(self) -> int:
         return XP_BY_DIFFICULTY.get(self.difficulty, 10)
+
+    def canonical(self) -> bytes:
+        """What makes two problems the same question (difficulty aside); see dedup.problem_key."""
+        raise NotImplementedError
+
+    def encode(self) -> bytes:
+        """Compact binary payload; decode() rebuilds the problem without regenerating it."""
+        raise NotImplementedError
+
+    @classmethod
+    def decode(cls, data: bytes):
+        raise NotImplementedError
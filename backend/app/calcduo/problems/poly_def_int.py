@@ -1,10 +1,19 @@
-from .base import Problem
-from ..poly import gen_poly, poly_to_string, eval_poly, antiderivative_coeffs
+from .base import Problem, CORRECT, NEED_NUMBER
+from ..codec import pack_difficulty, unpack_difficulty, pack_ints, unpack_ints
+from ..poly import gen_poly, poly_to_string, eval_poly, eval_integral, antiderivative_coeffs
+from ..registry import ProblemKind, register_kind
+from ..solution import integral_trace
 from ..utils import safe_float, numerically_equal
 import random
+import struct
+from array import array
+
+_HEAD = struct.Struct("<bb")  # integration bounds a < b
 
 
 class DefiniteIntegralProblem(Problem):
+    __slots__ = ("coeffs", "a", "b", "_value", "_anti")
+
     def __init__(self, difficulty):
         super().__init__(difficulty)
 
@@ -22,32 +31,83 @@ class DefiniteIntegralProblem(Problem):
             coeff_rng = (-12, 12)
             lo, hi = -8, 8
 
-        self.coeffs = gen_poly(deg, coeff_range=coeff_rng)
+        self.coeffs = array("i", gen_poly(deg, coeff_range=coeff_rng))
 
         # Pick bounds with a < b
-        a = random.randint(lo, hi)
-        b = random.randint(lo, hi)
+        bounds = range(lo, hi + 1)  # choice() on a range draws like randint(lo, hi), for less
+        a = random.choice(bounds)
+        b = random.choice(bounds)
         while a == b:
-            b = random.randint(lo, hi)
+            b = random.choice(bounds)
         self.a, self.b = (a, b) if a < b else (b, a)
 
-        # Build antiderivative coefficients once
-        self.anti = antiderivative_coeffs(self.coeffs)
+    # The answer, computed on first use and kept for grading (generation doesn't pay for it)
+    @property
+    def value(self):
+        try:
+            return self._value
+        except AttributeError:
+            self._value = eval_integral(self.coeffs, self.a, self.b)
+            return self._value
+
+    # Antiderivative coefficients, built once on first grade (most served problems are never graded twice)
+    @property
+    def anti(self):
+        try:
+            return self._anti
+        except AttributeError:
+            self._anti = array("d", antiderivative_coeffs(self.coeffs))
+            return self._anti
+
+    def encode(self) -> bytes:
+        return pack_difficulty(self.difficulty) + _HEAD.pack(self.a, self.b) + pack_ints(self.coeffs)
 
-    def prompt(self):
+    @classmethod
+    def decode(cls, data):
+        obj = cls.__new__(cls)
+        obj.difficulty, off = unpack_difficulty(data)
+        obj.a, obj.b = _HEAD.unpack_from(data, off)
+        obj.coeffs, _ = unpack_ints(data, off + _HEAD.size)
+        return obj
+
+    def canonical(self) -> bytes:
+        return _HEAD.pack(self.a, self.b) + self.coeffs.tobytes()
+
+    def render_prompt(self):
         expr = poly_to_string(self.coeffs)
         return f"Compute definite integral: ∫_{self.a}^{self.b} {expr} dx"
 
     def check_answer(self, answer: str):
         ansf = safe_float(answer)
         if ansf is None:
-            return False, "Please enter a numeric value."
+            return NEED_NUMBER
+        if numerically_equal(ansf, self.value):
+            return CORRECT
+        return self.miss()
 
-        true_b = eval_poly(self.anti, self.b)
-        true_a = eval_poly(self.anti, self.a)
-        true = true_b - true_a
+    def build_trace(self):
+        return integral_trace(self.coeffs, self.a, self.b)
 
-        if numerically_equal(ansf, true, tol=1e-4):
-            return True, "Correct!"
-        else:
-            return False, f"Incorrect. The integral equals {true}."
+    def miss_feedback(self):
+        return f"Incorrect. The integral equals {self.value}."
+
+
+def def_int_value(p: DefiniteIntegralProblem) -> float:
+    return p.value
+
+
+def def_int_distractors(p: DefiniteIntegralProblem, true_val: float):
+    return [
+        eval_poly(p.anti, p.b + 1) - eval_poly(p.anti, p.a),
+        eval_poly(p.anti, p.b) - eval_poly(p.anti, p.a - 1),
+        eval_poly(p.anti, p.a) - eval_poly(p.anti, p.b),   # swapped bounds
+    ]
+
+
+register_kind(ProblemKind(
+    "def_int",
+    DefiniteIntegralProblem,
+    label="Integrals",
+    numeric=def_int_value,
+    distractors=def_int_distractors,
+))
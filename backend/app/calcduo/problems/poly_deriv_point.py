@@ -1,10 +1,19 @@
 import random
-from .base import Problem
-from ..poly import gen_poly, poly_to_string, eval_poly, derivative_coeffs
+import struct
+from array import array
+from .base import Problem, CORRECT, NEED_NUMBER
+from ..codec import pack_difficulty, unpack_difficulty, pack_ints, unpack_ints
+from ..poly import gen_poly, poly_to_string, eval_poly, eval_deriv, derivative_coeffs
+from ..registry import ProblemKind, register_kind
+from ..solution import poly_deriv_trace
 from ..utils import safe_float, numerically_equal
 
+_HEAD = struct.Struct("<b")  # evaluation point x0
+
 
 class DerivativeAtPointProblem(Problem):
+    __slots__ = ("coeffs", "x0", "_value", "_deriv")
+
     def __init__(self, difficulty):
         super().__init__(difficulty)
 
@@ -22,26 +31,78 @@ class DerivativeAtPointProblem(Problem):
             coeff_rng = (-12, 12)
             x_lo, x_hi = -15, 15
 
-        self.coeffs = gen_poly(deg, coeff_range=coeff_rng)
+        self.coeffs = array("i", gen_poly(deg, coeff_range=coeff_rng))
 
         # Volatile evaluation point x0 (wider than -2..2)
         self.x0 = random.randint(x_lo, x_hi)
 
-        # Precompute derivative coefficients
-        self.deriv_coeffs = derivative_coeffs(self.coeffs)
+    # The answer, computed on first use and kept for grading (generation doesn't pay for it)
+    @property
+    def value(self):
+        try:
+            return self._value
+        except AttributeError:
+            self._value = eval_deriv(self.coeffs, self.x0)
+            return self._value
+
+    # Derivative coefficients, built on first use rather than for every generated problem
+    @property
+    def deriv_coeffs(self):
+        try:
+            return self._deriv
+        except AttributeError:
+            self._deriv = array("i", derivative_coeffs(self.coeffs))
+            return self._deriv
+
+    def encode(self) -> bytes:
+        return pack_difficulty(self.difficulty) + _HEAD.pack(self.x0) + pack_ints(self.coeffs)
 
-    def prompt(self):
+    @classmethod
+    def decode(cls, data):
+        obj = cls.__new__(cls)
+        obj.difficulty, off = unpack_difficulty(data)
+        (obj.x0,) = _HEAD.unpack_from(data, off)
+        obj.coeffs, _ = unpack_ints(data, off + _HEAD.size)
+        return obj
+
+    def canonical(self) -> bytes:
+        return _HEAD.pack(self.x0) + self.coeffs.tobytes()
+
+    def render_prompt(self):
         expr = poly_to_string(self.coeffs)
         return f"Find f'({self.x0}) for f(x) = {expr}"
 
     def check_answer(self, answer: str):
         ansf = safe_float(answer)
         if ansf is None:
-            return False, "Please enter a numeric value."
+            return NEED_NUMBER
+        if numerically_equal(ansf, self.value):
+            return CORRECT
+        return self.miss()
 
-        true = eval_poly(self.deriv_coeffs, self.x0)
+    def build_trace(self):
+        return poly_deriv_trace(self.coeffs, self.x0)
 
-        if numerically_equal(ansf, true, tol=1e-4):
-            return True, "Correct!"
-        else:
-            return False, f"Incorrect. f'({self.x0}) = {true}."
+    def miss_feedback(self):
+        return f"Incorrect. f'({self.x0}) = {self.value}."
+
+
+def deriv_point_value(p: DerivativeAtPointProblem) -> float:
+    return p.value
+
+
+def deriv_point_distractors(p: DerivativeAtPointProblem, true_val: float):
+    return [
+        eval_poly(p.coeffs, p.x0),                  # f(x0) not f'(x0)
+        eval_poly(p.deriv_coeffs, p.x0 + 1),        # off-by-one
+        true_val + random.choice([-2, -1, 1, 2]),   # small noise
+    ]
+
+
+register_kind(ProblemKind(
+    "deriv_point",
+    DerivativeAtPointProblem,
+    label="Derivatives (value at x0)",
+    numeric=deriv_point_value,
+    distractors=deriv_point_distractors,
+))
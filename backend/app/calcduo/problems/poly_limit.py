@@ -1,10 +1,19 @@
 import random
-from .base import Problem
-from ..poly import gen_poly, poly_to_string, eval_poly
-from ..utils import safe_float, round_for_compare
+import struct
+from array import array
+from .base import Problem, CORRECT, NEED_NUMBER
+from ..codec import pack_difficulty, unpack_difficulty, pack_ints, unpack_ints
+from ..poly import gen_poly, poly_to_string, eval_poly, eval_deriv
+from ..registry import ProblemKind, register_kind
+from ..solution import limit_trace
+from ..utils import safe_float, numerically_equal
+
+_HEAD = struct.Struct("<b")  # approach point a
 
 
 class LimitProblem(Problem):
+    __slots__ = ("coeffs", "a", "_value")
+
     def __init__(self, difficulty):
         super().__init__(difficulty)
 
@@ -20,27 +29,76 @@ class LimitProblem(Problem):
             lo, hi = -15, 15
 
         # Random polynomial
-        self.coeffs = gen_poly(deg, coeff_range=(-5, 5))
+        self.coeffs = array("i", gen_poly(deg, coeff_range=(-5, 5)))
 
         # Pick a more volatile approach point a (wider than -2..2)
-        candidates = list(range(lo, hi + 1))
-        self.a = random.choice(candidates)
+        self.a = random.choice(range(lo, hi + 1))
 
         # Sometimes force P(a) = 0 (still a polynomial; limit equals P(a))
         if difficulty in ("medium", "hard") and random.random() < 0.25:
             current = eval_poly(self.coeffs, self.a)
-            self.coeffs[-1] -= current  # shift constant so P(a) == 0
+            self.coeffs[-1] -= round(current)  # shift constant so P(a) == 0
+
+
+    # The answer, computed on first use and kept for grading (generation doesn't pay for it)
+    @property
+    def value(self):
+        try:
+            return self._value
+        except AttributeError:
+            self._value = eval_poly(self.coeffs, self.a)
+            return self._value
 
-    def prompt(self):
+    def encode(self) -> bytes:
+        return pack_difficulty(self.difficulty) + _HEAD.pack(self.a) + pack_ints(self.coeffs)
+
+    @classmethod
+    def decode(cls, data):
+        obj = cls.__new__(cls)
+        obj.difficulty, off = unpack_difficulty(data)
+        (obj.a,) = _HEAD.unpack_from(data, off)
+        obj.coeffs, _ = unpack_ints(data, off + _HEAD.size)
+        return obj
+
+    def canonical(self) -> bytes:
+        return _HEAD.pack(self.a) + self.coeffs.tobytes()
+
+    def render_prompt(self):
         expr = poly_to_string(self.coeffs)
         return f"Compute the limit: lim_{{x->{self.a}}} {expr}"
 
     def check_answer(self, answer: str):
         ansf = safe_float(answer)
         if ansf is None:
-            return False, "Please enter a numeric value."
-        true = eval_poly(self.coeffs, self.a)
-        if round_for_compare(ansf, 5) == round_for_compare(true, 5):
-            return True, "Correct!"
-        else:
-            return False, f"Incorrect. The limit equals {true}."
+            return NEED_NUMBER
+        if numerically_equal(ansf, self.value):
+            return CORRECT
+        return self.miss()
+
+    def build_trace(self):
+        return limit_trace(self.coeffs, self.a)
+
+    def miss_feedback(self):
+        return f"Incorrect. The limit equals {self.value}."
+
+
+def limit_value(p: LimitProblem) -> float:
+    return p.value
+
+
+def limit_distractors(p: LimitProblem, true_val: float):
+    return [
+        eval_poly(p.coeffs, p.a + 1),
+        eval_poly(p.coeffs, p.a - 1),
+        eval_deriv(p.coeffs, p.a),   # derivative instead of value
+    ]
+
+
+register_kind(ProblemKind(
+    "limit",
+    LimitProblem,
+    label="Limits",
+    difficulties=("easy", "medium"),
+    numeric=limit_value,
+    distractors=limit_distractors,
+))
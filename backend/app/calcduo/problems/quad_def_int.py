@@ -0,0 +1,127 @@
+# calcduo/problems/quad_def_int.py
+"""
+Definite integrals of mixed terms (poly/trig/exp/ln), graded numerically.
+
+The integrand is a sum of deriv_form term specs. The reference value comes
+from Gauss-Legendre quadrature (calcduo.quad) with a proven error bound
+under QUAD_TOL, a thousandth of the grading tolerance. No SymPy is involved
+in building, prompting or grading, so this is a fast-path kind.
+
+Bounds are drawn so that every ln term is defined on [a, b] with room to
+spare, and the exponents and the value stay in a range a player can
+reasonably type.
+"""
+import random
+import struct
+
+from .base import Problem, CORRECT, NEED_NUMBER
+from .sympy_deriv_form import TERM_EXP, TERM_LN, _TERM, _random_terms
+from ..codec import pack_difficulty, unpack_difficulty
+from ..config import ANSWER_TOL
+from ..quad import anti_value, closed_form, integrate
+from ..registry import ProblemKind, register_kind
+from ..solution import int_terms_trace, spec_str, sum_str
+from ..utils import safe_float, numerically_equal
+
+QUAD_TOL = ANSWER_TOL * 1e-3
+BOUNDS = {"easy": (-2, 2), "medium": (-3, 3), "hard": (-4, 4)}
+MAX_WIDTH = 4        # b - a
+MIN_LN_ARG = 0.5     # ln(px + q) needs px + q >= this on [a, b]
+MAX_EXPONENT = 5     # e^(px + q) needs px + q <= this on [a, b]
+MAX_VALUE = 1000.0
+
+_HEAD = struct.Struct("<bb")  # integration bounds a < b
+
+
+def _fits(terms, a, b):
+    for code, _, p, q in terms:
+        lo, hi = sorted((p * a + q, p * b + q))
+        if code == TERM_LN and lo < MIN_LN_ARG:
+            return False
+        if code == TERM_EXP and hi > MAX_EXPONENT:
+            return False
+    return True
+
+
+class QuadratureIntegralProblem(Problem):
+    __slots__ = ("terms", "a", "b", "value")
+
+    def __init__(self, difficulty):
+        super().__init__(difficulty)
+        lo, hi = BOUNDS.get(difficulty, BOUNDS["hard"])
+        while True:
+            terms = _random_terms(difficulty)
+            for _ in range(20):  # bounds for these terms, else new terms
+                a = random.randint(lo, hi - 1)
+                b = random.randint(a + 1, min(hi, a + MAX_WIDTH))
+                if not _fits(terms, a, b):
+                    continue
+                try:
+                    value, _ = integrate(terms, a, b, QUAD_TOL)
+                except ValueError:  # no rule meets QUAD_TOL (ln too close to its pole)
+                    continue
+                if abs(value) <= MAX_VALUE:
+                    self.terms, self.a, self.b, self.value = terms, a, b, value
+                    return
+
+    def encode(self) -> bytes:
+        body = b"".join(_TERM.pack(*t) for t in self.terms)
+        return pack_difficulty(self.difficulty) + _HEAD.pack(self.a, self.b) + body
+
+    @classmethod
+    def decode(cls, data):
+        obj = cls.__new__(cls)
+        obj.difficulty, off = unpack_difficulty(data)
+        obj.a, obj.b = _HEAD.unpack_from(data, off)
+        obj.terms = tuple(_TERM.iter_unpack(bytes(data[off + _HEAD.size:])))
+        obj.value, _ = integrate(obj.terms, obj.a, obj.b, QUAD_TOL)
+        return obj
+
+    def canonical(self) -> bytes:
+        merged = {}
+        for code, A, p, q in self.terms:
+            merged[(code, p, q)] = merged.get((code, p, q), 0) + A
+        return _HEAD.pack(self.a, self.b) + b"".join(
+            struct.pack("<bhbb", code, A, p, q)
+            for (code, p, q), A in sorted(merged.items()) if A
+        )
+
+    def render_prompt(self):
+        expr = sum_str([spec_str(t) for t in self.terms])
+        return f"Compute definite integral (to 4 decimal places): ∫_{self.a}^{self.b} {expr} dx"
+
+    def check_answer(self, answer: str):
+        ansf = safe_float(answer)
+        if ansf is None:
+            return NEED_NUMBER
+        if numerically_equal(ansf, self.value):
+            return CORRECT
+        return self.miss()
+
+    def build_trace(self):
+        Fb, Fa = anti_value(self.terms, self.b), anti_value(self.terms, self.a)
+        return int_terms_trace(self.terms, self.a, self.b, Fb, Fa)
+
+    def miss_feedback(self):
+        return f"Incorrect. The integral equals {self.value:.6f}."
+
+
+def quad_int_value(p: QuadratureIntegralProblem) -> float:
+    return p.value
+
+
+def quad_int_distractors(p: QuadratureIntegralProblem, true_val: float):
+    return [
+        -true_val,                                    # swapped bounds
+        closed_form(p.terms, p.a, p.b, chain=False),  # the chain rule's 1/p left out
+        anti_value(p.terms, p.b),                     # F(b): F(a) left out
+    ]
+
+
+register_kind(ProblemKind(
+    "def_int_form",
+    QuadratureIntegralProblem,
+    label="Integrals (trig/exp/ln)",
+    numeric=quad_int_value,
+    distractors=quad_int_distractors,
+))
@@ -0,0 +1,171 @@
+# calcduo/problems/ratio_limit.py
+"""
+Limits of 0/0 forms: rational functions with a removable singularity, and
+sin(kx)/x-style quotients.
+
+Both families are N(x) / D(x) at an integer point a with N(a) = D(a) = 0:
+- rational: N = (x - a)^k P, D = (x - a)^k Q, expanded, with P(a), Q(a) != 0
+- series: D = s (x - a)^n Q and N = s (sin/cos/e^ terms in p(x - a)) minus
+  their Taylor polynomial below order n, so that N starts at (x - a)^n.
+  s clears the denominators of the Taylor coefficients, so every
+  coefficient shown is an integer.
+The answer comes from calcduo.limits (factor cancellation and exact Taylor
+coefficients), as a Fraction. No SymPy is involved, so this is a fast-path
+kind.
+"""
+import random
+import struct
+from array import array
+from math import lcm
+
+from .base import Problem, CORRECT, NEED_NUMBER
+from ..codec import pack_difficulty, unpack_difficulty, pack_ints, unpack_ints
+from ..limits import expand, limit, poly_part, synthetic_division, taylor
+from ..poly import gen_poly, poly_to_string
+from ..registry import ProblemKind, register_kind
+from ..solution import RULE_COS, RULE_EXP, RULE_POWER, RULE_SIN, cancel_trace, series_limit_trace, spec_str, sum_str
+from ..utils import safe_float, numerically_equal
+
+# per difficulty: (points a, factor powers k, degrees of P, degrees of Q) for the rational family
+RATIONAL = {
+    "easy": (range(-3, 4), (1,), (1,), (0,)),
+    "medium": (range(-4, 5), (1,), (1, 2), (1,)),
+    "hard": (range(-4, 5), (1, 2), (1, 2), (1, 2)),
+}
+# per difficulty: (points a, orders n, transcendental terms, degrees of Q) for the series family
+SERIES = {
+    "easy": ((0,), (1,), (1,), (0,)),
+    "medium": ((0,), (1, 2), (1, 2), (0,)),
+    "hard": (range(-2, 3), (2, 3), (1, 2), (0, 1)),
+}
+SERIES_SHARE = {"easy": 0.4, "medium": 0.5, "hard": 0.5}
+MAX_COEFF = 999
+MAX_VALUE = 1000
+
+_HEAD = struct.Struct("<b")  # approach point a
+_SPEC = struct.Struct("<bhbb")  # numerator term (code, A, p, q)
+
+
+def _nonzero(lo, hi):
+    return random.choice([v for v in range(lo, hi + 1) if v])
+
+
+def _rational(difficulty):
+    points, powers, p_degrees, q_degrees = RATIONAL.get(difficulty, RATIONAL["hard"])
+    a, k = random.choice(points), random.choice(powers)
+    P = gen_poly(random.choice(p_degrees), coeff_range=(-5, 5))
+    Q = gen_poly(random.choice(q_degrees), coeff_range=(-3, 3))
+    if not synthetic_division(P, a)[1] or not synthetic_division(Q, a)[1]:
+        return None
+    num = expand(k, a, P)
+    degree = len(num) - 1
+    return a, tuple((RULE_POWER, c, degree - i, 0) for i, c in enumerate(num) if c), expand(k, a, Q)
+
+
+def _series(difficulty):
+    points, orders, n_terms, q_degrees = SERIES.get(difficulty, SERIES["hard"])
+    a, n = random.choice(points), random.choice(orders)
+    terms = []
+    for _ in range(random.choice(n_terms)):
+        code = random.choice((RULE_SIN, RULE_COS, RULE_EXP))
+        p = _nonzero(-4, 4) if code == RULE_EXP else random.randint(1, 4)  # A carries sin's and cos's sign
+        terms.append((code, _nonzero(-3, 3), p, -p * a))
+    below = taylor(terms, a, n)
+    if not below[n]:
+        return None
+    s = lcm(*(c.denominator for c in below[:n]))
+    # N = s * terms - s * (Taylor polynomial below order n, expanded around 0)
+    shift = [0]
+    for c in reversed(below[:n]):  # Horner in (x - a)
+        shift = expand(1, a, shift)
+        shift[-1] += int(c * s)
+    degree = len(shift) - 1
+    specs = [(code, s * A, p, q) for code, A, p, q in terms]
+    specs += [(RULE_POWER, -c, degree - i, 0) for i, c in enumerate(shift) if c]
+    Q = gen_poly(random.choice(q_degrees), coeff_range=(-3, 3))
+    if not synthetic_division(Q, a)[1]:
+        return None
+    return a, tuple(specs), [s * c for c in expand(n, a, Q)]
+
+
+class RatioLimitProblem(Problem):
+    __slots__ = ("a", "num", "den", "value")
+
+    def __init__(self, difficulty):
+        super().__init__(difficulty)
+        family = _series if random.random() < SERIES_SHARE.get(difficulty, 0.5) else _rational
+        while True:
+            built = family(difficulty)
+            if built is None:
+                continue
+            a, num, den = built
+            if max(abs(t[1]) for t in num) > MAX_COEFF or max(map(abs, den)) > MAX_COEFF:
+                continue
+            value = limit(num, den, a)[0]
+            if abs(value) <= MAX_VALUE:
+                self.a, self.num, self.den, self.value = a, num, array("i", den), float(value)
+                return
+
+    def encode(self) -> bytes:
+        body = b"".join(_SPEC.pack(*t) for t in self.num)
+        return pack_difficulty(self.difficulty) + _HEAD.pack(self.a) + pack_ints(self.den) + body
+
+    @classmethod
+    def decode(cls, data):
+        obj = cls.__new__(cls)
+        obj.difficulty, off = unpack_difficulty(data)
+        (obj.a,) = _HEAD.unpack_from(data, off)
+        obj.den, off = unpack_ints(data, off + _HEAD.size)
+        obj.num = tuple(_SPEC.iter_unpack(bytes(data[off:])))
+        obj.value = float(limit(obj.num, obj.den, obj.a)[0])
+        return obj
+
+    def canonical(self) -> bytes:
+        return _HEAD.pack(self.a) + self.den.tobytes() + b"".join(_SPEC.pack(*t) for t in sorted(self.num))
+
+    def render_prompt(self):
+        num = sum_str([spec_str(t) for t in self.num])
+        den = poly_to_string(self.den)
+        return f"Compute the limit (to 4 decimal places): lim_{{x->{self.a}}} ({num}) / ({den})"
+
+    def check_answer(self, answer: str):
+        ansf = safe_float(answer)
+        if ansf is None:
+            return NEED_NUMBER
+        if numerically_equal(ansf, self.value):
+            return CORRECT
+        return self.miss()
+
+    def build_trace(self):
+        _, k, top, den_red = limit(self.num, self.den, self.a)
+        if any(t[0] != RULE_POWER for t in self.num):
+            return series_limit_trace(self.num, tuple(self.den), tuple(den_red), self.a, k, top)
+        num = num_red = poly_part(self.num)
+        for _ in range(k):
+            num_red = synthetic_division(num_red, self.a)[0]
+        return cancel_trace(tuple(num), tuple(num_red), tuple(self.den), tuple(den_red), self.a, k)
+
+    def miss_feedback(self):
+        return f"Incorrect. The limit equals {self.value:.6f}."
+
+
+def ratio_limit_value(p: RatioLimitProblem) -> float:
+    return p.value
+
+
+def ratio_limit_distractors(p: RatioLimitProblem, true_val: float):
+    top = limit(p.num, p.den, p.a)[2]
+    return [
+        -true_val,                              # sign slip
+        1 / true_val if true_val else 1.0,      # N and D swapped
+        float(top),                             # the cancelled D left out
+    ]
+
+
+register_kind(ProblemKind(
+    "limit_form",
+    RatioLimitProblem,
+    label="Limits (0/0 forms)",
+    numeric=ratio_limit_value,
+    distractors=ratio_limit_distractors,
+))
@@ -1,17 +1,25 @@
 # calcduo/problems/sympy_deriv_form.py
 import random
 import re
+import struct
+from functools import lru_cache
 import sympy as sp
-from .base import Problem
-from sympy.parsing.sympy_parser import (
-    parse_expr,
-    standard_transformations,
-    implicit_multiplication_application,
-    convert_xor,
-)
+from .base import Problem, CORRECT
+from ..codec import pack_difficulty, unpack_difficulty
+from ..registry import ProblemKind, register_kind
+from ..answer_parser import AnswerSyntaxError, parse_answer
+from ..basis import same_derivative
+from ..probe import same_values
+from ..solution import deriv_terms_trace, sum_str, term_result, term_str
 
 x = sp.symbols("x")
 
+# Term specs are small int tuples (code, A, p, q) so problems stay compact:
+#   poly: A*x^p            sin/cos/exp: A*f(p*x + q)            ln: A*ln(p*x + q)
+TERM_POLY, TERM_SIN, TERM_COS, TERM_EXP, TERM_LN = range(5)
+_TERM_CODES = {"poly": TERM_POLY, "sin": TERM_SIN, "cos": TERM_COS, "exp": TERM_EXP, "ln": TERM_LN}
+_TERM = struct.Struct("<4b")
+
 
 def _rand_int(lo, hi, exclude_zero=False):
     n = random.randint(lo, hi)
@@ -21,9 +29,9 @@ def _rand_int(lo, hi, exclude_zero=False):
     return n
 
 
-def _random_term(difficulty: str):
+def _random_term_spec(difficulty: str):
     """
-    Return a SymPy term chosen from:
+    Return a term spec (see TERM_*) chosen from:
       A*x^n, A*sin(kx+b), A*cos(kx+b), A*e^(kx+b), A*ln(ax+b)
     Parameter ranges grow with difficulty.
     """
@@ -54,27 +62,40 @@ def _random_term(difficulty: str):
 
     if kind == "poly":
         n = _rand_int(*n_rng)
-        return A * (x ** n)
+        return (TERM_POLY, A, n, 0)
 
     k = _rand_int(*k_rng)
     b = _rand_int(*b_rng)
 
-    if kind == "sin":
-        return A * sp.sin(k * x + b)
-    if kind == "cos":
-        return A * sp.cos(k * x + b)
-    if kind == "exp":
-        # Use E**(kx+b) instead of exp(kx+b) so formatting shows e^(...)
-        return A * (sp.E ** (k * x + b))
     if kind == "ln":
         a = _rand_int(*a_rng, exclude_zero=True)
-        return A * sp.log(a * x + b)
-
+        return (TERM_LN, A, a, b)
+    return (_TERM_CODES[kind], A, k, b)
+
+
+def _term_expr(spec):
+    """Build the SymPy term for a spec."""
+    code, A, p, q = spec
+    if code == TERM_POLY:
+        return A * (x ** p)
+    if code == TERM_SIN:
+        return A * sp.sin(p * x + q)
+    if code == TERM_COS:
+        return A * sp.cos(p * x + q)
+    if code == TERM_EXP:
+        # Use E**(kx+b) instead of exp(kx+b) so formatting shows e^(...)
+        return A * (sp.E ** (p * x + q))
+    if code == TERM_LN:
+        return A * sp.log(p * x + q)
     return A * x
 
 
-def _random_expr(difficulty: str):
-    """Sum 2–4 random terms depending on difficulty."""
+def _random_term(difficulty: str):
+    return _term_expr(_random_term_spec(difficulty))
+
+
+def _random_terms(difficulty: str):
+    """Specs for 2–4 random terms depending on difficulty."""
     if difficulty == "easy":
         tmin, tmax = 2, 2
     elif difficulty == "medium":
@@ -82,8 +103,18 @@ def _random_expr(difficulty: str):
     else:
         tmin, tmax = 3, 4
     num_terms = random.randint(tmin, tmax)
-    terms = [_random_term(difficulty) for _ in range(num_terms)]
-    return sp.simplify(sum(terms))
+    return tuple(_random_term_spec(difficulty) for _ in range(num_terms))
+
+
+@lru_cache(maxsize=4096)
+def _expr_from_terms(terms):
+    """Sum and simplify the terms; cached so decoding a known problem is cheap."""
+    return sp.simplify(sum(_term_expr(t) for t in terms))
+
+
+def _random_expr(difficulty: str):
+    """Sum 2–4 random terms depending on difficulty."""
+    return _expr_from_terms(_random_terms(difficulty))
 
 
 def math_str(expr: sp.Expr) -> str:
@@ -117,89 +148,135 @@ def math_str(expr: sp.Expr) -> str:
     return s
 
 
+# --- Answer parsing: see answer_parser for the grammar ---
+PARSE_HELP = "Examples I accept: 3x, 3*sin(x), cos(3x+1), x^2 (or x**2), e^(3x+1), ln(x)."
+PARSE_FAILED = (False, "Couldn't parse that. " + PARSE_HELP)
+
+
+def parse_failed(err: AnswerSyntaxError):
+    """Feedback for an answer that doesn't parse, pointing at where it went wrong."""
+    return False, f"Couldn't parse that: {err}. {PARSE_HELP}"
+
+
+def parse_user_expr(answer: str):
+    """Parse a typed answer into a SymPy expression; None if it can't be parsed."""
+    try:
+        return parse_answer(answer)
+    except AnswerSyntaxError:
+        return None
+
+
 class SymPyDerivativeFormProblem(Problem):
     """
     Ask the player to enter the full symbolic derivative f'(x) for a
     randomly generated mixed expression f(x) (poly/trig/exp/log).
     """
-    supports_mc = False  # no multiple choice
-    supports_letters = True  # hint for the engine: allow letters like sin, cos, ln, e, pi
+    __slots__ = ("terms", "_f", "_fprime")
 
     def __init__(self, difficulty: str):
         super().__init__(difficulty)
-        self.f = _random_expr(difficulty)
-        self.fprime = sp.diff(self.f, x)
+        self.terms = _random_terms(difficulty)
+        self._f = _expr_from_terms(self.terms)
+        self._fprime = sp.diff(self._f, x)
 
-    def prompt(self):
-        expr_str = math_str(self.f)
-        return f"Given f(x) = {expr_str}\nEnter f'(x):"
+    # f and f' are rebuilt from the term specs on first use, so decoding is SymPy-free
+    @property
+    def f(self):
+        try:
+            return self._f
+        except AttributeError:
+            self._f = _expr_from_terms(self.terms)
+            return self._f
 
-    def check_answer(self, answer: str):
-        # --- 1) Normalize common input quirks ---
-        normalized = (answer or "").strip()
-        normalized = (
-            normalized.replace("−", "-")  # unicode minus
-            .replace("–", "-")            # en dash
-            .replace("—", "-")            # em dash
-            .replace("×", "*")            # unicode times
-            .replace("·", "*")            # middle dot
-            .replace("^", "**")           # accept ^ as power
+    @property
+    def fprime(self):
+        try:
+            return self._fprime
+        except AttributeError:
+            self._fprime = sp.diff(self.f, x)
+            return self._fprime
+
+    def encode(self) -> bytes:
+        # 4 signed bytes per term; f and f' are rebuilt from the specs
+        body = b"".join(_TERM.pack(*t) for t in self.terms)
+        return pack_difficulty(self.difficulty) + body
+
+    @classmethod
+    def decode(cls, data):
+        obj = cls.__new__(cls)
+        obj.difficulty, off = unpack_difficulty(data)
+        obj.terms = tuple(t for t in _TERM.iter_unpack(bytes(data[off:])))
+        return obj
+
+    def canonical(self) -> bytes:
+        # Like terms merged and sorted: 2sin(x) + x^2 and x^2 + sin(x) + sin(x) are one problem
+        merged = {}
+        for code, A, p, q in self.terms:
+            merged[(code, p, q)] = merged.get((code, p, q), 0) + A
+        return b"".join(
+            struct.pack("<bhbb", code, A, p, q)
+            for (code, p, q), A in sorted(merged.items()) if A
         )
 
-        # --- 2) SymPy parser configuration ---
-        transformations = standard_transformations + (
-            implicit_multiplication_application,  # allow 2x, 3sin(x), cos(3x+1), 2(x+1)
-            convert_xor,
-        )
+    def render_prompt(self):
+        expr_str = math_str(self.f)
+        return f"Given f(x) = {expr_str}\nEnter f'(x):"
 
-        local_dict = {
-            # variable
-            "x": x,
-            # functions
-            "sin": sp.sin, "cos": sp.cos, "tan": sp.tan,
-            "exp": sp.exp, "log": sp.log, "ln": sp.log,
-            "sqrt": sp.sqrt, "sec": sp.sec, "csc": sp.csc, "cot": sp.cot,
-            # constants
-            "pi": sp.pi, "e": sp.E, "E": sp.E,
-        }
-
-        def _try_parse(s: str):
-            return parse_expr(
-                s,
-                transformations=transformations,
-                local_dict=local_dict,
-                evaluate=True,
-            )
-
-        # --- 3) First attempt: tolerant parse with implicit multiplication ---
+    def quick_check(self, answer: str):
+        # Exact coefficient-map check; a miss only counts once its feedback is built
+        same = same_derivative(answer, self.terms)
+        if same:
+            return CORRECT
+        if same is False and hasattr(self, "_miss"):
+            return self._miss
+        return None
+
+    def numeric_check(self, answer: str):
+        # Overload fallback: the basis check, else f' compared at probe points; no SymPy
+        same = same_derivative(answer, self.terms)
+        if same is None:
+            try:
+                same = same_values(answer, self.terms)
+            except AnswerSyntaxError as err:
+                return parse_failed(err)
+        if same is None:
+            return None
+        if same:
+            return CORRECT
         try:
-            user_expr = _try_parse(normalized)
-        except Exception:
-            # --- 4) Fallback: insert '*' where implicit mult may be missing, then parse ---
-            s = normalized
-
-            # number followed by (x or '(' or a function)  -> insert '*'
-            s = re.sub(r'(\d)\s*(?=x\b|\()', r'\1*', s)
-            s = re.sub(r'(\d)\s*(?=(sin|cos|tan|exp|log|ln|sqrt|sec|csc|cot)\()', r'\1*', s)
-
-            # closing paren followed by (x or digit or '(' or function) -> insert '*'
-            s = re.sub(r'\)\s*(?=x\b|\d|\()', r')*', s)
-            s = re.sub(r'\)\s*(?=(sin|cos|tan|exp|log|ln|sqrt|sec|csc|cot)\()', r')*', s)
+            return self._miss
+        except AttributeError:  # f' from the term specs rather than SymPy's rendering of it
+            results = [term_str(*r) for spec in self.terms for r in term_result(spec)]
+            return (False, f"Not quite. One correct form is: {sum_str(results)}")
 
-            # x followed by '(' -> x*(...)
-            s = re.sub(r'\bx\s*(?=\()', r'x*', s)
+    def check_answer(self, answer: str):
+        same = same_derivative(answer, self.terms)
+        if same is not None:
+            return CORRECT if same else self.miss()
+        # Outside the basis (or unparseable): the general SymPy path
+        try:
+            user_expr = parse_answer(answer)
+        except AnswerSyntaxError as err:
+            return parse_failed(err)
 
-            try:
-                user_expr = _try_parse(s)
-            except Exception:
-                return (
-                    False,
-                    "Couldn't parse that. Examples I accept: 3x, 3*sin(x), cos(3x+1), "
-                    "x^2 (or x**2), e^(3x+1), ln(x)."
-                )
-
-        # --- 5) Equivalence check: algebraic simplify ---
+        # Equivalence check: algebraic simplify
         diff = sp.simplify(sp.together(sp.expand(user_expr - self.fprime)))
         if diff == 0:
-            return True, "Correct!"
-        return False, f"Not quite. One correct form is: {math_str(self.fprime)}"
+            return CORRECT
+        return self.miss()
+
+    def build_trace(self):
+        # Straight from the term specs: no SymPy involved
+        return deriv_terms_trace(self.terms)
+
+    def miss_feedback(self):
+        return f"Not quite. One correct form is: {math_str(self.fprime)}"
+
+
+register_kind(ProblemKind(
+    "deriv_form",
+    SymPyDerivativeFormProblem,
+    label="Derivatives (symbolic, trig/ln/exp)",
+    supports_mc=False,       # no multiple choice
+    supports_letters=True,   # allow letters like sin, cos, ln, e, pi
+))
@@ -0,0 +1,138 @@
+# calcduo/registry.py
+"""
+Problem-kind registry.
+
+Each problem kind is registered once under a short key ("limit", "deriv_form", ...)
+together with the capabilities the engine and the API dispatch on:
+
+- supports_mc:       may be offered as multiple choice
+- supports_letters:  free-form answers may contain letters (sin, ln, e, pi...)
+- numeric:           kernel returning the exact numeric answer; kinds with a
+                     numeric kernel are cheap to grade ("fast path"), the rest
+                     need SymPy ("slow path")
+- distractors:       wrong-but-plausible values for multiple choice
+- serializer:        object with dump(problem) / load(data); defaults to the
+                     problem class' compact binary encode / decode
+
+Third-party kinds are discovered through the `calcduo.problem_kinds` entry-point
+group. An entry point may point at a ProblemKind or at a module that registers
+its kinds on import.
+"""
+from importlib import import_module
+from importlib.metadata import entry_points
+
+ENTRY_POINT_GROUP = "calcduo.problem_kinds"
+
+# Built-in kinds, in lesson order. Imported lazily so the registry itself is cheap.
+BUILTIN_MODULES = (
+    ".problems.poly_limit",
+    ".problems.ratio_limit",
+    ".problems.poly_deriv_point",
+    ".problems.sympy_deriv_form",
+    ".problems.poly_def_int",
+    ".problems.quad_def_int",
+)
+
+KINDS = {}
+_loaded = False
+
+
+class ProblemKind:
+    def __init__(
+        self,
+        key: str,
+        problem_cls,
+        label: str,
+        difficulties=("easy", "medium", "hard"),
+        supports_mc=True,
+        supports_letters=False,
+        numeric=None,
+        distractors=None,
+        serializer=None,
+        practice=True,
+    ):
+        self.key = key
+        self.problem_cls = problem_cls
+        self.label = label
+        self.difficulties = tuple(difficulties)
+        self.supports_mc = supports_mc and numeric is not None
+        self.supports_letters = supports_letters
+        self.numeric = numeric
+        self.distractors = distractors
+        self.serializer = serializer
+        self.practice = practice  # include in Quick Practice
+
+    @property
+    def fast_path(self) -> bool:
+        """True when grading needs no SymPy work."""
+        return self.numeric is not None
+
+    def create(self, difficulty: str):
+        return self.problem_cls(difficulty)
+
+    def dump(self, problem):
+        if self.serializer is not None:
+            return self.serializer.dump(problem)
+        return problem.encode()
+
+    def load(self, data):
+        if self.serializer is not None:
+            return self.serializer.load(data)
+        return self.problem_cls.decode(data)
+
+    def describe(self) -> dict:
+        return {
+            "kind": self.key,
+            "label": self.label,
+            "difficulties": list(self.difficulties),
+            "supports_mc": self.supports_mc,
+            "supports_letters": self.supports_letters,
+            "fast_path": self.fast_path,
+        }
+
+    def __repr__(self):
+        return f"ProblemKind({self.key!r}, {self.problem_cls.__name__})"
+
+
+def register_kind(kind: ProblemKind) -> ProblemKind:
+    if kind.key in KINDS and KINDS[kind.key].problem_cls is not kind.problem_cls:
+        raise ValueError(f"Problem kind {kind.key!r} is already registered")
+    KINDS[kind.key] = kind
+    kind.problem_cls.kind = kind.key  # lets kind_of() dispatch in O(1)
+    return kind
+
+
+def _discover_entry_points():
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        obj = ep.load()
+        if isinstance(obj, ProblemKind):
+            register_kind(obj)
+        # otherwise the module registered its kinds as a side effect of import
+
+
+def load_kinds():
+    """Import built-in kinds and entry-point plugins (once)."""
+    global _loaded
+    if _loaded:
+        return KINDS
+    _loaded = True
+    for mod in BUILTIN_MODULES:
+        import_module(mod, __package__)
+    _discover_entry_points()
+    return KINDS
+
+
+def get_kind(key: str) -> ProblemKind:
+    load_kinds()
+    try:
+        return KINDS[key]
+    except KeyError:
+        raise KeyError(f"Unknown problem kind: {key!r}") from None
+
+
+def kind_of(problem) -> ProblemKind:
+    return get_kind(problem.kind)
+
+
+def all_kinds():
+    return list(load_kinds().values())
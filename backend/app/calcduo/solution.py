@@ -0,0 +1,346 @@
+# calcduo/solution.py
+"""
+Step-by-step solution traces.
+
+A trace is a tuple of small steps (rule, *args) built from a problem's own
+data (term specs or integer coefficients) with plain int/Fraction arithmetic,
+so building one costs microseconds and needs no SymPy. Rendering to text or
+LaTeX is separate and only happens when a solution is asked for; problems
+cache both (see Problem.trace() / Problem.solution()).
+"""
+from fractions import Fraction
+
+# Derivative of one term of a sum; args are the term spec (A, p, q)
+RULE_POWER, RULE_SIN, RULE_COS, RULE_EXP, RULE_LN = range(5)  # same order as TERM_*
+RULE_CONST = 5        # (c,)                  d/dx c = 0
+RULE_SUM = 6          # (n_terms,)            differentiate term by term
+RULE_DERIV_SUM = 7    # (result_terms,)       f'(x) = sum of the term results
+RULE_EVAL = 8         # (name, coeffs, x0, v) substitute x0 into a polynomial
+RULE_CONTINUOUS = 9   # (a,)                  polynomial limit = P(a)
+RULE_INT_POWER = 10   # (c, n)                ∫ c x^n dx = c/(n+1) x^(n+1)
+RULE_FTC = 11         # (anti, a, b, Fb, Fa)  F(b) - F(a)
+RULE_INT_TERM = 12    # (code, A, p, q)       ∫ of one term spec, by substitution u = p x + q
+RULE_FTC_TERMS = 13   # (terms, a, b, Fb, Fa) F(b) - F(a) with F from the term specs, in floats
+RULE_ZERO_OVER_ZERO = 14  # (a,)                  N(a) = D(a) = 0
+RULE_FACTOR = 15      # (name, coeffs, a, k, red) P(x) = (x - a)^k red(x), by synthetic division
+RULE_SERIES = 16      # (specs, a, k, c)      N(x) = c (x - a)^k + higher powers (Taylor series at a)
+RULE_LIMIT_RATIO = 17  # (a, k, top, bottom)  cancel (x - a)^k: the limit is top / bottom
+
+FORMATS = ("text", "latex")
+
+
+# --- building ---
+
+def term_result(spec):
+    """Derivative of a term spec as a list of (code, coefficient, p, q) result terms."""
+    code, A, p, q = spec
+    if code == RULE_POWER:
+        return [] if p == 0 else [(RULE_POWER, A * p, p - 1, 0)]
+    if code == RULE_SIN:
+        return [(RULE_COS, A * p, p, q)]
+    if code == RULE_COS:
+        return [(RULE_SIN, -A * p, p, q)]
+    if code == RULE_EXP:
+        return [(RULE_EXP, A * p, p, q)]
+    return [(RULE_LN, A * p, p, q)]  # A*a / (a x + b), marked with the ln code
+
+
+def deriv_terms_trace(terms):
+    """Trace for d/dx of a sum of term specs (see problems.sympy_deriv_form)."""
+    steps = [(RULE_SUM, len(terms))]
+    results = []
+    for spec in terms:
+        steps.append(spec)  # (code, A, p, q): the code doubles as the rule
+        results.extend(term_result(spec))
+    steps.append((RULE_DERIV_SUM, tuple(results)))
+    return tuple(steps)
+
+
+def _eval_exact(coeffs, x0):
+    acc = 0
+    for c in coeffs:  # Horner's method, exact for int/Fraction inputs
+        acc = acc * x0 + c
+    return acc
+
+
+def _power_terms(coeffs):
+    """(c, n) for each non-zero term of a highest-first coefficient list."""
+    degree = len(coeffs) - 1
+    return [(c, degree - i) for i, c in enumerate(coeffs) if c]
+
+
+def poly_deriv_trace(coeffs, x0):
+    """Power rule term by term, then f'(x0)."""
+    steps = [(RULE_SUM, len(_power_terms(coeffs)))]
+    for c, n in _power_terms(coeffs):
+        if n == 0:
+            steps.append((RULE_CONST, c))
+        else:
+            steps.append((RULE_POWER, c, n, 0))
+    degree = len(coeffs) - 1
+    deriv = tuple(c * (degree - i) for i, c in enumerate(coeffs[:-1])) or (0,)
+    steps.append((RULE_EVAL, "f'", deriv, x0, _eval_exact(deriv, x0)))
+    return tuple(steps)
+
+
+def limit_trace(coeffs, a):
+    """A polynomial is continuous, so substitute."""
+    coeffs = tuple(coeffs)
+    return ((RULE_CONTINUOUS, a), (RULE_EVAL, "P", coeffs, a, _eval_exact(coeffs, a)))
+
+
+def integral_trace(coeffs, a, b):
+    """Antiderivative term by term, then the Fundamental Theorem of Calculus."""
+    steps = []
+    degree = len(coeffs) - 1
+    anti = []
+    for i, c in enumerate(coeffs):
+        n = degree - i
+        anti.append(Fraction(c, n + 1))
+        if c:
+            steps.append((RULE_INT_POWER, c, n))
+    anti = tuple(anti) + (0,)
+    Fb, Fa = _eval_exact(anti, b), _eval_exact(anti, a)
+    steps.append((RULE_FTC, anti, a, b, Fb, Fa))
+    return tuple(steps)
+
+
+def int_terms_trace(terms, a, b, Fb, Fa):
+    """Antiderivative of each term spec, then the FTC (Fb, Fa: the problem's float values)."""
+    return tuple((RULE_INT_TERM, *spec) for spec in terms) + ((RULE_FTC_TERMS, tuple(terms), a, b, Fb, Fa),)
+
+
+def cancel_trace(num, num_red, den, den_red, a, k):
+    """Rational 0/0 limit: factor (x - a)^k out of N and D, cancel, substitute."""
+    return (
+        (RULE_ZERO_OVER_ZERO, a),
+        (RULE_FACTOR, "N", num, a, k, num_red),
+        (RULE_FACTOR, "D", den, a, k, den_red),
+        (RULE_LIMIT_RATIO, a, k, _eval_exact(num_red, a), _eval_exact(den_red, a)),
+    )
+
+
+def series_limit_trace(specs, den, den_red, a, k, top):
+    """0/0 limit with sin/cos/e^ terms: N's Taylor series at a against D's factor (x - a)^k."""
+    return (
+        (RULE_ZERO_OVER_ZERO, a),
+        (RULE_SERIES, tuple(specs), a, k, top),
+        (RULE_FACTOR, "D", den, a, k, den_red),
+        (RULE_LIMIT_RATIO, a, k, top, _eval_exact(den_red, a)),
+    )
+
+
+# --- rendering ---
+
+def _num(v, latex=False):
+    v = Fraction(v)
+    if v.denominator == 1:
+        return str(v.numerator)
+    if latex:
+        sign = "-" if v < 0 else ""
+        return f"{sign}\\frac{{{abs(v.numerator)}}}{{{v.denominator}}}"
+    return f"{v.numerator}/{v.denominator}"
+
+
+def _linear(p, q):
+    """p x + q, e.g. '3x - 2', 'x', '2x + 1'."""
+    s = "x" if p == 1 else ("-x" if p == -1 else f"{p}x")
+    if q:
+        s += f" {'-' if q < 0 else '+'} {abs(q)}"
+    return s
+
+
+def _power(n, latex=False):
+    if n == 0:
+        return ""
+    if n == 1:
+        return "x"
+    return f"x^{{{n}}}" if latex else f"x^{n}"
+
+
+def term_str(code, c, p, q, latex=False):
+    """One term with its coefficient, e.g. '-3sin(2x + 1)'."""
+    if code == RULE_POWER:
+        body = _power(p, latex)
+    elif code == RULE_SIN:
+        body = f"\\sin({_linear(p, q)})" if latex else f"sin({_linear(p, q)})"
+    elif code == RULE_COS:
+        body = f"\\cos({_linear(p, q)})" if latex else f"cos({_linear(p, q)})"
+    elif code == RULE_EXP:
+        body = f"e^{{{_linear(p, q)}}}" if latex else f"e^({_linear(p, q)})"
+    else:  # ln result: c / (p x + q)
+        if latex:
+            sign = "-" if c < 0 else ""
+            return f"{sign}\\frac{{{_num(abs(c), True)}}}{{{_linear(p, q)}}}"
+        return f"{_num(c)}/({_linear(p, q)})"
+    if not body:
+        return _num(c, latex)
+    if c == 1:
+        return body
+    if c == -1:
+        return "-" + body
+    coef = _num(c, latex)
+    if not latex and "/" in coef:
+        coef = f"({coef})"
+    return coef + body
+
+
+def spec_str(spec, latex=False):
+    """The original (undifferentiated) term of a spec."""
+    code, A, p, q = spec
+    if code == RULE_LN:
+        body = f"\\ln({_linear(p, q)})" if latex else f"ln({_linear(p, q)})"
+        return body if A == 1 else ("-" + body if A == -1 else f"{A}{body}")
+    return term_str(code, A, p, q, latex)
+
+
+def anti_str(spec, latex=False):
+    """The antiderivative of a term spec, e.g. '-3/2cos(2x + 1)' for 3sin(2x + 1)."""
+    code, A, p, q = spec
+    if code == RULE_POWER:
+        return term_str(RULE_POWER, Fraction(A, p + 1), p + 1, 0, latex)
+    k = Fraction(A, p)
+    if code == RULE_SIN:
+        return term_str(RULE_COS, -k, p, q, latex)
+    if code == RULE_COS:
+        return term_str(RULE_SIN, k, p, q, latex)
+    if code == RULE_EXP:
+        return term_str(RULE_EXP, k, p, q, latex)
+    u = _linear(p, q)  # ∫ ln(u) du = u ln(u) - u
+    body = f"({u})\\ln({u}) - ({u})" if latex else f"({u})ln({u}) - ({u})"
+    if k == 1:
+        return body
+    coef = "-" if k == -1 else _num(k, latex)
+    if not latex and "/" in coef:
+        coef = f"({coef})"
+    return f"{coef}[{body}]"
+
+
+def sum_str(terms):
+    if not terms:
+        return "0"
+    s = terms[0]
+    for t in terms[1:]:
+        s += f" - {t[1:]}" if t.startswith("-") else f" + {t}"
+    return s
+
+
+def _poly(coeffs, latex=False):
+    return sum_str([term_str(RULE_POWER, c, n, 0, latex) for c, n in _power_terms(coeffs)])
+
+
+def _factor(a, k, latex=False):
+    """(x - a)^k, e.g. 'x', '(x - 2)^2', '(x + 1)'."""
+    base = "x" if a == 0 else f"(x {'-' if a > 0 else '+'} {abs(a)})"
+    if k == 1:
+        return base
+    return f"{base}^{{{k}}}" if latex else f"{base}^{k}"
+
+
+def _times_factor(c, a, k, latex=False):
+    """c (x - a)^k with term_str's coefficient style, e.g. '(32/3)(x - 2)^3', '-x'."""
+    factor = _factor(a, k, latex)
+    if c == 1:
+        return factor
+    if c == -1:
+        return "-" + factor
+    coef = _num(c, latex)
+    if not latex and "/" in coef:
+        coef = f"({coef})"
+    return coef + factor
+
+
+def _d(latex):
+    return "\\frac{d}{dx}" if latex else "d/dx"
+
+
+def _render_step(step, latex):
+    rule = step[0]
+    d = _d(latex)
+    if rule == RULE_SUM:
+        return f"Differentiate term by term ({step[1]} terms)."
+    if rule == RULE_POWER:
+        _, A, n, _ = step
+        res = term_result(step)
+        after = term_str(*res[0], latex) if res else "0"
+        dot = " \\cdot " if latex else "·"
+        return f"Power rule: {d}[{term_str(RULE_POWER, A, n, 0, latex)}] = {A}{dot}{n}{_power(n - 1, latex)} = {after}"
+    if rule in (RULE_SIN, RULE_COS, RULE_EXP, RULE_LN):
+        _, A, p, q = step
+        outer = {
+            RULE_SIN: "sin(u)' = cos(u)",
+            RULE_COS: "cos(u)' = -sin(u)",
+            RULE_EXP: "(e^u)' = e^u",
+            RULE_LN: "ln(u)' = 1/u",
+        }[rule]
+        after = term_str(*term_result(step)[0], latex)
+        return (f"Chain rule with u = {_linear(p, q)}, u' = {p}, {outer}: "
+                f"{d}[{spec_str(step, latex)}] = {after}")
+    if rule == RULE_CONST:
+        return f"Constant: {d}[{_num(step[1], latex)}] = 0"
+    if rule == RULE_DERIV_SUM:
+        return f"Add the results: f'(x) = {sum_str([term_str(*t, latex) for t in step[1]])}"
+    if rule == RULE_EVAL:
+        _, name, coeffs, x0, v = step
+        return f"{name}(x) = {_poly(coeffs, latex)}, so {name}({x0}) = {_num(v, latex)}"
+    if rule == RULE_CONTINUOUS:
+        lim = f"\\lim_{{x \\to {step[1]}}}" if latex else f"lim x->{step[1]}"
+        return f"Polynomials are continuous, so {lim} P(x) = P({step[1]})."
+    if rule == RULE_INT_POWER:
+        _, c, n = step
+        integral = "\\int" if latex else "∫"
+        return (f"Power rule: {integral} {term_str(RULE_POWER, c, n, 0, latex)} dx = "
+                f"{term_str(RULE_POWER, Fraction(c, n + 1), n + 1, 0, latex)}")
+    if rule == RULE_FTC:
+        _, anti, a, b, Fb, Fa = step
+        v = Fb - Fa
+        approx = ""
+        if Fraction(v).denominator != 1:
+            approx = (" \\approx " if latex else " ≈ ") + f"{float(v):.4f}"
+        fa = _num(Fa, latex)
+        if Fa < 0:
+            fa = f"({fa})"
+        return (f"FTC with F(x) = {_poly(anti, latex)}: F({b}) - F({a}) = "
+                f"{_num(Fb, latex)} - {fa} = {_num(v, latex)}{approx}")
+    if rule == RULE_INT_TERM:
+        _, code, A, p, q = step
+        integral = "\\int" if latex else "∫"
+        spec = (code, A, p, q)
+        how = "Power rule" if code == RULE_POWER else f"Substitute u = {_linear(p, q)}, du = {p} dx"
+        return f"{how}: {integral} {spec_str(spec, latex)} dx = {anti_str(spec, latex)}"
+    if rule == RULE_FTC_TERMS:
+        _, terms, a, b, Fb, Fa = step
+        anti = sum_str([anti_str(t, latex) for t in terms])
+        approx = " \\approx " if latex else " ≈ "
+        return (f"FTC with F(x) = {anti}: F({b}) - F({a}) = "
+                f"{Fb:.6f} - ({Fa:.6f}){approx}{Fb - Fa:.6f}")
+    if rule == RULE_ZERO_OVER_ZERO:
+        return f"N({step[1]}) = D({step[1]}) = 0: substituting gives 0/0, so simplify first."
+    if rule == RULE_FACTOR:
+        _, name, coeffs, a, k, red = step
+        factored = _times_factor(red[0], a, k, latex) if len(red) == 1 else f"{_factor(a, k, latex)}({_poly(red, latex)})"
+        return f"Synthetic division by {_factor(a, 1, latex)}: {name}(x) = {_poly(coeffs, latex)} = {factored}"
+    if rule == RULE_SERIES:
+        _, specs, a, k, c = step
+        return (f"Taylor series at x = {a}: N(x) = {sum_str([spec_str(t, latex) for t in specs])} = "
+                f"{_times_factor(c, a, k, latex)} + (terms in {_factor(a, k + 1, latex)} and up)")
+    if rule == RULE_LIMIT_RATIO:
+        _, a, k, top, bottom = step
+        v = Fraction(top) / Fraction(bottom)
+        lim = f"\\lim_{{x \\to {a}}}" if latex else f"lim x->{a}"
+        approx = ""
+        if v.denominator != 1:
+            approx = (" \\approx " if latex else " ≈ ") + f"{float(v):.4f}"
+        bottom = _num(bottom, latex)
+        if Fraction(step[4]) < 0:
+            bottom = f"({bottom})"
+        return f"Cancel {_factor(a, k, latex)}: {lim} N/D = {_num(top, latex)} / {bottom} = {_num(v, latex)}{approx}"
+    raise ValueError(f"Unknown solution step: {rule!r}")
+
+
+def render(trace, fmt: str = "text"):
+    """Render a trace as a tuple of lines, plain text or LaTeX."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown solution format: {fmt!r}")
+    latex = fmt == "latex"
+    return tuple(_render_step(step, latex) for step in trace)
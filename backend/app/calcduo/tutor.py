@@ -0,0 +1,212 @@
+# calcduo/tutor.py
+"""
+Answer-explanation tutor for symbolic derivatives.
+
+Given a problem's term specs and the player's answer, work out which slip
+produced it. Each term of f has a small library of typical wrong derivatives
+(missing chain factor, sign error on sin/cos, dropped constant factor or
+shift, power-rule slips, term copied or left out). A candidate answer is the
+correct f' with one term mutated, or with the same slip on every term it
+applies to.
+
+Matching is numeric: every candidate and the player's expression are
+evaluated on a few probe points and compared there. diagnose_batch() stacks
+the candidates of many requests into one set of NumPy arrays, so a batch of
+diagnoses costs one evaluation pass; the per-problem candidate tables and
+per-answer compiled expressions are cached.
+"""
+from functools import lru_cache
+
+import numpy as np
+import sympy as sp
+
+from .probe import LOG as _LOG, N_PROBES, close, eval_rows, probe_points
+from .problems.sympy_deriv_form import PARSE_FAILED, parse_user_expr, x
+from .solution import (
+    RULE_COS, RULE_LN, RULE_POWER, RULE_SIN,
+    spec_str, sum_str, term_result, term_str,
+)
+
+# error key -> message template (filled with term / expected / got / p / q / A)
+MESSAGES = {
+    "missing_chain": "Missing chain-rule factor: the inner derivative of {term} is {p}, "
+                     "so d/dx[{term}] = {expected}, not {got}.",
+    "sign": "Sign error: d/dx[{term}] = {expected}, not {got} "
+            "(sin' = cos, cos' = -sin).",
+    "dropped_constant": "Dropped the constant factor {A}: d/dx[{term}] = {expected}, not {got}.",
+    "dropped_shift": "Dropped the {q:+d} inside {term}: the inner function stays as it is, "
+                     "so d/dx[{term}] = {expected}, not {got}.",
+    "missing_power_factor": "Power rule: bring the exponent down as a factor, "
+                            "d/dx[{term}] = {expected}, not {got}.",
+    "off_by_one_power": "Off-by-one power: d/dx x^n = n x^(n-1), so d/dx[{term}] = {expected}, not {got}.",
+    "undifferentiated": "{term} was copied without differentiating it: its derivative is {expected}.",
+    "dropped_term": "The term {term} is missing: its derivative {expected} belongs in f'(x).",
+}
+
+CORRECT_MESSAGE = "That's a correct derivative."
+UNKNOWN_MESSAGE = "No single slip explains this answer; compare it with the worked solution."
+
+
+# --- mutation library ---
+
+def _mutations(spec):
+    """(error, wrong result terms) for the slips that apply to one term spec."""
+    code, A, p, q = spec
+    out = []
+    if code == RULE_POWER:
+        if p >= 2:  # (for p == 1 these coincide with the term left undifferentiated)
+            out.append(("missing_power_factor", [(RULE_POWER, A, p - 1, 0)]))
+            out.append(("off_by_one_power", [(RULE_POWER, A * p, p, 0)]))
+            out.append(("off_by_one_power", [(RULE_POWER, A * p, p - 2, 0)]))
+        if abs(A) != 1:
+            out.append(("dropped_constant", [(RULE_POWER, p, p - 1, 0)]))
+    else:
+        (rcode, c, _, _), = term_result(spec)
+        if p != 1:
+            out.append(("missing_chain", [(rcode, c // p, p, q)]))
+        if code in (RULE_SIN, RULE_COS):
+            out.append(("sign", [(rcode, -c, p, q)]))
+        if abs(A) != 1:
+            out.append(("dropped_constant", [(rcode, c // A, p, q)]))
+        if q:
+            out.append(("dropped_shift", [(rcode, c, p, 0)]))
+    out.append(("undifferentiated", [(_LOG if code == RULE_LN else code, A, p, q)]))
+    out.append(("dropped_term", []))
+    return out
+
+
+@lru_cache(maxsize=4096)
+def _table(terms):
+    """
+    Candidate table for one problem: the candidates as (error, term indexes, swaps) plus
+    flat arrays of their result terms (code, c, p, q, candidate id), and probe points.
+    """
+    correct = [term_result(t) for t in terms]
+    cands = [(None, (), {})]
+    rows = [r for res in correct for r in res]
+    cand_ids = [0] * len(rows)
+
+    def add(error, idxs, swaps):
+        cid = len(cands)
+        cands.append((error, idxs, swaps))
+        for i, res in enumerate(correct):
+            for r in swaps.get(i, res):
+                rows.append(r)
+                cand_ids.append(cid)
+
+    by_error = {}
+    for i, spec in enumerate(terms):
+        for error, wrong in _mutations(spec):
+            add(error, (i,), {i: wrong})
+            by_error.setdefault(error, {}).setdefault(i, wrong)
+    for error, swaps in by_error.items():  # the same slip on every term it fits
+        if len(swaps) > 1 and error != "dropped_term":
+            add(error, tuple(swaps), swaps)
+
+    arr = np.array(rows, dtype=np.float64).reshape(-1, 4)
+    return cands, arr, np.array(cand_ids, dtype=np.intp), probe_points(terms)
+
+
+@lru_cache(maxsize=4096)
+def _user_fn(answer: str):
+    """Compiled NumPy function for a typed answer; None if it doesn't parse to f(x)."""
+    expr = parse_user_expr(answer)
+    if expr is None or not expr.free_symbols <= {x}:
+        return None
+    return sp.lambdify(x, expr, "numpy")
+
+
+def _user_values(answer, probes):
+    fn = _user_fn(answer)
+    if fn is None:
+        return None
+    try:
+        with np.errstate(all="ignore"):
+            v = np.asarray(fn(probes), dtype=np.float64)
+    except (TypeError, ValueError, ZeroDivisionError, OverflowError):
+        return None  # complex or otherwise not a real function on the probes
+    return np.broadcast_to(v, probes.shape)
+
+
+def _describe(terms, error, idxs, swaps, latex=False):
+    out = []
+    for i in idxs:
+        spec = terms[i]
+        code, A, p, q = spec
+        expected = sum_str([term_str(*r, latex) for r in term_result(spec)])
+        if error == "undifferentiated":
+            got = spec_str(spec, latex)
+        else:
+            got = sum_str([term_str(*r, latex) for r in swaps[i]])
+        term = spec_str(spec, latex)
+        out.append({
+            "error": error,
+            "term": term,
+            "expected": expected,
+            "got": got,
+            "message": MESSAGES[error].format(term=term, expected=expected, got=got, A=A, p=p, q=q),
+        })
+    return out
+
+
+def diagnose_batch(items):
+    """
+    Diagnose many (terms, answer) pairs in one vectorized pass.
+    Returns one dict per item: diagnosed, correct, errors[], message.
+    """
+    results = [None] * len(items)
+    tables, users, live = [], [], []
+    for n, (terms, answer) in enumerate(items):
+        table = _table(tuple(terms))
+        user = _user_values(answer, table[3])
+        if user is None:
+            results[n] = {"diagnosed": False, "correct": False, "errors": [], "message": PARSE_FAILED[1]}
+            continue
+        tables.append(table)
+        users.append(user)
+        live.append(n)
+    if not live:
+        return results
+
+    # Stack every candidate of every request: rows -> (request, candidate)
+    arrs, cids, probes, starts = [], [], [], []
+    offset = 0
+    for cands, arr, cand_ids, pts in tables:
+        arrs.append(arr)
+        cids.append(cand_ids + offset)
+        probes.append(np.broadcast_to(pts, (len(arr), N_PROBES)))
+        starts.append(offset)
+        offset += len(cands)
+    arr = np.concatenate(arrs)
+    cand_ids = np.concatenate(cids)
+    vals = eval_rows(arr, np.concatenate(probes))
+
+    cand_vals = np.zeros((offset, N_PROBES))
+    cand_req = np.repeat(np.arange(len(live)), [len(t[0]) for t in tables])
+    user = np.stack(users)[cand_req]
+    with np.errstate(all="ignore"):
+        np.add.at(cand_vals, cand_ids, vals)
+        match = close(user, cand_vals).all(axis=1)
+
+    for j, n in enumerate(live):
+        cands = tables[j][0]
+        hits = np.flatnonzero(match[starts[j]:starts[j] + len(cands)])
+        if not len(hits):
+            results[n] = {"diagnosed": False, "correct": False, "errors": [], "message": UNKNOWN_MESSAGE}
+            continue
+        error, idxs, swaps = cands[hits[0]]
+        if error is None:
+            results[n] = {"diagnosed": True, "correct": True, "errors": [], "message": CORRECT_MESSAGE}
+            continue
+        errors = _describe(items[n][0], error, idxs, swaps)
+        results[n] = {
+            "diagnosed": True,
+            "correct": False,
+            "errors": errors,
+            "message": " ".join(e["message"] for e in errors),
+        }
+    return results
+
+
+def diagnose(terms, answer: str) -> dict:
+    return diagnose_batch([(terms, answer)])[0]
@@ -1,6 +1,8 @@
 
 import json
 
+from .config import ANSWER_TOL
+
 def clamp(x, a, b):
     return max(a, min(b, x))
 
@@ -13,7 +15,7 @@ def safe_float(s):
 def round_for_compare(x, places=5):
     return round(x, places)
 
-def numerically_equal(a, b, tol=1e-4):
+def numerically_equal(a, b, tol=ANSWER_TOL):
     return abs(a - b) <= tol
 
 def save_json(path, data):
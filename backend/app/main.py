@@ -1,12 +1,71 @@
-from fastapi import FastAPI
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
 import uuid
 
-# Import your SymPy derivative problem class from your package we just copied
-from app.calcduo.problems.sympy_deriv_form import SymPyDerivativeFormProblem
+# Problem kinds are looked up in the calcduo registry by key
+from app.calcduo.registry import all_kinds, get_kind, kind_of
+from app.calcduo.grading import BulkGrader
+from app.calcduo.io_leaderboard import Leaderboard
+from app.calcduo import memory
+from app.calcduo.bank import ProblemBank
+from app.calcduo.config import REVIEW_FILE
+from app.calcduo.basis import derivative_map
+from app.calcduo.dedup import problem_key
+from app.calcduo.events import EventLog, EventStore
+from app.calcduo.plot import plot_spec, render as render_plot
+from app.calcduo.engine.adaptive import SkillModel
+from app.calcduo.engine.review import ReviewScheduler
+from app import offload, profiling
+from app.admission import Admission, Overloaded
+from app.pool import ProblemPool
+from app.snapshot import LiveProblems, Snapshotter
+from app.responses import DefaultResponse, answer_body, answer_response, cached_json, dumps, make_etag
+from app.sessions import run_session
+from app.tutor import TUTOR_KINDS, TutorBatcher
+from app.tournaments import TournamentHub
+from app.streaming import lesson_events
+
+# Prebuilt problems (python -m app.calcduo.bank build), if a bank file exists
+BANK = ProblemBank.open()
+
+# Ready-made problems for slow (SymPy) kinds the bank doesn't cover, refilled in the background
+POOL = ProblemPool(bank=BANK)
+
+# Per-kind limits on worker jobs; over the limit, requests degrade or get a fast 503
+ADMISSION = Admission()
 
-app = FastAPI()
+# Batches concurrent answer diagnoses into one worker call
+TUTOR = TutorBatcher()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    POOL.start()
+    SNAPSHOTS.restore()  # after start(): pooled problems go back into the pool's queues
+    SNAPSHOTS.start()
+    TUTOR.start()
+    TOURNAMENTS.start()
+    yield
+    await SNAPSHOTS.stop()
+    await SNAPSHOTS.save()
+    REVIEWS.save(REVIEW_FILE)
+    if PROFILER is not None and profiling.PROFILE_DIR:
+        PROFILER.dump(profiling.PROFILE_DIR)
+    await TOURNAMENTS.stop()
+    await TUTOR.stop()
+    await POOL.stop()
+    if EVENTS is not None:
+        EVENTS.close()
+    offload.shutdown()
+
+app = FastAPI(lifespan=lifespan, default_response_class=DefaultResponse)
 
 # Allow your Expo app to call this API (relax in dev; restrict in prod)
 app.add_middleware(
@@ -14,33 +73,371 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Retry-After"],
 )
 
-# In-memory store for problems (good enough for dev)
-PROBLEMS = {}
+# Only bigger bodies (leaderboard, kinds) are worth compressing; SSE is never gzipped
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=6)
+
+# Opt-in (CALCDUO_PROFILE_RATE > 0): cProfile a sample of /new-problem and /answer, see app/profiling.py
+PROFILER = profiling.Profiler() if profiling.ENABLED else None
+if PROFILER is not None:
+    app.add_middleware(profiling.ProfilingMiddleware, profiler=PROFILER)
+
+# In-memory store for problems (good enough for dev); restored problems decode on first lookup
+PROBLEMS = LiveProblems()
+
+# When each stored problem was handed out, for time-to-answer
+ISSUED = {}
+
+# One event per /answer, flushed to columnar segments for /stats/answers (CALCDUO_EVENTS="" = off)
+EVENTS = EventLog.open()
+EVENT_STORE = EventStore(EVENTS.path, EVENTS) if EVENTS is not None else None
+
+# Live and pooled problems saved on shutdown and periodically, restored on startup
+SNAPSHOTS = Snapshotter(PROBLEMS, POOL)
+
+# Shared by all WebSocket sessions
+LEADERBOARD = Leaderboard()
+
+# Per-player skill ratings for adaptive practice
+SKILLS = SkillModel()
+
+# Spaced-repetition reviews of missed kinds (saved on shutdown)
+REVIEWS = ReviewScheduler.load(REVIEW_FILE, kinds=[k.key for k in all_kinds()])
+
+# Live tournaments; final scores land on the shared leaderboard
+TOURNAMENTS = TournamentHub(LEADERBOARD, ADMISSION)
+
+# Rendered read-endpoint bodies: key -> (version, etag, body)
+_RENDERED = {}
+
+# What the long-lived stores and caches hold, for /debug/memory (CALCDUO_MEMORY_ADMIN=1)
+MEMORY = memory.Stores()
+MEMORY.track("live_problems", lambda: PROBLEMS)
+MEMORY.track("live_restored", lambda: PROBLEMS.restored)
+MEMORY.track("issued_at", lambda: ISSUED)
+MEMORY.track("pool", lambda: POOL.pooled())
+MEMORY.track("leaderboard", lambda: LEADERBOARD.data)
+MEMORY.track("skills", lambda: vars(SKILLS))
+MEMORY.track("reviews", lambda: vars(REVIEWS))
+MEMORY.track("event_batches", lambda: EVENTS.batches() if EVENTS is not None else [])
+MEMORY.track("rendered", lambda: _RENDERED)
+MEMORY.track_cache("answer_body", answer_body)
+MEMORY.track_cache("derivative_map", derivative_map)
+MEMORY.track_cache("plot", render_plot)
+TRACER = memory.Tracer() if memory.ADMIN else None
 
 class NewReq(BaseModel):
     difficulty: str = "easy"
+    kind: str = "deriv_form"
 
 class AnswerReq(BaseModel):
     problem_id: str
     answer: str
+    player: str | None = None  # set to update the player's skill ratings
+
+class ExplainReq(BaseModel):
+    problem_id: str
+    answer: str
+
+class BulkGradeReq(BaseModel):
+    items: list[ExplainReq]  # (problem_id, answer) pairs
+
+class TournamentReq(BaseModel):
+    rounds: int = 10
+    seed: int | None = None        # same seed, same problem set
+    seconds: float | None = None   # time limit; None = play until everyone is done
+    kinds: list[str] | None = None # default: the Quick Practice kinds
+
+class PlayerReq(BaseModel):
+    player: str
+
+@app.exception_handler(Overloaded)
+async def overloaded(request: Request, exc: Overloaded):
+    return DefaultResponse({"detail": "The server is busy. Try again shortly."}, status_code=503,
+                           headers={"Retry-After": str(exc.retry_after)})
+
+def _kind_or_400(key: str):
+    try:
+        return get_kind(key)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0]))
+
+def _store(problem) -> str:
+    pid = str(uuid.uuid4())
+    PROBLEMS[pid] = problem
+    ISSUED[pid] = time.time()
+    for old in PROBLEMS.expire():  # past CALCDUO_LIVE_MAX, the oldest problems expire
+        ISSUED.pop(old, None)
+    return pid
 
 @app.get("/healthz")
-def health():
+async def health():
     return {"ok": True}
 
+def _rendered(key, version, build):
+    hit = _RENDERED.get(key)
+    if hit is None or hit[0] != version:
+        body = dumps(build())
+        hit = _RENDERED[key] = (version, make_etag(body), body)
+    return hit[1], hit[2]
+
+@app.get("/kinds")
+async def kinds(request: Request):
+    etag, body = _rendered("kinds", len(all_kinds()), lambda: [k.describe() for k in all_kinds()])
+    return cached_json(request, body, etag)
+
+@app.get("/leaderboard")
+async def leaderboard(request: Request, n: int = 10):
+    n = max(1, min(n, 100))
+    def build():
+        return [{"player": name, **rec} for name, rec in LEADERBOARD.top(n)]
+    etag, body = _rendered(("leaderboard", n), LEADERBOARD.version, build)
+    return cached_json(request, body, etag)
+
 @app.post("/new-problem")
-def new_problem(req: NewReq):
-    p = SymPyDerivativeFormProblem(req.difficulty)
-    pid = str(uuid.uuid4())
-    PROBLEMS[pid] = p
-    return {"problem_id": pid, "prompt": p.prompt()}
+async def new_problem(req: NewReq):
+    kind = _kind_or_400(req.kind)
+    profiling.tag(kind.key)
+    p = await POOL.take(kind, req.difficulty, gate=ADMISSION.gate(kind.key))
+    pid = _store(p)
+    return {"problem_id": pid, "kind": kind.key, "difficulty": p.difficulty, "prompt": p.prompt()}
+
+@app.post("/adaptive/next")
+async def adaptive_next(req: PlayerReq):
+    """Next problem with kind and difficulty chosen for this player's level."""
+    kind, difficulty = SKILLS.pick(req.player)
+    p = await POOL.take(kind, difficulty, gate=ADMISSION.gate(kind.key))
+    pid = _store(p)
+    return {"problem_id": pid, "kind": kind.key, "difficulty": p.difficulty, "prompt": p.prompt()}
+
+@app.get("/adaptive/profile")
+async def adaptive_profile(player: str):
+    return SKILLS.profile(player)
+
+@app.get("/review/due")
+async def review_due(player: str):
+    """Scheduled reviews for a player, soonest first (due_in <= 0 means due now)."""
+    return REVIEWS.pending(player)
+
+@app.post("/review/next")
+async def review_next(req: PlayerReq):
+    """A problem for the player's most overdue review, or problem_id null if none is due."""
+    due = REVIEWS.next_due(req.player)
+    if due is None:
+        return {"problem_id": None}
+    kind = get_kind(due[0])
+    p = await POOL.take(kind, due[1], gate=ADMISSION.gate(kind.key))
+    pid = _store(p)
+    return {"problem_id": pid, "kind": kind.key, "difficulty": p.difficulty, "prompt": p.prompt()}
+
+@app.get("/lesson/stream")
+async def lesson_stream(request: Request, kind: str = "deriv_form", difficulty: str | None = None):
+    """Stream a lesson's problems as server-sent events, first one as soon as it's ready."""
+    k = _kind_or_400(kind)
+    difficulties = (difficulty,) if difficulty else k.difficulties
+    return StreamingResponse(
+        lesson_events(request, POOL, k, difficulties, _store),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.post("/answer")
-def answer(req: AnswerReq):
+async def answer(req: AnswerReq):
     p = PROBLEMS.get(req.problem_id)
     if not p:
-        return {"ok": False, "feedback": "Problem expired. Start a new one."}
-    ok, feedback = p.check_answer(req.answer)
-    return {"ok": ok, "feedback": feedback}
+        return answer_response(False, "Problem expired. Start a new one.")
+    profiling.tag(p.kind)
+    ok, feedback = await ADMISSION.grade(p, req.answer)
+    if EVENTS is not None:
+        issued = ISSUED.get(req.problem_id)
+        ms = (time.time() - issued) * 1e3 if issued is not None else math.nan
+        EVENTS.emit(req.player, p.kind, p.difficulty, ok, req.answer, ms, problem_key(p))
+    if req.player:
+        SKILLS.record(req.player, p.kind, p.difficulty, ok)
+        REVIEWS.record(req.player, p.kind, p.difficulty, ok)
+    return answer_response(ok, feedback)
+
+@app.post("/grade/bulk")
+async def grade_bulk(req: BulkGradeReq):
+    """Contest grading: one verdict per item, null where the problem expired. No skill or review updates."""
+    results = [None] * len(req.items)
+    fast, slow = [], []
+    for i, item in enumerate(req.items):
+        p = PROBLEMS.get(item.problem_id)
+        if p is not None:
+            (fast if kind_of(p).fast_path else slow).append((i, p, item.answer))
+    if fast:
+        verdicts = BulkGrader([p for _, p, _ in fast]).grade([a for _, _, a in fast])
+        for (i, _, _), ok in zip(fast, verdicts.tolist()):
+            results[i] = ok
+    if slow:
+        graded = await asyncio.gather(*(ADMISSION.grade(p, a) for _, p, a in slow))
+        for (i, _, _), (ok, _) in zip(slow, graded):
+            results[i] = ok
+    return {"results": results}
+
+@app.get("/stats/problem-space")
+async def problem_space():
+    """How often each kind/difficulty repeats, and how much of its problem space is used."""
+    return POOL.frequency.report()
+
+@app.get("/stats/admission")
+async def admission_stats():
+    """Per-kind worker slots, queues and shed counts, and how many requests were served degraded."""
+    return {**ADMISSION.report(), "pool_stand_ins": POOL.stand_ins}
+
+def _event_store():
+    if EVENT_STORE is None:
+        raise HTTPException(status_code=404, detail="The answer-event log is off.")
+    return EVENT_STORE.frozen()  # live rows copied here, on the loop; the query runs in a thread
+
+@app.get("/stats/answers")
+async def answer_stats(by: str = "kind,difficulty", kind: str | None = None,
+                       difficulty: str | None = None, since: float | None = None):
+    """Accuracy and time-to-answer percentiles from the event log, grouped by `by` (comma-separated)."""
+    groups = tuple(g for g in by.split(",") if g)
+    if not groups or not set(groups) <= {"kind", "difficulty", "player"}:
+        raise HTTPException(status_code=400, detail="by must name kind, difficulty and/or player.")
+    store = _event_store()
+    def query():
+        return {"accuracy": store.accuracy(groups, since, kind=kind, difficulty=difficulty),
+                "time_to_answer": store.time_to_answer(groups, since=since, kind=kind, difficulty=difficulty)}
+    return await asyncio.to_thread(query)
+
+@app.get("/stats/wrong-answers")
+async def wrong_answers(kind: str | None = None, difficulty: str | None = None, n: int = 10):
+    """The most common wrong answers, overall or for one kind / difficulty."""
+    store = _event_store()
+    return await asyncio.to_thread(store.common_wrong, max(1, min(n, 100)), kind=kind, difficulty=difficulty)
+
+@app.get("/stats/snapshot")
+async def snapshot_stats():
+    """What the last restore brought back and how long it took, and the last save."""
+    return SNAPSHOTS.stats
+
+@app.get("/solution/{problem_id}")
+async def solution(problem_id: str, format: str = "text"):
+    """Worked solution steps for a stored problem, as plain text or LaTeX lines."""
+    p = PROBLEMS.get(problem_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="Problem expired. Start a new one.")
+    try:
+        steps = p.solution(format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0]))
+    return {"problem_id": problem_id, "format": format, "steps": steps}
+
+@app.get("/plot/{problem_id}")
+async def plot(request: Request, problem_id: str, points: int = 400, format: str = "json"):
+    """f and f' sampled for drawing: JSON arrays (null = gap) or packed float32 ("f32"); see calcduo/plot.py."""
+    p = PROBLEMS.get(problem_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="Problem expired. Start a new one.")
+    try:
+        spec, window = plot_spec(p)
+        body = render_plot(spec, window, max(16, min(points, 2000)), format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0]))
+    media_type = "application/octet-stream" if format == "f32" else "application/json"
+    return cached_json(request, body, make_etag(body), media_type)
+
+@app.post("/tutor/explain")
+async def tutor_explain(req: ExplainReq):
+    """Pin down the specific slip behind an answer (symbolic derivative problems)."""
+    p = PROBLEMS.get(req.problem_id)
+    if not p:
+        raise HTTPException(status_code=404, detail="Problem expired. Start a new one.")
+    if p.kind not in TUTOR_KINDS:
+        raise HTTPException(status_code=400, detail=f"No tutor for {p.kind!r} problems yet.")
+    return await TUTOR.explain(p, req.answer)
+
+@app.post("/tournaments")
+async def create_tournament(req: TournamentReq):
+    try:
+        t = await TOURNAMENTS.create(req.rounds, req.seed, req.seconds, req.kinds)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e.args[0]))
+    return {"id": t.id, "seed": t.seed, "rounds": t.total, "seconds": req.seconds,
+            "plan": [{"kind": k, "difficulty": d} for k, d in t.plan]}
+
+@app.get("/tournaments/{tid}")
+async def tournament_standings(tid: str, n: int = 10):
+    t = TOURNAMENTS.get(tid)
+    if t is None:
+        raise HTTPException(status_code=404, detail="No such tournament.")
+    return t.standings(max(1, min(n, 100)))
+
+@app.websocket("/ws/tournament/{tid}")
+async def tournament_ws(ws: WebSocket, tid: str):
+    """One player in a tournament; see app/tournaments.py for the protocol."""
+    await TOURNAMENTS.play(ws, tid)
+
+if PROFILER is not None:
+    def _profile_key(key: str) -> str:
+        if key not in PROFILER.stats:
+            raise HTTPException(status_code=404, detail=f"No samples for {key!r}.")
+        return key
+
+    @app.get("/debug/profile")
+    async def profile_summary(top: int = 15):
+        """Sampled requests and their hottest functions, per "endpoint kind" key."""
+        return PROFILER.summary(max(1, min(top, 200)))
+
+    @app.get("/debug/profile/{key}")
+    async def profile_dump(key: str, format: str = "folded"):
+        """One key's stats: collapsed stacks for flamegraph tools, or a pstats file."""
+        key = _profile_key(key)
+        if format == "folded":
+            return PlainTextResponse(PROFILER.folded(key))
+        if format == "pstats":
+            return Response(PROFILER.pstats_bytes(key), media_type="application/octet-stream",
+                            headers={"Content-Disposition": f'attachment; filename="{key.replace(" ", "-")}.prof"'})
+        raise HTTPException(status_code=400, detail="format must be 'folded' or 'pstats'.")
+
+    @app.post("/debug/profile/reset")
+    async def profile_reset():
+        PROFILER.reset()
+        return {"ok": True}
+
+if TRACER is not None:
+    @app.get("/debug/memory")
+    async def memory_report(workers: bool = False, sample: int = memory.ESTIMATE_SAMPLE):
+        """Store sizes (sampled estimates past `sample` entries), caches, SymPy's caches; workers' too if asked."""
+        report = await asyncio.to_thread(MEMORY.report, max(16, min(sample, 4096)))
+        report["live_expired"] = PROBLEMS.expired
+        report["sympy_policy"] = memory.SYMPY_POLICY.report()
+        if workers:
+            report["workers"] = await offload.worker_memory()
+        return report
+
+    @app.post("/debug/memory/sympy-cache/clear")
+    async def memory_clear_sympy():
+        """Empty SymPy's caches here and in every worker; entries dropped per process."""
+        return {"main": memory.clear_sympy_cache(), "workers": await offload.clear_worker_caches()}
+
+    @app.post("/debug/memory/trace/start")
+    async def memory_trace_start(frames: int = memory.TRACE_FRAMES):
+        TRACER.frames = max(1, min(frames, 64))
+        TRACER.start()
+        return {"tracing": True, "frames": TRACER.frames}
+
+    @app.get("/debug/memory/trace")
+    async def memory_trace(top: int = 20, group: str = "lineno"):
+        """A tracemalloc snapshot: traced totals and the top allocation sites by growth since the last one."""
+        if group not in ("lineno", "filename", "traceback"):
+            raise HTTPException(status_code=400, detail="group must be 'lineno', 'filename' or 'traceback'.")
+        if not TRACER.running:
+            raise HTTPException(status_code=409, detail="Tracing is off; POST /debug/memory/trace/start first.")
+        return await asyncio.to_thread(TRACER.snapshot, max(1, min(top, 200)), group)
+
+    @app.post("/debug/memory/trace/stop")
+    async def memory_trace_stop():
+        TRACER.stop()
+        return {"tracing": False}
+
+@app.websocket("/ws/session")
+async def session_ws(ws: WebSocket):
+    """Server-side Game session over one WebSocket; see app/sessions.py for the protocol."""
+    await run_session(ws, POOL, ADMISSION, LEADERBOARD, SKILLS, REVIEWS, BANK)
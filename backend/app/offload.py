@@ -0,0 +1,140 @@
+# app/offload.py
+"""
+CPU offload for the API.
+
+Symbolic (slow-path) kinds generate and grade in a process pool, so the event
+loop keeps serving requests while SymPy works and several SymPy calls really
+run in parallel. Fast-path kinds (registered with a numeric kernel) are cheap
+enough to run inline on the loop, and so is a slow kind's quick_check(), which
+settles most answers without SymPy.
+
+Worker jobs can go through an admission Gate (app/admission.py), which bounds
+how many of a kind's jobs are in the pool and how long a request may wait.
+
+Problems travel to and from the workers by pickle (they are slotted, so this
+is small); set CALCDUO_WORKERS to size the pool (default: one per CPU).
+
+Every worker job ticks the worker's SymPy cache policy (calcduo/memory.py),
+so SymPy's caches can't grow past CALCDUO_SYMPY_CACHE_MAX entries in a
+long-lived worker.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app import profiling
+from app.calcduo import memory
+from app.calcduo.registry import get_kind, kind_of
+
+WORKERS = int(os.environ.get("CALCDUO_WORKERS", "0")) or os.cpu_count() or 1
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # spawn, not fork: forking a process that already runs threads can deadlock
+        ctx = multiprocessing.get_context("spawn")
+        _executor = ProcessPoolExecutor(max_workers=WORKERS, mp_context=ctx)
+    return _executor
+
+
+# --- worker-side functions (must be module level to be picklable) ---
+
+def _generate(kind_key: str, difficulty: str):
+    problem = get_kind(kind_key).create(difficulty)
+    problem.miss()   # build the wrong-answer feedback here, it travels back with the problem
+    problem.trace()  # likewise the solution steps (rendered only if asked for)
+    return problem
+
+
+def _grade(problem, answer: str):
+    return problem.check_answer(answer)
+
+
+def _job(fn, *args):
+    try:
+        return fn(*args)
+    finally:
+        memory.SYMPY_POLICY.tick()
+
+
+def _on_worker(fn, hold: float):
+    time.sleep(hold)  # keeps this worker busy, so the other calls land on the other workers
+    return os.getpid(), fn()
+
+
+def _memory_report():
+    from app.calcduo.problems.sympy_deriv_form import _expr_from_terms
+    from app.calcduo.tutor import _table, _user_fn
+    return {
+        "rss_bytes": memory.rss_bytes(),
+        "sympy": memory.sympy_cache(),
+        "policy": memory.SYMPY_POLICY.report(),
+        "caches": {name: memory.cache_info(fn) for name, fn in
+                   (("expr_from_terms", _expr_from_terms), ("tutor_table", _table), ("tutor_user_fn", _user_fn))},
+    }
+
+
+def _clear_caches():
+    return memory.clear_sympy_cache()
+
+
+# --- loop-side API ---
+
+async def run_cpu(fn, *args):
+    """Run fn(*args) in the worker pool (profiled there too when this request is being sampled)."""
+    loop = asyncio.get_running_loop()
+    sample = profiling.current()
+    if sample is None:
+        return await loop.run_in_executor(_get_executor(), _job, fn, *args)
+    result, stats = await loop.run_in_executor(_get_executor(), profiling.run_profiled, _job, fn, *args)
+    sample.worker_stats.append(stats)
+    return result
+
+
+async def _run_gated(gate, fn, *args):
+    if gate is None:
+        return await run_cpu(fn, *args)
+    async with gate.slot():  # may raise admission.Overloaded
+        return await run_cpu(fn, *args)
+
+
+async def generate(kind, difficulty: str, gate=None):
+    if kind.fast_path:
+        return kind.create(difficulty)
+    return await _run_gated(gate, _generate, kind.key, difficulty)
+
+
+async def grade(problem, answer: str, gate=None):
+    if kind_of(problem).fast_path:
+        return problem.check_answer(answer)
+    result = problem.quick_check(answer)  # e.g. deriv_form answers inside its basis
+    if result is not None:
+        return result
+    return await _run_gated(gate, _grade, problem, answer)
+
+
+async def each_worker(fn, hold: float = 0.05) -> dict:
+    """{worker pid (str): fn()} from every worker, best effort (an admin call: it holds each worker for `hold` s)."""
+    results = await asyncio.gather(*(run_cpu(_on_worker, fn, hold) for _ in range(WORKERS)))
+    return {str(pid): out for pid, out in results}
+
+
+async def worker_memory() -> dict:
+    return await each_worker(_memory_report)
+
+
+async def clear_worker_caches() -> dict:
+    """Empty SymPy's caches in every worker; {pid: entries dropped}."""
+    return await each_worker(_clear_caches)
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,178 @@
+# app/pool.py
+"""
+Pre-generated problem pool.
+
+Keeps a few ready problems per (slow-path kind, difficulty) so /new-problem and
+lesson streams can hand one out immediately; a background task tops the pool
+back up through the offload workers. Fast-path kinds are generated inline and
+never pooled.
+
+With a ProblemBank (calcduo/bank.py), buckets the bank covers are drawn from
+the mmapped file instead and never pooled or generated at runtime.
+
+take() can skip problems a session has already seen, and records every
+problem it hands out in a FrequencyIndex (how saturated each problem space is).
+Given an admission gate, take() generates through it, and when the gate turns
+the request away it hands out a pooled problem at the nearest other
+difficulty instead (or lets Overloaded through if there is none).
+"""
+import asyncio
+import logging
+import os
+
+from app import offload
+from app.admission import Overloaded
+from app.calcduo.dedup import DEDUP_TRIES, FrequencyIndex, problem_key
+from app.calcduo.registry import all_kinds
+
+POOL_SIZE = int(os.environ.get("CALCDUO_POOL_SIZE", "8"))
+
+log = logging.getLogger(__name__)
+
+
+class ProblemPool:
+    def __init__(self, size: int = POOL_SIZE, bank=None):
+        self.size = size
+        self.bank = bank
+        self._queues = {}   # (kind_key, difficulty) -> asyncio.Queue
+        self._kinds = {}    # kind_key -> ProblemKind
+        self._wake = asyncio.Event()
+        self._task = None
+        self.frequency = FrequencyIndex()
+        self.stand_ins = 0  # problems handed out at another difficulty because the gate was full
+
+    def start(self):
+        if self.size <= 0:
+            return
+        for kind in all_kinds():
+            if kind.fast_path:
+                continue
+            self._kinds[kind.key] = kind
+            for difficulty in kind.difficulties:
+                if self.bank is not None and self.bank.has(kind.key, difficulty):
+                    continue
+                self._queues[(kind.key, difficulty)] = asyncio.Queue(maxsize=self.size)
+        self._task = asyncio.create_task(self._refill_loop())
+        self._wake.set()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def take(self, kind, difficulty: str, seen=None, gate=None):
+        """
+        A ready problem if one is pooled, otherwise generate one now (through `gate`, if given).
+        With a SeenSet, skip problems already in it (pooled ones go back for others).
+        """
+        problem = await self._take(kind, difficulty, seen, gate)
+        key = problem_key(problem)
+        if seen is not None:
+            seen.add(key)
+        self.frequency.record(problem, key)
+        return problem
+
+    def _pop(self, q, seen):
+        """A pooled problem not in seen, or None; skipped ones go back."""
+        skipped = []
+        problem = None
+        for _ in range(q.qsize()):
+            candidate = q.get_nowait()
+            if seen is None or problem_key(candidate) not in seen:
+                problem = candidate
+                break
+            skipped.append(candidate)
+        for p in skipped:
+            q.put_nowait(p)
+        return problem
+
+    def _nearest(self, kind, difficulty, seen):
+        """A pooled problem of the kind at the closest other difficulty, or None."""
+        levels = kind.difficulties
+        i = levels.index(difficulty) if difficulty in levels else 0
+        for d in sorted(levels, key=lambda d: abs(levels.index(d) - i)):
+            q = self._queues.get((kind.key, d))
+            if q is not None and d != difficulty:
+                problem = self._pop(q, seen)
+                if problem is not None:
+                    self._wake.set()
+                    return problem
+        return None
+
+    async def _take(self, kind, difficulty, seen, gate=None):
+        if self.bank is not None and self.bank.has(kind.key, difficulty):
+            problem = self.bank.draw(kind.key, difficulty)
+            for _ in range(DEDUP_TRIES - 1):
+                if seen is None or problem_key(problem) not in seen:
+                    break
+                problem = self.bank.draw(kind.key, difficulty)
+            return problem
+        q = self._queues.get((kind.key, difficulty))
+        if q is not None:
+            self._wake.set()
+            problem = self._pop(q, seen)
+            if problem is not None:
+                return problem
+        try:
+            problem = await offload.generate(kind, difficulty, gate)
+        except Overloaded:
+            problem = self._nearest(kind, difficulty, seen)
+            if problem is None:
+                raise
+            self.stand_ins += 1
+            return problem
+        for _ in range(DEDUP_TRIES - 1):
+            if seen is None or problem_key(problem) not in seen:
+                break
+            try:
+                problem = await offload.generate(kind, difficulty, gate)
+            except Overloaded:
+                break  # a repeat beats no problem
+        return problem
+
+    def put(self, problem) -> bool:
+        """Return a problem to the pool; False if there is no room for it."""
+        q = self._queues.get((problem.kind, problem.difficulty))
+        if q is None or q.full():
+            return False
+        q.put_nowait(problem)
+        return True
+
+    def pooled(self) -> list:
+        """Every problem waiting in the pool (they stay pooled)."""
+        out = []
+        for q in self._queues.values():
+            items = [q.get_nowait() for _ in range(q.qsize())]
+            for p in items:
+                q.put_nowait(p)
+            out += items
+        return out
+
+    def levels(self) -> dict:
+        return {f"{k}/{d}": q.qsize() for (k, d), q in self._queues.items()}
+
+    async def _fill(self, kind, difficulty, q):
+        missing = q.maxsize - q.qsize()
+        jobs = [offload.generate(kind, difficulty) for _ in range(missing)]
+        for job in asyncio.as_completed(jobs):
+            try:
+                problem = await job
+            except Exception:
+                log.exception("pool refill failed for %s/%s", kind.key, difficulty)
+                continue
+            if not q.full():
+                q.put_nowait(problem)
+
+    async def _refill_loop(self):
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            await asyncio.gather(*(
+                self._fill(self._kinds[key], difficulty, q)
+                for (key, difficulty), q in self._queues.items()
+                if not q.full()
+            ))
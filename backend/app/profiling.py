@@ -0,0 +1,217 @@
+# app/profiling.py
+"""
+Opt-in request profiling: cProfile on a sample of /new-problem and /answer.
+
+Set CALCDUO_PROFILE_RATE to a fraction (e.g. 0.05) to turn it on. At 0, the
+default, main.py adds neither the middleware nor the /debug/profile routes,
+and offload only tests one module-level bool per call.
+
+A sampled request runs under cProfile on the event loop. Timings are CPU
+time (time.process_time), so the loop idling in epoll while a worker runs
+doesn't count. The profiler is
+thread-wide, so another request's coroutine that runs while this one awaits
+is counted too. Only one request is profiled at a time; others that come up
+for sampling meanwhile are skipped. When the request hands work to the
+offload pool, the worker profiles that call as well and sends its stats
+back with the result. That is where the SymPy time of the symbolic kinds
+shows up.
+
+Stats are aggregated per "endpoint kind" key (the handler names the kind
+with tag()). They are served by /debug/profile as:
+- a JSON top list
+- a pstats file (`python -m pstats`, snakeviz, gprof2dot, flameprof)
+- collapsed stacks for flamegraph.pl / speedscope / inferno
+cProfile keeps caller -> callee edges, not whole stacks. The collapsed
+stacks come from walking that call graph from its roots, giving each callee
+a share of its time proportional to the edge's cumulative time. That is
+the same approximation flameprof uses.
+With CALCDUO_PROFILE_DIR set, every key is also written there as
+<key>.prof and <key>.folded on shutdown.
+"""
+import contextvars
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+
+PROFILE_RATE = float(os.environ.get("CALCDUO_PROFILE_RATE", "0"))
+PROFILE_DIR = os.environ.get("CALCDUO_PROFILE_DIR")
+PROFILED_PATHS = ("/new-problem", "/answer")
+ENABLED = PROFILE_RATE > 0
+
+FOLD_MAX_DEPTH = 64
+FOLD_MIN_FRACTION = 1e-4  # branches with less of the total time are pruned from the collapsed stacks
+
+_current = contextvars.ContextVar("calcduo_profile_sample", default=None)
+
+
+class Sample:
+    __slots__ = ("endpoint", "kind", "worker_stats")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.kind = "-"
+        self.worker_stats = []  # raw stats dicts sent back by offload workers
+
+
+def current():
+    """The sample being taken for this request, or None."""
+    return _current.get() if ENABLED else None
+
+
+def tag(kind_key: str):
+    """Name the problem kind of the request being profiled (no-op when it isn't)."""
+    sample = current()
+    if sample is not None:
+        sample.kind = kind_key
+
+
+class _RawStats:
+    """What pstats.Stats.add() accepts: anything with create_stats() and .stats."""
+    def __init__(self, stats: dict):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def run_profiled(fn, *args):
+    """Worker side: fn(*args) under cProfile; returns (result, raw stats)."""
+    prof = cProfile.Profile(time.process_time)
+    result = prof.runcall(fn, *args)
+    prof.create_stats()
+    return result, prof.stats
+
+
+def _label(func) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name  # built-ins, e.g. <built-in method math.sqrt>
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def folded(stats: pstats.Stats) -> str:
+    """Collapsed stacks ("a;b;c microseconds" lines) approximated from the call graph."""
+    raw = stats.stats
+    callees = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))  # edge cumtime
+    roots = [f for f, v in raw.items() if not v[4]]
+    # the walk visits paths, not functions; pruning small branches keeps it from exploding
+    floor = FOLD_MIN_FRACTION * sum(raw[f][3] for f in roots)
+    lines = {}
+
+    def walk(func, share, path):
+        cc, nc, tt, ct, _ = raw[func]
+        path = path + (_label(func),)
+        self_us = int(tt * share * 1e6)
+        if self_us > 0:
+            key = ";".join(path)
+            lines[key] = lines.get(key, 0) + self_us
+        if len(path) >= FOLD_MAX_DEPTH:
+            return
+        for callee, edge_ct in callees.get(func, ()):
+            total = raw[callee][3]
+            if share * edge_ct >= floor and total > 0 and _label(callee) not in path:  # no recursion
+                walk(callee, share * min(1.0, edge_ct / total), path)
+
+    for root in roots:
+        walk(root, 1.0, ())
+    return "".join(f"{k} {v}\n" for k, v in sorted(lines.items()))
+
+
+class Profiler:
+    """Aggregated pstats per "endpoint kind" key."""
+
+    def __init__(self, rate: float = PROFILE_RATE):
+        self.rate = rate
+        self.stats = {}    # key -> pstats.Stats
+        self.samples = {}  # key -> requests sampled
+        self.skipped = 0   # came up for sampling while another request was being profiled
+        self._busy = threading.Lock()
+
+    def add(self, sample: Sample, prof: cProfile.Profile | None = None):
+        """Merge one sample: the loop-side profile (if any) and whatever its workers sent back."""
+        key = f"{sample.endpoint.strip('/')} {sample.kind}"
+        parts = ([prof] if prof is not None else []) + [_RawStats(s) for s in sample.worker_stats]
+        if not parts:
+            return
+        st = self.stats.get(key)
+        if st is None:
+            st = self.stats[key] = pstats.Stats(parts[0], stream=io.StringIO())
+            parts = parts[1:]
+        if parts:
+            st.add(*parts)
+        self.samples[key] = self.samples.get(key, 0) + 1
+
+    def summary(self, top: int = 15) -> dict:
+        out = {}
+        for key, st in sorted(self.stats.items()):
+            rows = sorted(st.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:top]
+            out[key] = {
+                "samples": self.samples[key],
+                "total_s": round(st.total_tt, 6),
+                "top": [{"function": _label(f), "calls": nc, "tottime": round(tt, 6), "cumtime": round(ct, 6)}
+                        for f, (cc, nc, tt, ct, _) in rows],
+            }
+        return {"rate": self.rate, "skipped": self.skipped, "keys": out}
+
+    def pstats_bytes(self, key: str) -> bytes:
+        """The key's stats in the marshal format Stats.dump_stats() writes."""
+        return marshal.dumps(self.stats[key].stats)
+
+    def folded(self, key: str) -> str:
+        return folded(self.stats[key])
+
+    def reset(self):
+        self.stats.clear()
+        self.samples.clear()
+        self.skipped = 0
+
+    def dump(self, directory: str):
+        """Write <key>.prof and <key>.folded for every key; returns the paths written."""
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for key in self.stats:
+            base = os.path.join(directory, key.replace(" ", "-").replace("/", "_"))
+            with open(base + ".prof", "wb") as f:
+                f.write(self.pstats_bytes(key))
+            with open(base + ".folded", "w") as f:
+                f.write(self.folded(key))
+            paths += [base + ".prof", base + ".folded"]
+        return paths
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware: profiles a `profiler.rate` fraction of PROFILED_PATHS requests."""
+
+    def __init__(self, app, profiler: Profiler, paths=PROFILED_PATHS):
+        self.app = app
+        self.profiler = profiler
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["path"] not in self.paths
+                or random.random() >= self.profiler.rate):
+            return await self.app(scope, receive, send)
+        if not self.profiler._busy.acquire(blocking=False):
+            self.profiler.skipped += 1
+            return await self.app(scope, receive, send)
+        sample = Sample(scope["path"])
+        token = _current.set(sample)
+        prof = cProfile.Profile(time.process_time)
+        try:
+            prof.enable()
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                prof.disable()
+            self.profiler.add(sample, prof)
+        finally:
+            _current.reset(token)
+            self.profiler._busy.release()
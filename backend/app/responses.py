@@ -0,0 +1,60 @@
+# app/responses.py
+"""
+Response encoding and HTTP caching helpers.
+
+- orjson when available (CALCDUO_ORJSON=0 forces the stdlib encoder, for comparisons)
+- /answer bodies are encoded once per distinct (ok, feedback) pair and reused;
+  feedback strings are themselves built once per problem (Problem.miss)
+- ETag / If-None-Match for read endpoints whose content changes rarely
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+USE_ORJSON = orjson is not None and os.environ.get("CALCDUO_ORJSON", "1") != "0"
+
+if USE_ORJSON:
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    class DefaultResponse(JSONResponse):
+        def render(self, content) -> bytes:
+            return orjson.dumps(content)
+else:
+    DefaultResponse = JSONResponse
+
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+MEDIA_JSON = "application/json"
+
+
+@lru_cache(maxsize=8192)
+def answer_body(ok: bool, feedback: str) -> bytes:
+    return dumps({"ok": ok, "feedback": feedback})
+
+
+def answer_response(ok: bool, feedback: str) -> Response:
+    return Response(content=answer_body(ok, feedback), media_type=MEDIA_JSON)
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+
+def cached_json(request: Request, body: bytes, etag: str, media_type: str = MEDIA_JSON) -> Response:
+    """200 with the body, or 304 if the client already has this version."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}  # always revalidate
+    inm = request.headers.get("if-none-match")
+    if inm and etag in (t.strip() for t in inm.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
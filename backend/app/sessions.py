@@ -0,0 +1,101 @@
+# app/sessions.py
+"""
+WebSocket game sessions.
+
+One connection runs a whole GameSession: score, streak and hearts live on the
+server, and each answer costs a single frame each way. While the player is
+answering, the next problem is already being produced (prefetch), so the
+following "problem" frame goes out as soon as the result is sent.
+
+Protocol (JSON text frames):
+  client  {"type": "start", "player": "Ana", "lesson": "deriv_form" | "practice", "rounds": 5}
+  server  {"type": "problem", "kind", "difficulty", "prompt", "state"}
+  client  {"type": "answer", "answer": "3x^2"}
+  server  {"type": "result", "ok", "feedback", "gained", "bonus", "state"}
+  ...     (problem / answer / result until the plan is done or hearts run out)
+  server  {"type": "end", "reason": "complete" | "hearts", "state"}
+Errors are {"type": "error", "detail": "..."}; the connection stays open.
+Answers are graded through admission control (app.admission). When the
+server is too busy to grade one, the error also has "retry_after"
+(seconds), and the same problem waits for the answer to be sent again.
+"""
+import asyncio
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app.admission import Overloaded
+from app.calcduo.engine.session import GameSession, PRACTICE
+
+MAX_ROUNDS = 50
+
+
+async def _expect(ws: WebSocket, msg_type: str) -> dict:
+    while True:
+        try:
+            msg = await ws.receive_json()
+        except (ValueError, KeyError):  # not JSON, or a binary frame
+            await ws.send_json({"type": "error", "detail": "Frames must be JSON text."})
+            continue
+        if isinstance(msg, dict) and msg.get("type") == msg_type:
+            return msg
+        await ws.send_json({"type": "error", "detail": f"Expected a {msg_type!r} message."})
+
+
+async def _grade(ws: WebSocket, admission, problem):
+    """(ok, feedback) for the player's answer, asking again while the server is too busy."""
+    while True:
+        msg = await _expect(ws, "answer")
+        try:
+            return await admission.grade(problem, str(msg.get("answer", "")))
+        except Overloaded as e:
+            await ws.send_json({"type": "error", "detail": "The server is busy. Send the answer again shortly.",
+                                "retry_after": e.retry_after})
+
+
+def _prefetch(pool, session: GameSession, i: int):
+    step = session.step(i)
+    if step is None:
+        return None
+    kind, difficulty = step
+    return asyncio.create_task(pool.take(kind, difficulty, session.seen))
+
+
+async def run_session(ws: WebSocket, pool, admission, leaderboard, skill, reviews, bank=None):
+    await ws.accept()
+    session = None
+    pending = None
+    try:
+        start = await _expect(ws, "start")
+        try:
+            session = GameSession(
+                str(start.get("player") or "Player"),
+                lesson=str(start.get("lesson") or PRACTICE),
+                rounds=max(1, min(int(start.get("rounds", 5)), MAX_ROUNDS)),
+                leaderboard=leaderboard,
+                skill=skill,
+                reviews=reviews,
+                bank=bank,
+            )
+        except (KeyError, ValueError, TypeError) as e:
+            await ws.send_json({"type": "error", "detail": str(e.args[0] if e.args else e)})
+            await ws.close()
+            return
+
+        pending = _prefetch(pool, session, 0)
+        while not session.finished:
+            problem = await pending
+            pending = _prefetch(pool, session, session.index + 1)  # generate while they think
+            await ws.send_json(session.problem_message(problem))
+
+            ok, feedback = await _grade(ws, admission, problem)
+            await ws.send_json(session.apply_result(problem, ok, feedback))
+
+        await ws.send_json(session.finish())
+        await ws.close()
+    except WebSocketDisconnect:
+        # Player left mid-run: keep what they earned, like the CLI does at run end
+        if session is not None and session.index > 0:
+            session.finish()
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
@@ -0,0 +1,253 @@
+# app/snapshot.py
+"""
+Warm restart: live and pooled problems survive a restart of the API.
+
+A snapshot holds every live problem (the /answer store, by problem id) and
+every pooled problem. Each one is kept in its codec form, together with the
+prompt and miss feedback it has already rendered. Those strings are the parts
+that cost SymPy time, so they are never rebuilt. The Snapshotter writes a
+snapshot on shutdown and every SNAPSHOT_EVERY seconds, and restores one on
+startup:
+- the file is mmapped and one pass over the record headers indexes the
+  live problems by id; a live problem is only decoded when a request asks
+  for it (LiveProblems.get)
+- pooled problems are decoded and go straight back into their pool queues
+- restore time (time-to-ready) is logged and reported by /stats/snapshot
+
+A save encodes the records on the event loop, so it sees one consistent
+state, and writes them in a thread. It writes to a temp name and renames it
+over the old file. A crash mid-write leaves the previous snapshot, and a
+mapping of the old file stays valid. Restored problems that were never
+decoded are copied across byte for byte.
+
+Layout (little-endian):
+  header   "CDS1", live count, pooled count, kinds-table bytes, written at (unix time)
+  kinds    JSON [kind key, ...]
+  records  <BHIHH> id length (0 = pooled), kind index, payload / prompt / feedback
+           lengths, then the id, the codec payload, the prompt and the feedback
+           (UTF-8; empty if the problem hadn't rendered it)
+"""
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from itertools import islice
+
+from app.calcduo.config import SNAPSHOT_FILE
+from app.calcduo.registry import all_kinds, get_kind
+
+SNAPSHOT_EVERY = float(os.environ.get("CALCDUO_SNAPSHOT_EVERY", "60"))  # seconds; 0 = only on shutdown
+LIVE_MAX = int(os.environ.get("CALCDUO_LIVE_MAX", "200000"))  # live problems kept for /answer; 0 = no limit
+
+_MAGIC = b"CDS1"
+_HEADER = struct.Struct("<4sIIId")
+_RECORD = struct.Struct("<BHIHH")
+_MAX_TEXT = 0xFFFF
+
+log = logging.getLogger(__name__)
+
+
+class LiveProblems(dict):
+    """problem_id -> problem, plus restored problems that are decoded on first lookup."""
+
+    def __init__(self, limit: int = LIVE_MAX):
+        super().__init__()
+        self.restored = {}  # problem_id -> (Snapshot, record offset), not decoded yet
+        self.limit = limit
+        self.expired = 0
+
+    def get(self, problem_id, default=None):
+        problem = dict.get(self, problem_id)
+        if problem is None:
+            hit = self.restored.pop(problem_id, None)
+            if hit is None:
+                return default
+            problem = self[problem_id] = hit[0].problem(hit[1])
+        return problem
+
+    def expire(self):
+        """Drop the oldest problems once there are more than `limit`; returns their ids.
+
+        Restored problems go first (they are older than anything stored since).
+        Eviction runs in batches of limit // 16: dropping a dict's oldest keys
+        one at a time would rescan the deleted slots at its front on every call.
+        """
+        over = len(self) + len(self.restored) - self.limit
+        if self.limit <= 0 or over <= 0:
+            return ()
+        over += self.limit // 16
+        gone = list(islice(self.restored, over))
+        for pid in gone:
+            del self.restored[pid]
+        if over > len(gone):
+            old = list(islice(dict.__iter__(self), over - len(gone)))
+            for pid in old:
+                dict.__delitem__(self, pid)
+            gone += old
+        self.expired += len(gone)
+        return gone
+
+
+def _text(problem, slot: str, i=None) -> bytes:
+    """An already rendered string of the problem's (never renders one)."""
+    try:
+        value = getattr(problem, slot)
+    except AttributeError:
+        return b""
+    raw = (value if i is None else value[i]).encode()
+    return raw if len(raw) <= _MAX_TEXT else b""
+
+
+def _record(problem_id: str, kind_index: dict, problem) -> bytes:
+    kind = get_kind(problem.kind)
+    pid = problem_id.encode()
+    payload = kind.dump(problem)
+    prompt = _text(problem, "_prompt")
+    feedback = _text(problem, "_miss", 1)
+    return b"".join((
+        _RECORD.pack(len(pid), kind_index[kind.key], len(payload), len(prompt), len(feedback)),
+        pid, payload, prompt, feedback,
+    ))
+
+
+class Snapshot:
+    """A snapshot file, mmapped read-only; records are decoded on request."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = self._view = memoryview(self._mm)
+        magic, n_live, n_pooled, table_len, self.written_at = _HEADER.unpack_from(buf)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a snapshot")
+        off = _HEADER.size
+        self.kinds = []
+        for key in json.loads(bytes(buf[off:off + table_len])):
+            try:
+                self.kinds.append(get_kind(key))
+            except KeyError:
+                self.kinds.append(None)  # kind no longer installed: its records are skipped
+        off += table_len
+        self.live = {}    # problem_id -> record offset
+        self.pooled = []  # record offsets
+        for _ in range(n_live + n_pooled):
+            n_id, k, n_payload, n_prompt, n_feedback = _RECORD.unpack_from(buf, off)
+            if self.kinds[k] is not None:
+                if n_id:
+                    self.live[str(buf[off + _RECORD.size:off + _RECORD.size + n_id], "utf-8")] = off
+                else:
+                    self.pooled.append(off)
+            off += _RECORD.size + n_id + n_payload + n_prompt + n_feedback
+
+    @classmethod
+    def open(cls, path: str = SNAPSHOT_FILE):
+        """The snapshot at `path`, or None if there isn't a readable one (a cold start)."""
+        try:
+            return cls(path)
+        except FileNotFoundError:
+            return None
+        except (ValueError, struct.error, IndexError) as e:
+            log.warning("ignoring snapshot %s: %s", path, e)
+            return None
+
+    def problem(self, off: int):
+        buf = self._view
+        n_id, k, n_payload, n_prompt, n_feedback = _RECORD.unpack_from(buf, off)
+        off += _RECORD.size + n_id
+        problem = self.kinds[k].load(buf[off:off + n_payload])
+        off += n_payload
+        if n_prompt:
+            problem._prompt = str(buf[off:off + n_prompt], "utf-8")
+        off += n_prompt
+        if n_feedback:
+            problem._miss = (False, str(buf[off:off + n_feedback], "utf-8"))
+        return problem
+
+    def raw(self, off: int, kind_index: dict) -> bytes:
+        """The record at `off`, re-pointed at another kinds table."""
+        n_id, k, n_payload, n_prompt, n_feedback = _RECORD.unpack_from(self._view, off)
+        end = off + _RECORD.size + n_id + n_payload + n_prompt + n_feedback
+        head = _RECORD.pack(n_id, kind_index[self.kinds[k].key], n_payload, n_prompt, n_feedback)
+        return head + self._view[off + _RECORD.size:end].tobytes()
+
+
+def encode(problems: LiveProblems, pool=None) -> bytes:
+    """The snapshot bytes for the live problems and (optionally) a ProblemPool's contents."""
+    keys = [k.key for k in all_kinds()]
+    kind_index = {key: i for i, key in enumerate(keys)}
+    records = [_record(pid, kind_index, p) for pid, p in problems.items()]
+    records += [snap.raw(off, kind_index) for snap, off in problems.restored.values()]
+    n_live = len(records)
+    if pool is not None:
+        records += [_record("", kind_index, p) for p in pool.pooled()]
+    table = json.dumps(keys).encode()
+    header = _HEADER.pack(_MAGIC, n_live, len(records) - n_live, len(table), time.time())
+    return b"".join([header, table, *records])
+
+
+def write(path: str, data: bytes):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class Snapshotter:
+    def __init__(self, problems: LiveProblems, pool, path: str = SNAPSHOT_FILE, every: float = SNAPSHOT_EVERY):
+        self.problems = problems
+        self.pool = pool
+        self.path = path
+        self.every = every
+        self.stats = {"restored_live": 0, "restored_pooled": 0, "ready_ms": None,
+                      "saves": 0, "last_save_ms": None, "bytes": 0}
+        self._task = None
+
+    def restore(self):
+        """Load the last snapshot, if any; call after the pool has started. Returns the snapshot or None."""
+        t0 = time.perf_counter()
+        snap = Snapshot.open(self.path) if self.path else None
+        if snap is None:
+            return None
+        for pid, off in snap.live.items():
+            if pid not in self.problems:
+                self.problems.restored[pid] = (snap, off)
+        pooled = sum(self.pool.put(snap.problem(off)) for off in snap.pooled)
+        ready = (time.perf_counter() - t0) * 1e3
+        self.stats.update(restored_live=len(snap.live), restored_pooled=pooled, ready_ms=round(ready, 2))
+        log.info("restored %d live and %d pooled problems from %s in %.1f ms",
+                 len(snap.live), pooled, self.path, ready)
+        return snap
+
+    async def save(self):
+        if not self.path:
+            return
+        t0 = time.perf_counter()
+        data = encode(self.problems, self.pool)
+        await asyncio.to_thread(write, self.path, data)
+        self.stats.update(saves=self.stats["saves"] + 1, bytes=len(data),
+                          last_save_ms=round((time.perf_counter() - t0) * 1e3, 2))
+
+    def start(self):
+        if self.path and self.every > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.every)
+            try:
+                await self.save()
+            except OSError:
+                log.exception("snapshot to %s failed", self.path)
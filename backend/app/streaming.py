@@ -0,0 +1,68 @@
+# app/streaming.py
+"""
+Server-sent-events delivery of a lesson's problems.
+
+A producer task generates problems into a small bounded queue and the SSE
+response drains it. When the client stops reading, the response's send blocks,
+the queue fills and the producer waits on put(): generation is paced by the
+client (backpressure) instead of piling up in memory. Disconnects cancel the
+producer.
+"""
+import asyncio
+
+from app.calcduo.config import PROBLEMS_PER_STAGE
+from app.calcduo.dedup import SeenSet
+from app.responses import dumps
+
+STREAM_BUFFER = 2  # problems generated ahead of what the client has read
+
+_DONE = object()
+
+
+def sse_event(event: str, data: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+async def lesson_events(request, pool, kind, difficulties, store, per_stage=PROBLEMS_PER_STAGE):
+    """
+    Async generator of SSE frames for one lesson of `kind`.
+    `store(problem) -> problem_id` registers each problem for /answer.
+    """
+    queue = asyncio.Queue(maxsize=STREAM_BUFFER)
+    total = len(difficulties) * per_stage
+    seen = SeenSet()  # no repeats within one lesson
+
+    async def produce():
+        try:
+            for difficulty in difficulties:
+                for _ in range(per_stage):
+                    problem = await pool.take(kind, difficulty, seen)
+                    await queue.put(problem)  # blocks while the client lags
+            await queue.put(_DONE)
+        except Exception as e:
+            await queue.put(e)
+
+    producer = asyncio.create_task(produce())
+    try:
+        index = 0
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                yield sse_event("error", {"detail": "Problem generation failed."})
+                return
+            if await request.is_disconnected():
+                return
+            index += 1
+            yield sse_event("problem", {
+                "problem_id": store(item),
+                "kind": kind.key,
+                "difficulty": item.difficulty,
+                "prompt": item.prompt(),
+                "index": index,
+                "total": total,
+            })
+        yield sse_event("done", {"total": total})
+    finally:
+        producer.cancel()
@@ -0,0 +1,255 @@
+# app/tournaments.py
+"""
+Tournament play over WebSockets, with live standings.
+
+Everyone in a tournament gets the same seeded problem set (calcduo.engine.
+tournament), so each problem frame is encoded once and sent as-is to every
+player. Answers are graded concurrently. Each connection awaits its own
+grade through admission control (app.admission): fast kinds are graded
+inline, SymPy ones in the worker pool. When the server is too busy to
+grade an answer, the player gets an error with "retry_after" and answers
+the same problem again.
+Each correct answer moves the player in the tournament's RankIndex, and the
+result frame reports their new rank at once.
+
+Protocol (JSON text frames) on /ws/tournament/{id}:
+  client  {"type": "join", "player": "Ana"}
+  server  {"type": "problem", "index", "total", "kind", "difficulty", "prompt"}
+  client  {"type": "answer", "answer": "12"}
+  server  {"type": "result", "ok", "feedback", "gained", "bonus", "state"}   state has rank / players
+  ...     (problem / answer / result through the set)
+  server  {"type": "end", "reason": "complete" | "time", "state"}
+  server  {"type": "standings", "top", "players", "ends_in"}   pushed any time (see below)
+Errors are {"type": "error", "detail": "..."}; the connection stays open.
+
+Standings are pushed, not polled. The hub's push loop wakes every
+STANDINGS_INTERVAL. For each tournament whose ranking changed, it encodes the
+top STANDINGS_TOP once and hands that frame to every connection. Each
+connection has one writer task, the only thing that writes to its socket.
+A slow client has at most one standings frame waiting: a newer one replaces
+it. Its results and problems are never dropped.
+
+Results go to the leaderboard in one batch per push interval, not one file
+save per player.
+"""
+import asyncio
+import os
+import random
+import time
+import uuid
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from app import offload
+from app.admission import Overloaded
+from app.calcduo.engine.tournament import Tournament, default_plan, problem_set
+from app.calcduo.registry import get_kind
+from app.responses import dumps
+
+STANDINGS_INTERVAL = int(os.environ.get("CALCDUO_STANDINGS_MS", "500")) / 1000
+STANDINGS_TOP = 10
+MAX_ROUNDS = 30
+TOURNAMENT_TTL = 6 * 3600  # seconds a tournament without a time limit stays joinable
+
+_PUSH = None   # queue marker: send the connection's latest standings frame
+_CLOSE = object()
+
+
+class _Connection:
+    __slots__ = ("queue", "standings")
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.standings = None
+
+    def send(self, frame: str):
+        self.queue.put_nowait(frame)
+
+    def push_standings(self, frame: str):
+        if self.standings is None:
+            self.queue.put_nowait(_PUSH)
+        self.standings = frame  # an older frame still waiting is simply replaced
+
+
+async def _writer(ws: WebSocket, conn: _Connection):
+    while True:
+        frame = await conn.queue.get()
+        if frame is _CLOSE:
+            return
+        if frame is _PUSH:
+            frame, conn.standings = conn.standings, None
+        await ws.send_text(frame)
+
+
+def _frame(msg) -> str:
+    return dumps(msg).decode()
+
+
+class TournamentHub:
+    """Live tournaments by id, their connections, and the loop that pushes standings."""
+
+    def __init__(self, leaderboard, admission):
+        self.leaderboard = leaderboard
+        self.admission = admission
+        self.tournaments = {}
+        self._frames = {}     # id -> encoded problem frames
+        self._conns = {}      # id -> {player: _Connection}
+        self._pushed = {}     # id -> ranking version last pushed
+        self._recorded = {}   # id -> players whose result went to the leaderboard
+        self._results = []    # (player, score) waiting for the next leaderboard save
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._push_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for tid in list(self.tournaments):
+            self._close(tid)
+        self._flush()
+
+    async def create(self, rounds: int = 10, seed: int | None = None, seconds: float | None = None,
+                     kinds=None) -> Tournament:
+        """A new tournament; raises KeyError for unknown kinds."""
+        seed = random.randrange(2 ** 31) if seed is None else seed
+        plan = default_plan(max(1, min(rounds, MAX_ROUNDS)), kinds)
+        if all(get_kind(k).fast_path for k, _ in plan):
+            problems = problem_set(seed, plan)
+        else:
+            problems = await offload.run_cpu(problem_set, seed, plan)  # SymPy kinds: keep the loop free
+        t = Tournament(uuid.uuid4().hex[:12], seed, plan, problems, seconds)
+        self.tournaments[t.id] = t
+        self._frames[t.id] = [
+            _frame({"type": "problem", "index": i, "total": t.total, "kind": p.kind,
+                    "difficulty": p.difficulty, "prompt": p.prompt()})
+            for i, p in enumerate(problems)
+        ]
+        self._conns[t.id] = {}
+        self._recorded[t.id] = set()
+        return t
+
+    def get(self, tid: str):
+        return self.tournaments.get(tid)
+
+    def _record(self, t: Tournament, e):
+        done = self._recorded[t.id]
+        if e.name not in done:
+            done.add(e.name)
+            self._results.append((e.name, e.score))
+
+    def _flush(self):
+        if self._results:
+            results, self._results = self._results, []
+            self.leaderboard.add_scores(results)
+
+    def _close(self, tid: str):
+        """Forget a finished tournament; anyone who never reached the end is recorded as they stand."""
+        t = self.tournaments.pop(tid)
+        for e in t.entrants.values():
+            self._record(t, e)
+        for table in (self._frames, self._conns, self._pushed, self._recorded):
+            table.pop(tid, None)
+
+    async def _push_loop(self):
+        while True:
+            await asyncio.sleep(STANDINGS_INTERVAL)
+            now = time.time()
+            for tid, t in list(self.tournaments.items()):
+                conns = self._conns[tid]
+                if conns and self._pushed.get(tid) != t.version:
+                    self._pushed[tid] = t.version
+                    frame = _frame({"type": "standings", **t.standings(STANDINGS_TOP)})
+                    for conn in conns.values():
+                        conn.push_standings(frame)
+                expired = t.over(now) or (t.ends_at is None and now - t.started > TOURNAMENT_TTL)
+                if expired and not conns:
+                    self._close(tid)
+            self._flush()
+
+    async def play(self, ws: WebSocket, tid: str):
+        await ws.accept()
+        t = self.get(tid)
+        if t is None:
+            await ws.send_json({"type": "error", "detail": "No such tournament."})
+            await ws.close()
+            return
+        conns = self._conns[tid]
+        conn = _Connection()
+        writer = asyncio.create_task(_writer(ws, conn))
+        name = None
+        try:
+            name = await self._join(ws, conn, t)
+            if name is None:
+                await writer
+                await ws.close()
+                return
+            e = t.join(name)
+            conns[name] = conn
+            frames = self._frames[tid]
+            reason = "complete"
+            sent = -1  # index of the problem frame last sent
+            while e.index < t.total:
+                if t.over():
+                    reason = "time"
+                    break
+                if sent != e.index:
+                    conn.send(frames[e.index])
+                    sent = e.index
+                left = None if t.ends_at is None else max(0.0, t.ends_at - time.time())
+                try:
+                    msg = await asyncio.wait_for(self._expect(ws, conn, "answer"), left)
+                except asyncio.TimeoutError:
+                    reason = "time"
+                    break
+                try:
+                    ok, feedback = await self.admission.grade(t.problems[e.index], str(msg.get("answer", "")))
+                except Overloaded as err:
+                    conn.send(_frame({"type": "error", "detail": "The server is busy. Send the answer again shortly.",
+                                      "retry_after": err.retry_after}))
+                    continue
+                if t.over():  # came in after the bell
+                    reason = "time"
+                    break
+                gained, bonus = t.record(e, ok)
+                conn.send(_frame({"type": "result", "ok": ok, "feedback": feedback,
+                                  "gained": gained, "bonus": bonus, "state": t.state(e)}))
+            self._record(t, e)
+            conn.send(_frame({"type": "end", "reason": reason, "state": t.state(e)}))
+            conn.send(_CLOSE)
+            await writer
+            await ws.close()
+        except WebSocketDisconnect:
+            pass  # the entry stays; rejoining under the same name resumes it
+        finally:
+            if name is not None and conns.get(name) is conn:
+                del conns[name]
+            if not writer.done():
+                writer.cancel()
+
+    async def _expect(self, ws: WebSocket, conn: _Connection, msg_type: str) -> dict:
+        while True:
+            try:
+                msg = await ws.receive_json()
+            except (ValueError, KeyError):  # not JSON, or a binary frame
+                conn.send(_frame({"type": "error", "detail": "Frames must be JSON text."}))
+                continue
+            if isinstance(msg, dict) and msg.get("type") == msg_type:
+                return msg
+            conn.send(_frame({"type": "error", "detail": f"Expected a {msg_type!r} message."}))
+
+    async def _join(self, ws: WebSocket, conn: _Connection, t: Tournament):
+        """The joining player's name, or None (after telling them why) if they can't play."""
+        msg = await self._expect(ws, conn, "join")
+        name = str(msg.get("player") or "Player")
+        if name in self._conns[t.id]:
+            detail = f"{name!r} is already playing in this tournament."
+        elif t.over():
+            detail = "This tournament is over."
+        else:
+            return name
+        conn.send(_frame({"type": "error", "detail": detail}))
+        conn.send(_CLOSE)
+        return None
@@ -0,0 +1,98 @@
+# app/tutor.py
+"""
+Micro-batching front end for the answer-explanation tutor (calcduo/tutor.py).
+
+Concurrent /tutor/explain requests queue up here; the batcher collects what
+arrives within TUTOR_WINDOW_MS (up to TUTOR_MAX_BATCH) and sends the whole
+batch to one offload worker, where diagnose_batch() evaluates all of it in a
+single vectorized pass. At most one batch per worker is in flight.
+
+Latency targets (see bench/tutor_batching.py): p50 under TARGET_P50_MS and
+p99 under TARGET_P99_MS at 64 concurrent clients, for answers already seen
+by a worker (first sightings pay a one-off parse + compile).
+"""
+import asyncio
+import os
+
+from app import offload
+from app.calcduo.tutor import diagnose_batch
+
+TUTOR_WINDOW_MS = float(os.environ.get("CALCDUO_TUTOR_WINDOW_MS", "2"))
+TUTOR_MAX_BATCH = int(os.environ.get("CALCDUO_TUTOR_BATCH", "64"))
+
+# Problem kinds the tutor can explain: symbolic derivatives, answered with an expression
+TUTOR_KINDS = frozenset({"deriv_form"})
+
+TARGET_P50_MS = 25
+TARGET_P99_MS = 100
+
+
+class TutorBatcher:
+    def __init__(self, window_ms: float = TUTOR_WINDOW_MS, max_batch: int = TUTOR_MAX_BATCH,
+                 in_flight: int = offload.WORKERS):
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.in_flight = in_flight
+        self.batches = 0   # counters, for the benchmark and logs
+        self.items = 0
+        self._queue = None
+        self._slots = None
+        self._task = None
+        self._running = set()
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.in_flight)
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def explain(self, problem, answer: str) -> dict:
+        """Diagnose a wrong (or right) answer to a term-spec problem."""
+        if self._task is None:
+            self.start()
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((problem.terms, answer, fut))
+        return await fut
+
+    def _drain(self, batch):
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+
+    async def _loop(self):
+        while True:
+            batch = [await self._queue.get()]
+            self._drain(batch)
+            if len(batch) < self.max_batch and self.window > 0:
+                await asyncio.sleep(self.window)  # let concurrent requests join
+                self._drain(batch)
+            await self._slots.acquire()
+            task = asyncio.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        try:
+            results = await offload.run_cpu(diagnose_batch, [(t, a) for t, a, _ in batch])
+        except Exception as e:
+            for _, _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+        else:
+            self.batches += 1
+            self.items += len(batch)
+            for (_, _, fut), res in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(res)
+        finally:
+            self._slots.release()
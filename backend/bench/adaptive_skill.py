@@ -0,0 +1,67 @@
+"""
+Skill-model benchmark: update/pick throughput, memory per player, and whether
+adaptive picks actually land near the target success rate.
+
+Run from backend/:  python -m bench.adaptive_skill [players]
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+from app.calcduo.engine.adaptive import ITEM_START, SkillModel, expected_success
+
+
+def main(n_players=1_000_000):
+    rng = random.Random(0)
+    players = [f"p{i}" for i in range(n_players)]
+
+    tracemalloc.start()
+    model = SkillModel()
+    keys = [(k.key, d) for k in model.kinds for d in k.difficulties]
+    t0 = time.perf_counter()
+    for p in players:  # one answer each creates every player's row
+        key, d = rng.choice(keys)
+        model.record(p, key, d, rng.random() < 0.7)
+    t_create = time.perf_counter() - t0
+    mem, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    n_updates = 1_000_000
+    sample = [(rng.choice(players), *rng.choice(keys), rng.random() < 0.7) for _ in range(n_updates)]
+    t0 = time.perf_counter()
+    for p, key, d, ok in sample:
+        model.record(p, key, d, ok)
+    t_update = time.perf_counter() - t0
+
+    n_picks = 200_000
+    t0 = time.perf_counter()
+    for p in players[:n_picks]:
+        model.pick(p, rng)
+    t_pick = time.perf_counter() - t0
+
+    print(f"players              : {len(model):,} x {model.stride} kinds")
+    print(f"memory per player    : {mem / n_players:.0f} B (incl. id string and dict slot)")
+    print(f"first answer (alloc) : {n_players / t_create:,.0f}/s (under tracemalloc)")
+    print(f"record()             : {n_updates / t_update:,.0f}/s ({t_update / n_updates * 1e6:.2f} us)")
+    print(f"pick()               : {n_picks / t_pick:,.0f}/s ({t_pick / n_picks * 1e6:.2f} us)")
+
+    # Convergence: simulated players with hidden true skill, answered via the Elo curve.
+    # Skills are drawn where some item can give the target rate (the easiest and
+    # hardest items bound what any scheduler can achieve).
+    sim = SkillModel()
+    truth = {f"s{i}": rng.uniform(1500, 1880) for i in range(2000)}
+    hits = total = 0
+    for rnd in range(60):
+        for p, skill in truth.items():
+            kind, d = sim.pick(p, rng)
+            ok = rng.random() < expected_success(skill, ITEM_START[d])  # true item difficulty
+            sim.record(p, kind.key, d, ok)
+            if rnd >= 30:
+                hits += ok
+                total += 1
+    print(f"success after warm-up: {hits / total:.3f} (target {sim.target})")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
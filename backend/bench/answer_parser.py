@@ -0,0 +1,148 @@
+"""
+Answer parser benchmark: calcduo.answer_parser against the parse_expr path it
+replaced (kept below as legacy_parse, as it was in sympy_deriv_form).
+
+The corpus is typed derivatives of random deriv_form problems, each in several
+spellings (SymPy's str, the classroom form with ^ and implicit products, no
+spaces, unicode minus), plus common slips and junk. For every answer the
+bench compares the two parsers:
+- same: identical SymPy expressions
+- equivalent: different trees, simplify(a - b) == 0
+- differ: both parsed, to different functions (listed)
+- new only / legacy only: one side rejected it (listed, with the new
+  parser's error)
+
+It then times both over the whole corpus (best of 5). SymPy caches built
+nodes, so both sides are timed warm.
+
+Run from backend/:  python -m bench.answer_parser [n_problems]
+"""
+import random
+import re
+import sys
+import time
+
+import sympy as sp
+from sympy.parsing.sympy_parser import (
+    convert_xor,
+    implicit_multiplication_application,
+    parse_expr,
+    standard_transformations,
+)
+
+from app.calcduo.answer_parser import AnswerSyntaxError, parse_answer
+from app.calcduo.problems.sympy_deriv_form import math_str
+from app.calcduo.registry import get_kind
+
+x = sp.symbols("x")
+
+# --- the replaced path, verbatim ---
+_TRANSFORMATIONS = standard_transformations + (implicit_multiplication_application, convert_xor)
+_LOCAL_DICT = {
+    "x": x,
+    "sin": sp.sin, "cos": sp.cos, "tan": sp.tan,
+    "exp": sp.exp, "log": sp.log, "ln": sp.log,
+    "sqrt": sp.sqrt, "sec": sp.sec, "csc": sp.csc, "cot": sp.cot,
+    "pi": sp.pi, "e": sp.E, "E": sp.E,
+}
+
+
+def _parse(s):
+    return parse_expr(s, transformations=_TRANSFORMATIONS, local_dict=_LOCAL_DICT, evaluate=True)
+
+
+def legacy_parse(answer):
+    normalized = (answer or "").strip()
+    normalized = (
+        normalized.replace("−", "-").replace("–", "-").replace("—", "-")
+        .replace("×", "*").replace("·", "*").replace("^", "**")
+    )
+    try:
+        return _parse(normalized)
+    except Exception:
+        pass
+    s = normalized
+    s = re.sub(r'(\d)\s*(?=x\b|\()', r'\1*', s)
+    s = re.sub(r'(\d)\s*(?=(sin|cos|tan|exp|log|ln|sqrt|sec|csc|cot)\()', r'\1*', s)
+    s = re.sub(r'\)\s*(?=x\b|\d|\()', r')*', s)
+    s = re.sub(r'\)\s*(?=(sin|cos|tan|exp|log|ln|sqrt|sec|csc|cot)\()', r')*', s)
+    s = re.sub(r'\bx\s*(?=\()', r'x*', s)
+    try:
+        return _parse(s)
+    except Exception:
+        return None
+
+
+def new_parse(answer):
+    try:
+        return parse_answer(answer)
+    except AnswerSyntaxError:
+        return None
+
+
+SLIPS = ["", "   ", "2x +", "3(x+1", "cos(x))", "x!", "2sin(x)cos", "y + 1", "3 x 2", "e^", "sin()",
+         "ln|x|", "2**", "*x", "x^2 + 3x - ", "(2x+1)(3x-1)", "sin x^2", "2sin x cos x", "sec x tan x"]
+
+
+def corpus(n, rng):
+    kind = get_kind("deriv_form")
+    out = []
+    for _ in range(n):
+        fp = kind.create(rng.choice(kind.difficulties)).fprime
+        pretty = math_str(fp)
+        out += [str(fp), pretty, pretty.replace(" ", ""), pretty.replace("-", "−"),
+                str(fp).replace("**", "^").replace("*", "")]
+    return out + SLIPS
+
+
+def _best(fn, answers, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for a in answers:
+            fn(a)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(n=200):
+    random.seed(0)
+    answers = corpus(n, random.Random(1))
+    counts = dict.fromkeys(("same", "equivalent", "differ", "new only", "legacy only", "neither"), 0)
+    notes = []
+    generated = len(answers) - len(SLIPS)
+    broken = 0  # answers spelled from a real f' that the new parser rejects or reads differently
+    for i, a in enumerate(answers):
+        old, new = legacy_parse(a), new_parse(a)
+        if i < generated and (new is None or (old is not None and old != new and sp.simplify(old - new) != 0)):
+            broken += 1
+        if old is None or new is None:
+            key = "neither" if old is None and new is None else "new only" if old is None else "legacy only"
+            counts[key] += 1
+            if key == "legacy only":
+                try:
+                    parse_answer(a)
+                except AnswerSyntaxError as err:
+                    notes.append(f"  legacy only  {a!r:24} legacy {old}; new: {err}")
+            elif key == "new only":
+                notes.append(f"  new only     {a!r:24} -> {new}")
+        elif old == new:
+            counts["same"] += 1
+        elif sp.simplify(old - new) == 0:
+            counts["equivalent"] += 1
+        else:
+            counts["differ"] += 1
+            notes.append(f"  differ       {a!r:24} legacy {old}  new {new}")
+
+    t_old = _best(legacy_parse, answers)
+    t_new = _best(new_parse, answers)
+    print(f"{len(answers)} answers: " + ", ".join(f"{v} {k}" for k, v in counts.items()))
+    print("\n".join(notes))
+    print(f"legacy parse_expr  {t_old / len(answers) * 1e6:8.1f} us/answer")
+    print(f"answer_parser      {t_new / len(answers) * 1e6:8.1f} us/answer  ({t_old / t_new:.1f}x)")
+    print(f"generated answers the new parser gets wrong: {broken}")
+    return 0 if broken == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:2])))
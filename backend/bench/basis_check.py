@@ -0,0 +1,101 @@
+"""
+Coefficient-map check (calcduo.basis) against the simplify() check for deriv_form.
+
+The corpus is typed answers to random deriv_form problems:
+- right answers in several spellings: the solution's own terms in both
+  orders, SymPy's str (which splits e^(2x+3) into exp(3)*exp(2*x)), the
+  classroom form, and the expanded form
+- slips: one result term with its coefficient off by one, its sign
+  flipped, its inner factor changed, or dropped, and f itself
+- a few answers outside the basis (x sin(x), ln, pi) and some junk
+
+The reference verdict is the general path: SymPy parse, then
+simplify(together(expand(answer - f'))) == 0. Every answer the basis check
+settles must get the same verdict. Answers it can't settle are counted as
+fallbacks. The bench then times both checks per answer, with the basis
+check's per-problem cache cleared on every pass.
+
+Run from backend/:  python -m bench.basis_check [n_problems]
+"""
+import random
+import sys
+import time
+
+import sympy as sp
+
+from app.calcduo.answer_parser import AnswerSyntaxError, parse_answer
+from app.calcduo.basis import derivative_map, same_derivative
+from app.calcduo.problems.sympy_deriv_form import math_str
+from app.calcduo.registry import get_kind
+from app.calcduo.solution import sum_str, term_result, term_str
+
+OUTSIDE = ["x*sin(x)", "ln(x)", "pi*x", "sqrt(x)", "tan(x)", "x^(1/2)", "2^x"]
+JUNK = ["", "2x +", "y", "sin()", "3(x+1"]
+
+
+def _text(results):
+    return sum_str([term_str(*r) for r in results])
+
+
+def _slips(results, rng):
+    i = rng.randrange(len(results))
+    code, c, p, q = results[i]
+    variants = [(code, c + 1, p, q), (code, -c, p, q), (code, c, p + 1, q)]
+    out = [_text(results[:i] + [v] + results[i + 1:]) for v in variants]
+    if len(results) > 1:
+        out.append(_text(results[:i] + results[i + 1:]))
+    return out
+
+
+def corpus(n, rng):
+    kind = get_kind("deriv_form")
+    items = []
+    for _ in range(n):
+        p = kind.create(rng.choice(kind.difficulties))
+        results = [r for spec in p.terms for r in term_result(spec)]
+        right = [_text(results), _text(results[::-1]), str(p.fprime), math_str(p.fprime),
+                 str(sp.expand(p.fprime))]
+        wrong = _slips(results, rng) + [math_str(p.f)]
+        extra = [rng.choice(OUTSIDE), rng.choice(JUNK)]
+        items += [(p, a) for a in right + wrong + extra]
+    return items
+
+
+def simplify_check(problem, answer):
+    try:
+        user = parse_answer(answer)
+    except AnswerSyntaxError:
+        return False
+    return sp.simplify(sp.together(sp.expand(user - problem.fprime))) == 0
+
+
+def main(n=100):
+    random.seed(0)
+    items = corpus(n, random.Random(1))
+
+    t0 = time.perf_counter()
+    reference = [simplify_check(p, a) for p, a in items]
+    t_simplify = time.perf_counter() - t0
+
+    best = float("inf")
+    for _ in range(5):
+        derivative_map.cache_clear()
+        t0 = time.perf_counter()
+        verdicts = [same_derivative(a, p.terms) for p, a in items]
+        best = min(best, time.perf_counter() - t0)
+
+    settled = [(v, r, a) for v, r, (_, a) in zip(verdicts, reference, items) if v is not None]
+    wrong = [(v, r, a) for v, r, a in settled if v != r]
+    right = sum(v for v, _, _ in settled)
+    print(f"{len(items)} answers: {len(settled)} settled by the basis check "
+          f"({right} right, {len(settled) - right} wrong), {len(items) - len(settled)} fall back")
+    for v, r, a in wrong[:10]:
+        print(f"  MISMATCH {a!r}: basis {v}, simplify {r}")
+    print(f"simplify check     {t_simplify / len(items) * 1e6:10.1f} us/answer")
+    print(f"basis check        {best / len(items) * 1e6:10.1f} us/answer  ({t_simplify / best:.0f}x)")
+    print(f"verdicts match on every settled answer: {not wrong}")
+    return 0 if not wrong else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:2])))
@@ -0,0 +1,68 @@
+"""
+Bulk grading benchmark: contest-sized batches of polynomial answers graded one
+by one with check_answer() against BulkGrader (one NumPy pass).
+
+Answers mix right values, values off by just under and just over ANSWER_TOL,
+wrong values and junk. The verdicts of both paths must match exactly. The
+bench also checks that the vectorized expected values equal the `.value` each
+problem stored at construction.
+
+Run from backend/:  python -m bench.bulk_grading [n_problems]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+
+from app.calcduo.config import ANSWER_TOL
+from app.calcduo.grading import BulkGrader
+from app.calcduo.registry import get_kind
+
+
+def _answer(value, rng):
+    r = rng.random()
+    if r < 0.5:
+        return str(value)
+    if r < 0.6:
+        return str(value + 0.9 * ANSWER_TOL)
+    if r < 0.7:
+        return str(value - 1.1 * ANSWER_TOL)
+    if r < 0.9:
+        return str(value + rng.choice([-2, -1, 1, 3]))
+    return rng.choice(["", "abc", "x^2", "1/2"])
+
+
+def main(n=20000):
+    random.seed(0)
+    rng = random.Random(1)
+    kinds = [get_kind(k) for k in ("limit", "deriv_point", "def_int")]
+    problems = []
+    for _ in range(n):
+        kind = rng.choice(kinds)
+        problems.append(kind.create(rng.choice(kind.difficulties)))
+    answers = [_answer(p.value, rng) for p in problems]
+
+    t0 = time.perf_counter()
+    loop = np.array([p.check_answer(a)[0] for p, a in zip(problems, answers)])
+    t_loop = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    grader = BulkGrader(problems)
+    t_build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    bulk = grader.grade(answers)
+    t_grade = time.perf_counter() - t0
+
+    same_values = bool((grader.expected == np.array([p.value for p in problems])).all())
+    same_verdicts = bool((loop == bulk).all())
+    print(f"{n} answers, {bulk.mean():.1%} correct")
+    print(f"check_answer loop   {t_loop * 1e3:8.1f} ms  ({t_loop / n * 1e6:.2f} us/answer)")
+    print(f"BulkGrader build    {t_build * 1e3:8.1f} ms  (spec table + expected values)")
+    print(f"BulkGrader grade    {t_grade * 1e3:8.1f} ms  ({t_loop / t_grade:.0f}x the loop)")
+    print(f"expected == .value: {same_values}, verdicts match: {same_verdicts}")
+    return 0 if same_values and same_verdicts else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:2])))
@@ -0,0 +1,112 @@
+"""
+Perceived delay between questions in the terminal game, with and without prefetch.
+
+A scripted player runs the symbolic-derivative lesson and Quick Practice
+through the real Game / Lesson loop, with input() patched. Each answer takes
+--think seconds of "typing" and is right 70% of the time. The delay is the
+time from input() returning an answer to the next question's input() call:
+grading, feedback, the worked solution, and building the next problem.
+
+The runs are:
+- CALCDUO_PREFETCH=0, every problem built when it is asked (the old behavior)
+- depth 1 and depth 2 (the default)
+The bench reports the mean, p90 and max delay per question, and how often
+the prefetched problem was the one asked.
+
+Run from backend/:  python -m bench.cli_prefetch [--think 1.0] [--runs 3]
+"""
+import argparse
+import builtins
+import contextlib
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ["CALCDUO_BANK"] = os.path.join(tempfile.gettempdir(), "calcduo-no-bank.bin")  # generate everything
+
+from app.calcduo.engine.adaptive import SkillModel
+from app.calcduo.engine.game import Game
+from app.calcduo.engine.review import ReviewScheduler
+from app.calcduo.io_leaderboard import Leaderboard
+from app.calcduo.registry import all_kinds, get_kind
+
+
+class ScriptedPlayer:
+    def __init__(self, game, think):
+        self.think = think
+        self.current = None
+        self.answered_at = None
+        self.delays = []
+        self.rng = random.Random(0)
+        ask = game.ask
+
+        def tracked_ask(problem):
+            self.current = problem
+            ask(problem)
+        game.ask = tracked_ask
+
+    def __call__(self, prompt=""):
+        now = time.perf_counter()
+        if self.answered_at is not None:
+            self.delays.append(now - self.answered_at)
+        time.sleep(self.think)  # the player reads and types; the prefetch thread works meanwhile
+        p = self.current
+        answer = "0"
+        if self.rng.random() < 0.7:
+            answer = str(p.fprime if hasattr(p, "fprime") else p.value)
+        self.answered_at = time.perf_counter()
+        return answer
+
+
+def _game(depth):
+    tmp = tempfile.mkdtemp()
+    game = Game("bench", leaderboard=Leaderboard(os.path.join(tmp, "lb.json")), skill=SkillModel(),
+                reviews=ReviewScheduler([k.key for k in all_kinds()]), prefetch=depth)
+    game.hearts = 10 ** 6
+    return game
+
+
+def run(depth, think, runs):
+    delays, hits, misses = [], 0, 0
+    lesson_kind = get_kind("deriv_form")
+    for _ in range(runs):
+        game = _game(depth)
+        player = ScriptedPlayer(game, think)
+        real_input = builtins.input
+        builtins.input = player
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                for lesson in game.lessons:
+                    if lesson.problem_cls is lesson_kind.problem_cls:
+                        lesson.run(game)
+                game.quick_practice(rounds=6)
+        finally:
+            builtins.input = real_input
+            if game.prefetcher is not None:
+                hits += game.prefetcher.hits
+                misses += game.prefetcher.misses
+                game.prefetcher.close()
+        delays += player.delays
+    return delays, hits, misses
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--think", type=float, default=1.0, help="seconds the player spends per answer")
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+    print(f"{'prefetch':<10} {'questions':>9} {'mean ms':>8} {'p90 ms':>8} {'max ms':>8} {'hit rate':>9}")
+    for depth in (0, 1, 2):
+        delays, hits, misses = run(depth, args.think, args.runs)
+        delays.sort()
+        p90 = delays[int(len(delays) * 0.9) - 1]
+        rate = f"{hits / (hits + misses):.0%}" if hits + misses else "-"
+        print(f"{depth or 'off':<10} {len(delays):>9} {statistics.mean(delays) * 1e3:>8.1f} "
+              f"{p90 * 1e3:>8.1f} {delays[-1] * 1e3:>8.1f} {rate:>9}")
+
+
+if __name__ == "__main__":
+    main()
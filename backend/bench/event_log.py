@@ -0,0 +1,163 @@
+"""
+Answer-event log (calcduo/events.py): the cost of emitting on the answer
+path, and aggregate query times over millions of events.
+
+1. emit: N synthetic events go through EventLog.emit(), with 5000 players,
+   the registered kinds and difficulties, 70% right answers, and wrong
+   answers drawn from a skewed set of slips. The bench reports us per
+   event, the segments written and any dropped events. The writer thread
+   runs meanwhile, so the writes are included in the cost.
+2. queries: accuracy and time-to-answer by (kind, difficulty), and the top
+   wrong answers for one kind, each over every segment. They are timed
+   cold (segments mapped by the first query) and warm.
+3. check: the same aggregates recomputed row by row in plain Python over
+   the first segments, compared with the vectorized results. A small log
+   also checks time-to-answer when a segment has no timed rows (CLI rows
+   only, or all older than since).
+4. quiet: a log that gets an event every few ms with a flush period of
+   10 ms, so nearly every flush is a timed one of a few rows. The check is
+   that the writer merges the small segments (at most COMPACT_SEGMENTS
+   files remain), that a query sees every row, and that it leaves no file
+   descriptors open.
+
+Run from backend/:  python -m bench.event_log [n_events]
+"""
+import glob
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+from app.calcduo.events import COMPACT_SEGMENTS, EventLog, EventStore
+from app.calcduo.registry import all_kinds
+
+SLIPS = [str(v) for v in range(-20, 21)] + ["2x", "cos(x)", "-sin(x)", "x^2", "0.5", "e^x"]
+
+
+def emit(log, n, rng):
+    kinds = [(k.key, k.difficulties) for k in all_kinds()]
+    players = [f"player{i}" for i in range(5000)]
+    weights = [1 / (i + 1) for i in range(len(SLIPS))]  # a few slips are far more common
+    wrong = rng.choices(SLIPS, weights, k=4096)
+    ms = np.random.default_rng(0).lognormal(9, 0.6, size=4096)
+    t0 = time.perf_counter()
+    for i in range(n):
+        kind, difficulties = kinds[i % len(kinds)]
+        ok = rng.random() < 0.7
+        log.emit(players[i % 5000], kind, difficulties[i % len(difficulties)], ok,
+                 "right" if ok else wrong[i & 4095], ms[i & 4095], i & 0xFFFF)
+    emit_s = time.perf_counter() - t0
+    log.close()
+    return emit_s
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def check(path, n_segments=4):
+    """Plain-Python aggregates over the first few segments, against the vectorized queries."""
+    store = EventStore(path)
+    parts = store.parts()[:n_segments]
+    store._fixed = parts
+    attempts, correct, slips = Counter(), Counter(), Counter()
+    for cols, dicts in parts:
+        for k, d, ok, a in zip(cols["kind"].tolist(), cols["difficulty"].tolist(),
+                               cols["ok"].tolist(), cols["answer"].tolist()):
+            key = (dicts["kind"][k], dicts["difficulty"][d])
+            attempts[key] += 1
+            correct[key] += ok
+            if not ok and key[0] == "deriv_form":
+                slips[dicts["answer"][a]] += 1
+    acc = {(r["kind"], r["difficulty"]): (r["attempts"], r["correct"]) for r in store.accuracy()}
+    same_acc = acc == {k: (attempts[k], correct[k]) for k in attempts}
+    top = store.common_wrong(10, kind="deriv_form")
+    same_top = [r["count"] for r in top] == [c for _, c in slips.most_common(10)]
+    return same_acc and same_top
+
+
+def check_untimed(path):
+    """time_to_answer over a segment of untimed rows and a segment of timed ones, with and without since."""
+    log = EventLog(path, rows=4)
+    for i in range(4):
+        log.emit("cli", "deriv_form", "easy", i % 2 == 0)  # ms is NaN, as for CLI answers
+    log.flush()
+    time.sleep(0.01)
+    since = time.time()
+    for i in range(4):
+        log.emit("player", "deriv_form", "easy", True, "right", 1000.0 * (i + 1))
+    log.close()
+    store = EventStore(path)
+    return [r["answers"] for r in store.time_to_answer()] == [4] and \
+        [r["answers"] for r in store.time_to_answer(since=since)] == [4]
+
+
+def _open_fds():
+    return len(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else 0
+
+
+def check_quiet(path, n=600):
+    """(ok, report) for a log of timed flushes only: merged segments, every row counted, no fds held."""
+    log = EventLog(path, rows=1024, flush_seconds=0.01)
+    for i in range(n):
+        log.emit(f"player{i % 7}", "deriv_form", "easy", i % 3 > 0, "right", 1000.0)
+        time.sleep(0.003)
+    log.close()
+    files = len(glob.glob(os.path.join(path, "events-*.cde")))
+    store = EventStore(path)
+    before = _open_fds()
+    rows = store.count()
+    held = _open_fds() - before
+    report = f"{log.segments} segments written, {log.merges} merges, {files} files, {rows} rows, {held} fds held"
+    return files <= COMPACT_SEGMENTS and rows == n and held == 0, report
+
+
+def main(n=2_000_000):
+    path = tempfile.mkdtemp(prefix="calcduo-events-")
+    try:
+        log = EventLog(path)
+        emit_s = emit(log, n, random.Random(0))
+        print(f"emit     : {n} events, {emit_s / n * 1e6:.2f} us/event, "
+              f"{log.segments} segments, {log.dropped} dropped")
+
+        store = EventStore(path)
+        for label in ("cold", "warm"):
+            results = []
+            for name, fn in (("accuracy", store.accuracy), ("time_to_answer", store.time_to_answer),
+                             ("common_wrong", lambda: store.common_wrong(10, kind="deriv_form"))):
+                out, dt = _timed(fn)
+                results.append(f"{name} {dt * 1e3:.0f} ms")
+            print(f"{label:<9}: " + ", ".join(results))
+        print(f"rows     : {store.count()}")
+        for row in store.accuracy()[:4]:
+            print(f"  {row}")
+        print(f"  {store.time_to_answer()[0]}")
+        print(f"  top wrong deriv_form answers: {store.common_wrong(5, kind='deriv_form')}")
+        ok = check(path)
+        print(f"check    : vectorized aggregates match the row-by-row ones: {ok}")
+        small = tempfile.mkdtemp(prefix="calcduo-events-")
+        try:
+            untimed = check_untimed(small)
+        finally:
+            shutil.rmtree(small, ignore_errors=True)
+        print(f"check    : time_to_answer skips segments with no timed rows: {untimed}")
+        small = tempfile.mkdtemp(prefix="calcduo-events-")
+        try:
+            quiet, report = check_quiet(small)
+        finally:
+            shutil.rmtree(small, ignore_errors=True)
+        print(f"quiet    : {report}: {quiet}")
+        return 0 if ok and untimed and quiet else 1
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:2])))
@@ -0,0 +1,106 @@
+"""
+JSON encoding micro-benchmark and end-to-end requests/sec for the HTTP layer.
+
+1. Encoding: stdlib json vs orjson vs the cached /answer body, on the payloads
+   the API actually returns.
+2. End to end: starts uvicorn with the stdlib encoder (CALCDUO_ORJSON=0) and
+   with orjson, and drives /answer (fast-path kind, repeated wrong answer) and
+   /leaderboard (plain GET vs If-None-Match revalidation) with concurrent
+   clients.
+
+Run from backend/:  python -m bench.http_encoding [--seconds 5] [--concurrency 32]
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import timeit
+
+import httpx
+
+from app.responses import answer_body, orjson
+
+PAYLOADS = {
+    "answer": {"ok": False, "feedback": "Not quite. One correct form is: -45x^4 - 7 e^(x) + 36sin(4x - 4)"},
+    "new-problem": {
+        "problem_id": "87b05e80-4656-4654-b34d-7f09ad817ddb",
+        "kind": "deriv_form",
+        "prompt": "Given f(x) = -9x^5 - 7 e^(x) - 9cos(4x - 4) + 9cos(5x + 6)\nEnter f'(x):",
+    },
+    "leaderboard": [
+        {"player": f"player{i}", "best": 1000 - i, "total": 5000 - i, "plays": 7} for i in range(100)
+    ],
+}
+
+
+def encoding_bench(number=50_000):
+    print(f"{'payload':<12} {'json us':>8} {'orjson us':>10} {'cached us':>10}")
+    for name, obj in PAYLOADS.items():
+        n = number if name != "leaderboard" else number // 20
+        t_std = timeit.timeit(lambda: json.dumps(obj).encode(), number=n) / n * 1e6
+        t_or = timeit.timeit(lambda: orjson.dumps(obj), number=n) / n * 1e6 if orjson else float("nan")
+        cached = ""
+        if name == "answer":
+            ok, fb = obj["ok"], obj["feedback"]
+            cached = f"{timeit.timeit(lambda: answer_body(ok, fb), number=n) / n * 1e6:>10.3f}"
+        print(f"{name:<12} {t_std:>8.3f} {t_or:>10.3f} {cached:>10}")
+
+
+async def _hammer(base, path, method, body, headers, seconds, concurrency):
+    done = 0
+    deadline = time.monotonic() + seconds
+    async with httpx.AsyncClient(base_url=base) as client:
+        async def worker():
+            nonlocal done
+            while time.monotonic() < deadline:
+                await client.request(method, path, json=body, headers=headers)
+                done += 1
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return done / seconds
+
+
+def _serve(port, use_orjson):
+    env = dict(os.environ, CALCDUO_ORJSON="1" if use_orjson else "0",
+               CALCDUO_LEADERBOARD=os.devnull, CALCDUO_POOL_SIZE="0")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, start_new_session=True,
+    )
+
+
+def e2e_bench(seconds, concurrency, port=8767):
+    base = f"http://127.0.0.1:{port}"
+    print(f"\n{'encoder':<8} {'/answer rps':>12} {'/leaderboard rps':>17} {'304 revalidate rps':>19}")
+    for use_orjson in (False, True):
+        server = _serve(port, use_orjson)
+        try:
+            time.sleep(3)
+            pid = httpx.post(base + "/new-problem", json={"kind": "limit"}).json()["problem_id"]
+            etag = httpx.get(base + "/leaderboard").headers["etag"]
+            rps_answer = asyncio.run(_hammer(base, "/answer", "POST",
+                                             {"problem_id": pid, "answer": "12345"}, None, seconds, concurrency))
+            rps_board = asyncio.run(_hammer(base, "/leaderboard", "GET", None, None, seconds, concurrency))
+            rps_304 = asyncio.run(_hammer(base, "/leaderboard", "GET", None,
+                                          {"If-None-Match": etag}, seconds, concurrency))
+        finally:
+            os.killpg(server.pid, signal.SIGTERM)
+            server.wait()
+        name = "orjson" if use_orjson else "json"
+        print(f"{name:<8} {rps_answer:>12.0f} {rps_board:>17.0f} {rps_304:>19.0f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--concurrency", type=int, default=32)
+    args = ap.parse_args()
+    encoding_bench()
+    e2e_bench(args.seconds, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
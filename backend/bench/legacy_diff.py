@@ -0,0 +1,228 @@
+"""
+Differential harness: the calcduo package against the original standalone
+Calc_duo.py (frozen in bench/legacy_calc_duo.py).
+
+1. Grading: problems come from the legacy generators (seeded) and are rebuilt
+   as package problems with the same coefficients and points. Both engines
+   grade the same answers: exact values in several spellings, wrong values and
+   junk input. Their verdicts and the values in their feedback must agree.
+   Answers within 1e-4 of the truth are reported separately. Those hit the
+   known tolerance drift: legacy compares limit and deriv_point answers
+   rounded to 5 places, the package uses |diff| <= ANSWER_TOL everywhere.
+2. Sessions: seeded runs of a simulated player (70% right) go through both
+   engines' scoring. Score, XP, streak and hearts must match after every answer.
+3. Speed: generation, grading and multiple-choice building, per kind.
+   Each row alternates legacy and package passes over the same items,
+   after a warm-up pass of each, and reports the median of REPEATS passes;
+   run to run, the ratios move by a few percent. Every row is gated,
+   generation included: the package problems compute their answer on
+   first use, so making one does no more work than legacy does.
+
+Exits 1 if grading or sessions differ, or if the package is slower than
+legacy on any row by more than --min-speedup allows (0.8x by default,
+well outside that noise). This is the regression gate for the CLI
+consolidation.
+
+Run from backend/:  python -m bench.legacy_diff [--problems 3000] [--sessions 200]
+"""
+import argparse
+import contextlib
+import io
+import math
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from array import array
+
+from app.calcduo.engine.adaptive import SkillModel
+from app.calcduo.engine.game import Game
+from app.calcduo.engine.review import ReviewScheduler
+from app.calcduo.io_leaderboard import Leaderboard
+from app.calcduo.registry import all_kinds, get_kind
+from bench import legacy_calc_duo as legacy
+
+# legacy class -> (package kind key, difficulties the legacy CLI uses)
+PAIRS = {
+    legacy.LimitProblem: ("limit", ("easy", "medium", "hard")),
+    legacy.DerivativeAtPointProblem: ("deriv_point", ("easy", "medium", "hard")),
+    legacy.DefiniteIntegralProblem: ("def_int", ("easy", "medium", "hard")),
+}
+REPEATS = 9  # timed passes per speed row; the row reports their median
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?(?:e[-+]?\d+)?")
+
+
+def to_package(lp):
+    """The package problem with the same data as a legacy problem."""
+    key, _ = PAIRS[type(lp)]
+    cls = get_kind(key).problem_cls
+    p = cls.__new__(cls)
+    p.difficulty = lp.difficulty
+    p.coeffs = array("i", lp.coeffs)
+    if key == "limit":
+        p.a = lp.a
+    elif key == "deriv_point":
+        p.x0 = lp.x0
+    else:
+        p.a, p.b = lp.a, lp.b
+    return p
+
+
+def true_value(lp):
+    if isinstance(lp, legacy.LimitProblem):
+        return legacy.eval_poly(lp.coeffs, lp.a)
+    if isinstance(lp, legacy.DerivativeAtPointProblem):
+        return legacy.eval_poly(lp.deriv_coeffs, lp.x0)
+    return legacy.eval_poly(lp.anti, lp.b) - legacy.eval_poly(lp.anti, lp.a)
+
+
+def answers(t):
+    """(class, answer) pairs for a problem whose answer is t."""
+    out = [("exact", str(t)), ("exact", f"{t:.6f}"), ("exact", f"{float(t)!r}")]
+    if float(t).is_integer():
+        out.append(("exact", str(int(t))))
+    out += [("wrong", str(t + 1)), ("wrong", str(t - 0.5)), ("wrong", "0" if t else "1"),
+            ("wrong", f"{t:.2f}" if abs(t - round(t, 2)) > 1e-3 else str(t + 2))]
+    out += [("junk", ""), ("junk", "abc"), ("junk", "x")]
+    out += [("boundary", str(t + d)) for d in (4e-6, 5e-5, 2e-4)]
+    return out
+
+
+def _same_feedback(a, b):
+    """Same stated answer. Legacy sums powers, the package uses Horner, so floats may differ in the last ulp."""
+    x, y = _NUMBER.findall(a), _NUMBER.findall(b)
+    if not x or not y:
+        return a == b
+    return math.isclose(float(x[-1]), float(y[-1]), rel_tol=1e-12, abs_tol=1e-12)
+
+
+def diff_grading(n, rng):
+    random.seed(rng.random())
+    stats = {}
+    samples = []
+    for _ in range(n):
+        cls = rng.choice(list(PAIRS))
+        lp = cls(rng.choice(PAIRS[cls][1]))
+        pp = to_package(lp)
+        for klass, ans in answers(true_value(lp)):
+            lok, lfb = lp.check_answer(ans)
+            pok, pfb = pp.check_answer(ans)
+            same = lok == pok and (lok or _same_feedback(lfb, pfb))
+            key = (PAIRS[cls][0], klass)
+            s = stats.setdefault(key, [0, 0])
+            s[0] += 1
+            if not same:
+                s[1] += 1
+                if klass != "boundary" and len(samples) < 5:
+                    samples.append((lp.prompt(), ans, (lok, lfb), (pok, pfb)))
+
+    print(f"{'kind':<12} {'answers':<9} {'checked':>8} {'differ':>7}")
+    failed = False
+    for (key, klass), (total, bad) in sorted(stats.items()):
+        note = "  (known tolerance drift)" if klass == "boundary" and bad else ""
+        print(f"{key:<12} {klass:<9} {total:>8} {bad:>7}{note}")
+        failed |= bool(bad) and klass != "boundary"
+    for s in samples:
+        print("  differs:", s)
+    return not failed
+
+
+def _package_game():
+    tmp = os.path.join(tempfile.mkdtemp(), "lb.json")
+    return Game("sim", leaderboard=Leaderboard(tmp), skill=SkillModel(),
+                reviews=ReviewScheduler([k.key for k in all_kinds()]))
+
+
+def diff_sessions(n_sessions, rng, rounds=30):
+    mismatched = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        lg, pg = legacy.Game("sim"), _package_game()
+        for s in range(n_sessions):
+            lg.score = lg.xp = lg.streak = 0
+            pg.score = pg.xp = pg.streak = 0
+            lg.hearts = pg.hearts = 3  # legacy starts with 3; the package's HEARTS_START is 5
+            for _ in range(rounds):
+                cls = rng.choice(list(PAIRS))
+                lp = cls(rng.choice(PAIRS[cls][1]))
+                pp = to_package(lp)
+                t = true_value(lp)
+                ans = str(t) if rng.random() < 0.7 else str(t + rng.choice([-2, -1, 1, 3]))
+                lok, lfb = lp.check_answer(ans)
+                pok, _ = pp.check_answer(ans)
+                lg.on_correct(lp) if lok else lg.on_incorrect(lp, lfb)
+                pg.record_correct(pp) if pok else pg.record_incorrect(pp)
+                if (lg.score, lg.xp, lg.streak, lg.hearts) != (pg.score, pg.xp, pg.streak, pg.hearts):
+                    mismatched += 1
+                    break
+    print(f"\nsessions: {n_sessions} x {rounds} answers, {mismatched} diverged")
+    return mismatched == 0
+
+
+def _pass(fn, items):
+    t0 = time.perf_counter()
+    for it in items:
+        fn(it)
+    return (time.perf_counter() - t0) / len(items)
+
+
+def _compare(legacy_fn, package_fn, items, repeat=REPEATS):
+    """(legacy, package) median seconds per item, over alternating passes after a warm-up of each."""
+    _pass(legacy_fn, items)
+    _pass(package_fn, items)
+    lt, pt = [], []
+    for _ in range(repeat):
+        lt.append(_pass(legacy_fn, items))
+        pt.append(_pass(package_fn, items))
+    return statistics.median(lt), statistics.median(pt)
+
+
+def speed(n, rng, min_speedup):
+    random.seed(0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        lg, pg = legacy.Game("sim"), _package_game()
+    print(f"\n{'operation':<28} {'legacy us':>10} {'package us':>11} {'speedup':>8}")
+    ok = True
+    for cls, (key, diffs) in PAIRS.items():
+        kind = get_kind(key)
+        ds = [rng.choice(diffs) for _ in range(n)]
+        lps = [cls(d) for d in ds]
+        pps = [to_package(lp) for lp in lps]
+        ans = [str(true_value(lp) + 1) for lp in lps]
+        rows = [
+            ("generate", *_compare(cls, kind.create, ds)),
+            ("grade (wrong answer)", *_compare(lambda i: lps[i].check_answer(ans[i]),
+                                               lambda i: pps[i].check_answer(ans[i]), range(n))),
+            ("multiple choice", *_compare(lambda i: lg.make_multiple_choice(lps[i]),
+                                          lambda i: pg.make_multiple_choice(pps[i]), range(n))),
+        ]
+        for name, lt, pt in rows:
+            sp = lt / pt
+            flag = "" if sp >= min_speedup else "  SLOWER"
+            ok &= sp >= min_speedup
+            print(f"{key + ' ' + name:<28} {lt * 1e6:>10.2f} {pt * 1e6:>11.2f} {sp:>7.2f}x{flag}")
+    return ok
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--problems", type=int, default=3000)
+    ap.add_argument("--sessions", type=int, default=200)
+    ap.add_argument("--speed-n", type=int, default=5000)
+    ap.add_argument("--min-speedup", type=float, default=0.8,
+                    help="fail if the package is slower than legacy by more than this factor")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    ok = diff_grading(args.problems, rng)
+    ok &= diff_sessions(args.sessions, rng)
+    ok &= speed(args.speed_n, rng, args.min_speedup)
+    print("\nPASS" if ok else "\nFAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
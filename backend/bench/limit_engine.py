@@ -0,0 +1,81 @@
+"""
+Reference values for limit_form (calcduo/limits.py) against extrapolation and SymPy.
+
+The corpus is random limit_form problems at every difficulty. Each limit is
+computed three ways:
+- limits.limit: factor cancellation and exact Taylor coefficients (the
+  reference the problems store)
+- limits.extrapolate: Richardson extrapolation of f at a ladder of steps,
+  on every problem
+- sp.limit, on the first N_SYMPY problems only (it is slow)
+The bench reports the time per problem for each, and for generating a
+problem at each difficulty. It checks that generation stays under
+CREATE_BUDGET, that every extrapolated value is within XCHECK_TOL
+(relative) of the exact one, and that every SymPy value is equal to it.
+
+Run from backend/:  python -m bench.limit_engine [n_problems] [n_sympy]
+"""
+import random
+import sys
+import time
+from fractions import Fraction
+
+import sympy as sp
+
+from app.calcduo.limits import extrapolate, first_step, limit
+from app.calcduo.problems.sympy_deriv_form import _term_expr, x
+from app.calcduo.registry import get_kind
+
+CREATE_BUDGET = 1e-3  # seconds per problem, at every difficulty
+XCHECK_TOL = 1e-6
+
+
+def _timed(fn, items):
+    t0 = time.perf_counter()
+    out = [fn(p) for p in items]
+    return out, (time.perf_counter() - t0) / len(items)
+
+
+def _sympy_limit(p):
+    num = sp.Add(*[_term_expr(t) for t in p.num])
+    den = sp.Add(*[int(c) * x ** (len(p.den) - 1 - i) for i, c in enumerate(p.den)])
+    return sp.limit(num / den, x, p.a)
+
+
+def main(n=3000, n_sympy=30):
+    random.seed(0)
+    kind = get_kind("limit_form")
+    create = {}
+    problems = []
+    for d in kind.difficulties:
+        batch, create[d] = _timed(kind.create, [d] * (n // len(kind.difficulties)))
+        problems += batch
+    payloads = [kind.dump(p) for p in problems]
+    series = sum(any(t[0] for t in p.num) for p in problems)
+
+    exact, t_exact = _timed(lambda p: limit(p.num, p.den, p.a), problems)
+    _, t_decode = _timed(kind.load, payloads)
+    numeric, t_numeric = _timed(lambda p: extrapolate(p.num, p.den, p.a, first_step(limit(p.num, p.den, p.a)[3], p.a)),
+                                problems)
+    errors = [abs(est - float(v)) / max(1.0, abs(float(v))) for (est, _), (v, *_) in zip(numeric, exact)]
+    within = sum(e <= XCHECK_TOL for e in errors)
+
+    sample = problems[:n_sympy]
+    symbolic, t_sympy = _timed(_sympy_limit, sample)
+    agree = sum(Fraction(int(s.p), int(s.q)) == v for s, (v, *_) in zip(symbolic, exact) if s.is_Rational)
+
+    print(f"{len(problems)} problems ({series} with sin/cos/e^ terms), {len(sample)} with a SymPy value")
+    for d, t in create.items():
+        print(f"  create {d:<7}      {t * 1e6:10.1f} us/problem")
+    print(f"  limits.limit        {t_exact * 1e6:10.1f} us/limit")
+    print(f"  decode              {t_decode * 1e6:10.1f} us/problem")
+    print(f"  limits.extrapolate  {t_numeric * 1e6:10.1f} us/limit")
+    print(f"  sp.limit            {t_sympy * 1e3:10.1f} ms/limit  ({t_sympy / t_exact:.0f}x limits.limit)")
+    print(f"extrapolation vs exact: max relative error {max(errors):.2e}, within {XCHECK_TOL:g} on {within}/{len(problems)}")
+    print(f"SymPy vs exact: equal on {agree}/{len(sample)}")
+    ok = max(create.values()) <= CREATE_BUDGET and within == len(problems) and agree == len(sample)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:3])))
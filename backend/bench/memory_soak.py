@@ -0,0 +1,189 @@
+"""
+Memory soak: generate and grade N problems (1M by default) through the
+stores the API keeps, and check that memory goes flat.
+
+Each problem takes the /new-problem + /answer path, in process and without
+HTTP:
+- it is stored in a LiveProblems (CALCDUO_LIVE_MAX, oldest expire) with its
+  issue time
+- it is graded: check_answer for the fast kinds, quick_check for deriv_form
+  answers in the coefficient-map basis
+- the verdict goes to the event log, the skill model and the review
+  scheduler, for one of 5000 players
+- every 100th problem also renders its worked solution and plot
+The kinds come round robin. deriv_form problems are copies of N_SYMBOLIC
+prebuilt ones, with their miss feedback as a worker would have built it.
+Every SYMPY_EVERY-th problem is a fresh deriv_form
+problem, graded by SymPy with an answer outside the basis. That keeps
+SymPy's caches filling up with new expressions. The SymPy cache policy
+ticks once per SymPy job, as in an API worker.
+
+RSS is sampled (after gc) N_SAMPLES times. The stores fill up during the
+first WARMUP share of the run (the live store must reach its limit by
+then: lower it with --live for short runs), and after that RSS must stay within
+max(GROWTH_SHARE of its level at the end of warm-up, GROWTH_BYTES). The
+bench exits 1 if it doesn't. It ends with the memory.Stores report. With
+--trace, it also prints the top tracemalloc growth sites between the end
+of warm-up and the end. Tracing slows the run several times over.
+
+Run from backend/:  python -m bench.memory_soak [--n 1000000] [--live 200000] [--trace]
+"""
+import argparse
+import gc
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+
+from app.calcduo import memory
+from app.calcduo.basis import derivative_map
+from app.calcduo.engine.adaptive import SkillModel
+from app.calcduo.engine.review import ReviewScheduler
+from app.calcduo.events import EventLog
+from app.calcduo.io_leaderboard import Leaderboard
+from app.calcduo.plot import plot_spec, render as render_plot
+from app.calcduo.registry import all_kinds, get_kind
+from app.calcduo.solution import sum_str, term_result, term_str
+from app.snapshot import LIVE_MAX, LiveProblems
+
+N_SYMBOLIC = 64
+SYMPY_EVERY = 2000
+PLAYERS = 5000
+N_SAMPLES = 20
+WARMUP = 0.4  # the live store fills at 20% of a default run; its table settles a little later
+GROWTH_SHARE = 0.05
+GROWTH_BYTES = 16 << 20
+
+
+def _right(problem):
+    """A right answer: the numeric value, or f' spelled from the term specs."""
+    kind = get_kind(problem.kind)
+    if kind.numeric is not None:
+        return repr(kind.numeric(problem))
+    return sum_str([term_str(*r) for spec in problem.terms for r in term_result(spec)])
+
+
+def _answer(problem, rng):
+    return _right(problem) if rng.random() < 0.7 else str(rng.randint(-20, 20))
+
+
+def soak(n, rng, live, trace=False):
+    kinds = [k for k in all_kinds()]
+    symbolic = get_kind("deriv_form")
+    prebuilt = [symbolic.create(rng.choice(symbolic.difficulties)) for _ in range(N_SYMBOLIC)]
+    payloads = [(symbolic.dump(p), p.miss()) for p in prebuilt]
+    tmp = tempfile.mkdtemp(prefix="calcduo-soak-")
+    problems = LiveProblems(live)
+    issued = {}
+    events = EventLog(os.path.join(tmp, "events"))
+    skills = SkillModel()
+    reviews = ReviewScheduler([k.key for k in kinds])
+    leaderboard = Leaderboard(os.path.join(tmp, "leaderboard.json"))
+    policy = memory.SymPyCachePolicy()
+    stores = memory.Stores()
+    stores.track("live_problems", lambda: problems)
+    stores.track("issued_at", lambda: issued)
+    stores.track("skills", lambda: vars(skills))
+    stores.track("reviews", lambda: vars(reviews))
+    stores.track("leaderboard", lambda: leaderboard.data)
+    stores.track("event_batches", events.batches)
+    stores.track_cache("derivative_map", derivative_map)
+    stores.track_cache("plot", render_plot)
+
+    every = n // N_SAMPLES
+    samples = []
+    right = sympy_jobs = 0
+    t0 = time.perf_counter()
+    try:
+        for i in range(n):
+            kind = kinds[i % len(kinds)]
+            player = f"player{rng.randrange(PLAYERS)}"
+            if kind is symbolic:
+                if i % SYMPY_EVERY < len(kinds):  # a new expression, graded by SymPy
+                    p = symbolic.create(rng.choice(symbolic.difficulties))
+                    ok, _ = p.check_answer(_right(p) + " + x*sin(x) - x*sin(x)")
+                    policy.tick()
+                    sympy_jobs += 1
+                else:
+                    payload, p_miss = payloads[i % N_SYMBOLIC]
+                    p = symbolic.load(payload)
+                    p._miss = p_miss
+                    answer = _answer(p, rng)
+                    ok = (p.quick_check(answer) or p.miss())[0]
+            else:
+                p = kind.create(rng.choice(kind.difficulties))
+                answer = _answer(p, rng)
+                ok, _ = p.check_answer(answer)
+            pid = str(uuid.uuid4())
+            problems[pid] = p
+            issued[pid] = time.time()
+            for old in problems.expire():
+                issued.pop(old, None)
+            events.emit(player, p.kind, p.difficulty, ok, "", 1000.0, 0)
+            skills.record(player, p.kind, p.difficulty, ok)
+            reviews.record(player, p.kind, p.difficulty, ok)
+            right += ok
+            if i % 100 == 0:
+                p.solution()
+                try:
+                    render_plot(*plot_spec(p), 200)
+                except ValueError:
+                    pass
+            if i % 5000 == 0:
+                leaderboard.add_score(player, right)
+            if (i + 1) % every == 0:
+                gc.collect()
+                samples.append((i + 1, memory.rss_bytes(), time.perf_counter() - t0))
+                done, rss, dt = samples[-1]
+                print(f"  {done:>9} problems  rss {rss / 2**20:7.1f} MiB  live {len(problems):>7}  "
+                      f"sympy entries {memory.sympy_cache_entries():>6}  {dt:6.1f} s", flush=True)
+                if trace and len(samples) == int(N_SAMPLES * WARMUP):
+                    tracer = memory.Tracer()
+                    tracer.start()
+        events.close()
+        report = stores.report()
+        top = tracer.snapshot(10) if trace else None
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return samples, report, policy, sympy_jobs, right, top
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=1_000_000)
+    ap.add_argument("--live", type=int, default=LIVE_MAX, help="live-problem limit (CALCDUO_LIVE_MAX)")
+    ap.add_argument("--trace", action="store_true")
+    args = ap.parse_args()
+    print(f"soak: {args.n} problems, live limit {args.live}, "
+          f"SymPy cache limit {memory.SYMPY_CACHE_MAX} entries")
+    if args.live > args.n * WARMUP:
+        print(f"  note: the live store won't be full by the end of warm-up; use --live {int(args.n * WARMUP * 0.6)}")
+    samples, report, policy, sympy_jobs, right, top = soak(args.n, random.Random(0), args.live, args.trace)
+
+    base = samples[int(N_SAMPLES * WARMUP) - 1][1]
+    peak = max(rss for _, rss, _ in samples[int(N_SAMPLES * WARMUP) - 1:])
+    allowed = max(GROWTH_SHARE * base, GROWTH_BYTES)
+    flat = peak - base <= allowed
+    elapsed = samples[-1][2]
+    print(f"done in {elapsed:.0f} s ({elapsed / args.n * 1e6:.0f} us/problem), {right} right, "
+          f"{sympy_jobs} SymPy jobs; policy: {policy.report()}")
+    print(f"rss after warm-up {base / 2**20:.1f} MiB, peak after {peak / 2**20:.1f} MiB: "
+          f"growth {(peak - base) / 2**20:+.1f} MiB (allowed {allowed / 2**20:.1f}) -> "
+          f"{'flat' if flat else 'GROWING'}")
+    for name, s in report["stores"].items():
+        print(f"  {name:<14} {s['entries']:>8} entries  {s['bytes'] / 2**20:7.2f} MiB"
+              f"{' (sampled)' if s['sampled'] else ''}")
+    for name, c in report["caches"].items():
+        print(f"  {name:<14} {c['entries']:>8} / {c['maxsize']} cached")
+    if top is not None:
+        print(f"tracemalloc growth after warm-up: {top['growth_bytes'] / 2**20:+.2f} MiB")
+        for row in top["top"]:
+            print(f"  {row['size_diff'] / 1024:+9.1f} KiB  {row['where']}")
+    return 0 if flat else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Goodput against offered load, with and without admission control (app/admission.py).
+
+Drives the ASGI app in-process with the real worker pool. Arrivals are open
+loop, at a fixed rate, so a slow server doesn't slow the clients down:
+- 80% POST /answer on deriv_form problems, with answers written outside the
+  coefficient-map basis (an extra sin(x)^2 + cos(x)^2 - 1, or a stray
+  x sin(x) for the wrong half), so every one needs SymPy or the numeric
+  fallback
+- 20% POST /new-problem for deriv_form, drawn from a ProblemPool with no bank
+
+Capacity is the worker count over the mean SymPy grading time, measured
+here first. Each offered load (a multiple of capacity) runs for --seconds
+with admission off (CALCDUO_ADMIT=0, the old behavior) and on (defaults).
+A request counts toward goodput if it got a 200 within --timeout seconds,
+the client's patience. The bench also reports fast 503s and degraded
+answers: numeric grading, or a pooled problem at another difficulty.
+
+Run from backend/:  python -m bench.overload [--seconds 4] [--timeout 2]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ["CALCDUO_BANK"] = os.path.join(tempfile.gettempdir(), "calcduo-no-bank.bin")  # generate everything
+os.environ.setdefault("CALCDUO_LEADERBOARD", os.devnull)
+
+import httpx
+
+import app.main as main
+from app import offload
+from app.admission import Admission
+from app.calcduo.registry import get_kind
+from app.calcduo.solution import sum_str, term_result, term_str
+from app.pool import ProblemPool
+
+LOADS = (0.5, 1, 2, 4)
+ANSWER_SHARE = 0.8
+
+
+def _answers(n, rng):
+    """(problem, answer) pairs, half right, all outside the basis."""
+    kind = get_kind("deriv_form")
+    out = []
+    for _ in range(n):
+        p = kind.create(rng.choice(kind.difficulties))
+        p.miss()
+        right = sum_str([term_str(*r) for spec in p.terms for r in term_result(spec)])
+        extra = " + sin(x)^2 + cos(x)^2 - 1" if rng.random() < 0.5 else " + x sin(x)"
+        out.append((p, right + extra))
+    return out
+
+
+def capacity(items):
+    t0 = time.perf_counter()
+    for p, a in items[:40]:
+        p.check_answer(a)
+    per = (time.perf_counter() - t0) / 40
+    return offload.WORKERS / per, per
+
+
+async def _run(client, items, rate, seconds, timeout, rng):
+    results = []  # (status, latency)
+
+    async def one(path, body):
+        t0 = time.perf_counter()
+        resp = await client.post(path, json=body)
+        results.append((resp.status_code, time.perf_counter() - t0))
+
+    tasks = []
+    start = time.perf_counter()
+    for i in range(int(rate * seconds)):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if rng.random() < ANSWER_SHARE:
+            p, a = rng.choice(items)
+            pid = f"bench-{i}"
+            main.PROBLEMS[pid] = p
+            tasks.append(asyncio.create_task(one("/answer", {"problem_id": pid, "answer": a})))
+        else:
+            body = {"kind": "deriv_form", "difficulty": rng.choice(("easy", "medium", "hard"))}
+            tasks.append(asyncio.create_task(one("/new-problem", body)))
+    await asyncio.gather(*tasks)
+    good = [lat for status, lat in results if status == 200 and lat <= timeout]
+    late = sum(1 for status, lat in results if status == 200 and lat > timeout)
+    shed = sum(1 for status, _ in results if status == 503)
+    return good, late, shed, len(results)
+
+
+async def bench(args):
+    rng = random.Random(0)
+    items = _answers(200, rng)
+    cap, per = capacity(items)
+    print(f"{offload.WORKERS} workers, SymPy grading {per * 1e3:.0f} ms/answer: capacity ~{cap:.0f} answers/s")
+    print(f"{'admission':<10} {'offered/s':>9} {'goodput/s':>9} {'p50 ms':>7} {'p99 ms':>7} "
+          f"{'late':>6} {'503':>6} {'numeric':>8} {'stand-in':>8}")
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # warm every worker (SymPy import and caches)
+        await asyncio.gather(*(offload.grade(p, a) for p, a in items[:offload.WORKERS * 4]))
+        for load in LOADS:
+            rate = cap * load
+            for enabled in (False, True):
+                main.ADMISSION = Admission(enabled=enabled)
+                main.POOL = ProblemPool(size=4)
+                main.POOL.start()
+                await asyncio.sleep(1.0)  # let the pool fill
+                good, late, shed, n = await _run(client, items, rate, args.seconds, args.timeout,
+                                                 random.Random(1))
+                await main.POOL.stop()
+                good.sort()
+                p50 = f"{statistics.median(good) * 1e3:7.0f}" if good else f"{'-':>7}"
+                p99 = f"{good[int(len(good) * 0.99) - 1] * 1e3:7.0f}" if good else f"{'-':>7}"
+                print(f"{'on' if enabled else 'off':<10} {rate:>9.1f} {len(good) / args.seconds:>9.1f} "
+                      f"{p50} {p99} {late / n:>6.0%} {shed / n:>6.0%} "
+                      f"{main.ADMISSION.degraded['numeric']:>8} {main.POOL.stand_ins:>8}")
+    offload.shutdown()
+
+
+def main_():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=4.0, help="length of each run")
+    ap.add_argument("--timeout", type=float, default=2.0, help="client patience; later 200s don't count")
+    asyncio.run(bench(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,123 @@
+"""
+Function plots (calcduo/plot.py): sampling cost, downsampling error and the
+render cache.
+
+The corpus is random deriv_form problems at every difficulty, plus the
+polynomial kinds. The bench runs:
+1. sampling: f and f' over the plot window. It compares three ways:
+   - SymPy evalf point by point (timed on a few points, scaled to DENSE)
+   - lambdify of f and f' with NumPy, the usual way to get a vectorized function
+   - plot's evaluation of the term specs, with no SymPy at all, alone and
+     as plot.sample (with the outlier cut and LTTB to 400 points)
+2. downsampling: each dense curve cut to P points by LTTB and by a plain
+   stride. The error is the largest gap between the dense curve and the
+   polyline through the kept points, as a share of the curve's range.
+3. render: the first (uncached) and repeat render() per problem, and the
+   payload size of the json and f32 formats.
+
+Run from backend/:  python -m bench.plot_sampling [n_problems] [points]
+"""
+import random
+import sys
+import time
+
+import numpy as np
+import sympy as sp
+
+from app.calcduo import plot
+from app.calcduo.problems.sympy_deriv_form import x
+from app.calcduo.registry import all_kinds, get_kind
+
+EVALF_POINTS = 16
+
+
+def _problems(n, rng):
+    symbolic = get_kind("deriv_form")
+    poly = [k for k in all_kinds() if k.fast_path]
+    out = [symbolic.create(symbolic.difficulties[i % len(symbolic.difficulties)]) for i in range(n)]
+    for kind in poly:
+        out += [kind.create(rng.choice(kind.difficulties)) for _ in range(n // 4)]
+    return out
+
+
+def _sampling(problems):
+    symbolic = [p for p in problems if hasattr(p, "terms")]
+    t_evalf = t_lambdify = t_specs = t_sample = 0.0
+    for p in symbolic:
+        spec, (lo, hi) = plot.plot_spec(p)
+        grid = np.linspace(lo, hi, EVALF_POINTS)
+        t0 = time.perf_counter()
+        for v in grid:
+            complex(p.f.subs(x, v).evalf()), complex(p.fprime.subs(x, v).evalf())
+        t_evalf += (time.perf_counter() - t0) * plot.DENSE / EVALF_POINTS
+        t0 = time.perf_counter()
+        X = np.linspace(lo, hi, plot.DENSE)
+        with np.errstate(all="ignore"):
+            sp.lambdify(x, p.f, "numpy")(X), sp.lambdify(x, p.fprime, "numpy")(X)
+        t_lambdify += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        plot._curves(spec, np.linspace(lo, hi, plot.DENSE))
+        t_specs += time.perf_counter() - t0
+        t0 = time.perf_counter()
+        plot.sample(spec, (lo, hi), 400)
+        t_sample += time.perf_counter() - t0
+    n = len(symbolic)
+    print(f"sampling : f and f' at {plot.DENSE} points, {n} deriv_form problems")
+    print(f"  evalf per point   {t_evalf / n * 1e3:9.1f} ms/problem (scaled from {EVALF_POINTS} points)")
+    print(f"  lambdify + numpy  {t_lambdify / n * 1e3:9.1f} ms/problem")
+    print(f"  term specs        {t_specs / n * 1e3:9.1f} ms/problem")
+    print(f"  plot.sample       {t_sample / n * 1e3:9.1f} ms/problem (with the cut and LTTB)")
+
+
+def _error(x, y, keep):
+    """Largest |dense - polyline through keep| over the curve, as a share of its range."""
+    line = np.interp(x, x[keep], y[keep])
+    span = max(float(np.ptp(y)), 1e-9)
+    return float(np.max(np.abs(line - y))) / span
+
+
+def _downsampling(problems, points):
+    errors = {"lttb": [], "stride": []}
+    for p in problems:
+        spec, window = plot.plot_spec(p)
+        X = np.linspace(*window, plot.DENSE)
+        for y in plot._curves(spec, X):
+            y = plot._cut(y)
+            ok = np.isfinite(y)
+            if not ok.all():  # one run per curve keeps the comparison plain
+                continue
+            errors["lttb"].append(_error(X, y, plot.lttb(X, y, points)))
+            errors["stride"].append(_error(X, y, np.linspace(0, len(X) - 1, points).astype(np.intp)))
+    print(f"downsample: {plot.DENSE} -> {points} points, {len(errors['lttb'])} unbroken curves, "
+          f"max error as a share of the curve's range")
+    for name, errs in errors.items():
+        errs = np.array(errs)
+        print(f"  {name:<7} mean {errs.mean():.4f}  p99 {np.percentile(errs, 99):.4f}  max {errs.max():.4f}")
+
+
+def _render(problems, points):
+    plot.render.cache_clear()
+    specs = [plot.plot_spec(p) for p in problems]
+    for fmt in ("json", "f32"):
+        t0 = time.perf_counter()
+        sizes = [len(plot.render(spec, window, points, fmt)) for spec, window in specs]
+        first = (time.perf_counter() - t0) / len(specs)
+        t0 = time.perf_counter()
+        for spec, window in specs:
+            plot.render(spec, window, points, fmt)
+        repeat = (time.perf_counter() - t0) / len(specs)
+        print(f"render {fmt:<4}: first {first * 1e3:.2f} ms, repeat {repeat * 1e6:.1f} us, "
+              f"{np.mean(sizes) / 1024:.1f} KiB/plot")
+
+
+def main(n=60, points=400):
+    rng = random.Random(0)
+    random.seed(0)
+    problems = _problems(n, rng)
+    _sampling(problems)
+    _downsampling(problems, points)
+    _render(problems, points)
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,65 @@
+"""
+Problem-bank benchmark: build time and size, open time, and the cost of a
+draw against generating the problem at runtime.
+
+Builds a bank with N entries per bucket into a temp file (or uses an existing
+bank given with --bank), then times ProblemBank.open(), draw() + prompt() per
+kind, and kind.create() + prompt() for comparison.
+
+Run from backend/:  python -m bench.problem_bank [--per-bucket 40] [--bank path]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app.calcduo.bank import ProblemBank, build
+from app.calcduo.registry import all_kinds
+
+
+def _per_call(fn, n):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--per-bucket", type=int, default=40)
+    ap.add_argument("--bank")
+    args = ap.parse_args()
+
+    path = args.bank
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "bank.bin")
+        t0 = time.perf_counter()
+        counts = build(path, args.per_bucket)
+        print(f"build: {sum(counts.values())} entries in {time.perf_counter() - t0:.1f} s, "
+              f"{os.path.getsize(path) / 1024:.0f} KiB")
+
+    t0 = time.perf_counter()
+    bank = ProblemBank(path)
+    print(f"open:  {(time.perf_counter() - t0) * 1e6:.0f} us for {len(bank)} entries\n")
+
+    rng = random.Random(0)
+    print(f"{'bucket':<22} {'draw us':>9} {'create us':>10} {'speedup':>8}")
+    for kind in all_kinds():
+        for d in kind.difficulties:
+            if not bank.has(kind.key, d):
+                continue
+            draw = _per_call(lambda: bank.draw(kind.key, d, rng).prompt(), 2000)
+            n = 2000 if kind.fast_path else 5
+            create = _per_call(lambda: kind.create(d).prompt(), n)
+            print(f"{kind.key + '/' + d:<22} {draw * 1e6:>9.1f} {create * 1e6:>10.1f} {create / draw:>7.0f}x")
+
+    # a banked symbolic problem stays SymPy-free until it is graded
+    p = bank.draw("deriv_form", "easy", rng) if bank.has("deriv_form", "easy") else None
+    if p is not None:
+        print(f"\ndrawn deriv_form built f(x) yet: {hasattr(p, '_f')}")
+    bank.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Memory / codec benchmark for live problems.
+
+Compares, per kind:
+  - slotted problem objects with array coefficients (what the engine keeps now)
+  - the previous layout: a plain __dict__ object with list coefficients
+  - the compact binary encoding from calcduo.codec
+and times decode() so we know what rebuilding a stored problem costs.
+
+Run from backend/:  python -m bench.problem_memory [N]
+"""
+import random
+import sys
+import timeit
+import tracemalloc
+
+from app.calcduo import codec
+from app.calcduo.registry import all_kinds
+
+
+class _DictProblem:
+    """Stand-in for the pre-__slots__ problem objects (attributes in __dict__)."""
+
+
+def _as_dict_object(p):
+    obj = _DictProblem()
+    for cls in type(p).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            val = getattr(p, name)
+            if hasattr(val, "typecode"):  # array -> list, like before
+                val = list(val)
+            setattr(obj, name, val)
+    return obj
+
+
+def _measure(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    keep = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(s.size_diff for s in after.compare_to(before, "filename"))
+    return keep, size
+
+
+def main(n=20_000):
+    random.seed(0)
+    print(f"{'kind':<12} {'dict obj B':>11} {'slots obj B':>12} {'encoded B':>10} {'decode us':>10}")
+    for kind in all_kinds():
+        # Symbolic kinds are slow to generate; sample fewer and scale
+        count = n if kind.fast_path else max(200, n // 100)
+        problems = [kind.create(random.choice(kind.difficulties)) for _ in range(count)]
+
+        [kind.load(kind.dump(p)) for p in problems]  # warm SymPy / decode caches
+
+        _, slots_size = _measure(lambda: [kind.load(kind.dump(p)) for p in problems])
+        _, dict_size = _measure(lambda: [_as_dict_object(kind.load(kind.dump(p))) for p in problems])
+        blobs, enc_size = _measure(lambda: [codec.dumps(p) for p in problems])
+
+        sample = blobs[: min(len(blobs), 1000)]
+        t = timeit.timeit(lambda: [codec.loads(b) for b in sample], number=3)
+        decode_us = t / (3 * len(sample)) * 1e6
+
+        print(f"{kind.key:<12} {dict_size / count:>11.0f} {slots_size / count:>12.0f} "
+              f"{enc_size / count:>10.0f} {decode_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
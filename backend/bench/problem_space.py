@@ -0,0 +1,65 @@
+"""
+Problem-space saturation: how often each kind/difficulty repeats and how big
+its space looks, plus what a repeat check costs.
+
+Generates N problems per (kind, difficulty) straight from the generators,
+feeds them to a FrequencyIndex, then prints its report and the chance that a
+9-problem run (3 stages x 3, no dedup) repeats a problem, for a uniform
+space of the estimated size.
+
+Run from backend/:  python -m bench.problem_space [n_per_bucket]
+"""
+import random
+import sys
+import time
+
+from app.calcduo.config import PROBLEMS_PER_STAGE
+from app.calcduo.dedup import FrequencyIndex, SeenSet, fresh, problem_key
+from app.calcduo.registry import all_kinds
+
+
+def _run_repeat_chance(space, run_len):
+    """Birthday bound: P(some repeat among run_len draws from `space` problems)."""
+    p_unique = 1.0
+    for i in range(run_len):
+        p_unique *= max(0.0, 1 - i / space)
+    return 1 - p_unique
+
+
+def main(n=2000):
+    random.seed(0)
+    index = FrequencyIndex()
+    samples = {}
+    for kind in all_kinds():
+        for d in kind.difficulties:
+            count = n if kind.fast_path else max(1, n // 50)  # SymPy kinds take ~0.1 s each
+            problems = [kind.create(d) for _ in range(count)]
+            for p in problems:
+                index.record(p)
+            samples[f"{kind.key}/{d}"] = problems
+
+    run_len = 3 * PROBLEMS_PER_STAGE
+    print(f"{'bucket':<22} {'gen':>6} {'distinct':>8} {'repeat':>7} {'est space':>10} {'saturation':>10} "
+          f"{'run w/ repeat':>13}")
+    for bucket, row in index.report().items():
+        rate = _run_repeat_chance(max(1, row["est_space"]), run_len)
+        print(f"{bucket:<22} {row['generated']:>6} {row['distinct']:>8} {row['repeat_rate']:>7.1%} "
+              f"{row['est_space']:>10} {row['saturation']:>10.1%} {rate:>13.1%}")
+
+    # cost of the checks on the hot path
+    problems = samples["limit/easy"]
+    t0 = time.perf_counter()
+    for p in problems:
+        problem_key(p)
+    t_key = (time.perf_counter() - t0) / len(problems)
+    seen = SeenSet()
+    it = iter(problems * 10)
+    t0 = time.perf_counter()
+    for _ in range(len(problems)):
+        fresh(lambda: next(it), seen)
+    t_fresh = (time.perf_counter() - t0) / len(problems)
+    print(f"\nproblem_key {t_key * 1e6:.2f} us, fresh() with a full SeenSet {t_fresh * 1e6:.2f} us per problem")
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,74 @@
+"""
+Cost of the profiling middleware per request, and what a profile looks like.
+
+Drives POST /answer (a fast-path limit problem) in-process through the ASGI
+app. Runs are:
+- the app as shipped with profiling off, so no middleware
+- ProfilingMiddleware at rate 0 (installed, never sampling)
+- ProfilingMiddleware at 1%, 10% and 100%
+Each run reports us per request. The profiler is then run over some
+symbolic (deriv_form) grading, inline here with no worker pool, to print
+the hottest functions and the size of the collapsed-stack output.
+
+Needs httpx.  Run from backend/:  python -m bench.profiling_overhead [n_requests]
+"""
+import asyncio
+import os
+import sys
+import time
+
+os.environ.setdefault("CALCDUO_LEADERBOARD", os.devnull)
+
+import httpx
+
+import app.main as main
+from app import profiling
+from app.calcduo.registry import get_kind
+
+
+async def _drive(asgi_app, n, pid):
+    transport = httpx.ASGITransport(app=asgi_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        body = {"problem_id": pid, "answer": "3"}
+        for _ in range(50):  # warm up
+            await client.post("/answer", json=body)
+        t0 = time.perf_counter()
+        for _ in range(n):
+            await client.post("/answer", json=body)
+        return (time.perf_counter() - t0) / n
+
+
+def main_(n=3000):
+    problem = get_kind("limit").create("easy")
+    main.PROBLEMS["bench"] = problem
+    profiling.ENABLED = True  # as if CALCDUO_PROFILE_RATE were set; tag() and offload look at it
+
+    base = asyncio.run(_drive(main.app, n, "bench"))
+    print(f"{'no middleware':<24} {base * 1e6:8.1f} us/request")
+    for rate in (0.0, 0.01, 0.1, 1.0):
+        prof = profiling.Profiler(rate)
+        wrapped = profiling.ProfilingMiddleware(main.app, prof)
+        per = asyncio.run(_drive(wrapped, n, "bench"))
+        print(f"{'rate ' + format(rate, '.0%'):<24} {per * 1e6:8.1f} us/request "
+              f"({(per - base) * 1e6:+.1f}), {sum(prof.samples.values())} sampled")
+
+    # what the dump shows for symbolic grading (run inline: no worker pool in this bench)
+    prof = profiling.Profiler(1.0)
+    kind = get_kind("deriv_form")
+    for _ in range(5):
+        p = kind.create("easy")
+        sample = profiling.Sample("/answer")
+        sample.kind = kind.key
+        _, stats = profiling.run_profiled(p.check_answer, "3*x**2 + cos(x)")
+        sample.worker_stats.append(stats)
+        prof.add(sample)
+    summary = prof.summary(top=8)["keys"]["answer deriv_form"]
+    print(f"\nanswer deriv_form: {summary['samples']} samples, {summary['total_s']:.3f} s CPU")
+    for row in summary["top"]:
+        print(f"  {row['cumtime']:8.4f} s cum  {row['calls']:>7} calls  {row['function']}")
+    folded = prof.folded("answer deriv_form")
+    print(f"collapsed stacks: {len(folded.splitlines())} lines, {len(folded) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main_(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,81 @@
+"""
+Review-queue benchmark: 100k players x 20 kinds.
+
+Fills the queue with misses, then times record() (mixed hits and misses on
+due reviews) and next_due(), plus memory and save/load of the compact store.
+
+Run from backend/:  python -m bench.review_queue [players] [kinds]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from app.calcduo.engine.review import FIRST_INTERVAL, ReviewScheduler
+
+
+def main(n_players=100_000, n_kinds=20):
+    rng = random.Random(0)
+    kinds = [f"kind{i}" for i in range(n_kinds)]
+    players = [f"p{i}" for i in range(n_players)]
+    diffs = ("easy", "medium", "hard")
+
+    tracemalloc.start()
+    q = ReviewScheduler(kinds)
+    now = 0
+    for p in players:  # every player misses about a third of the kinds
+        for k in rng.sample(kinds, n_kinds // 3):
+            q.record(p, k, rng.choice(diffs), False, now=now)
+    mem, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    slots = n_players * n_kinds
+
+    now += FIRST_INTERVAL  # everything is due
+    n_ops = 500_000
+    sample = [(rng.choice(players), rng.choice(kinds), rng.random() < 0.8) for _ in range(n_ops)]
+    t0 = time.perf_counter()
+    for p, k, ok in sample:
+        q.record(p, k, "medium", ok, now=now)
+    t_record = time.perf_counter() - t0
+
+    lookups = [rng.choice(players) for _ in range(n_ops)]
+    t0 = time.perf_counter()
+    found = sum(q.next_due(p, now=now + 3600) is not None for p in lookups)
+    t_next = time.perf_counter() - t0
+
+    # Review loop: answer whatever is due until the sample player has nothing left
+    t0 = time.perf_counter()
+    served = 0
+    for p in players[:10_000]:
+        for _ in range(n_kinds):
+            due = q.next_due(p, now=now + 86400)
+            if due is None:
+                break
+            q.record(p, due[0], due[1], True, now=now + 86400)
+            served += 1
+    t_loop = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "reviews.bin")
+        t0 = time.perf_counter()
+        q.save(path)
+        t_save = time.perf_counter() - t0
+        size = os.path.getsize(path)
+        t0 = time.perf_counter()
+        q2 = ReviewScheduler.load(path)
+        t_load = time.perf_counter() - t0
+        assert q2.next_due(players[-1], now=now + 10**7) == q.next_due(players[-1], now=now + 10**7)
+
+    print(f"players x kinds       : {n_players:,} x {n_kinds}")
+    print(f"memory                : {mem / 2**20:.1f} MiB ({mem / slots:.1f} B per player-kind slot)")
+    print(f"record()              : {n_ops / t_record:,.0f}/s ({t_record / n_ops * 1e6:.2f} us)")
+    print(f"next_due()            : {n_ops / t_next:,.0f}/s ({t_next / n_ops * 1e6:.2f} us, {found:,} due)")
+    print(f"due -> answer loop    : {served / t_loop:,.0f} reviews/s")
+    print(f"store on disk         : {size / 2**20:.1f} MiB, save {t_save * 1e3:.0f} ms, load {t_load * 1e3:.0f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
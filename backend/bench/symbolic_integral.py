@@ -0,0 +1,71 @@
+"""
+Reference values for def_int_form (calcduo/quad.py) against SymPy.
+
+The corpus is random def_int_form problems at every difficulty. Each
+integral is computed four ways:
+- sp.integrate(f, (x, a, b)).evalf(30): the symbolic route, on the first
+  N_SYMPY problems only (it is slow)
+- quad.integrate: Gauss-Legendre with the rule picked from the error bound
+- quad.closed_form: the term-by-term antiderivatives
+- problem decode, which recomputes the value by quadrature
+The bench reports the time per integral, and the rules picked. It also
+checks the bound: on every problem with a SymPy value, the quadrature error
+must be within its bound, and every bound must be under QUAD_TOL.
+
+Run from backend/:  python -m bench.symbolic_integral [n_problems] [n_sympy]
+"""
+import random
+import sys
+import time
+from collections import Counter
+
+import sympy as sp
+
+from app.calcduo.problems.quad_def_int import QUAD_TOL
+from app.calcduo.problems.sympy_deriv_form import _expr_from_terms, x
+from app.calcduo.quad import closed_form, integrate, pick_rule
+from app.calcduo.registry import get_kind
+
+
+def _timed(fn, items):
+    t0 = time.perf_counter()
+    out = [fn(p) for p in items]
+    return out, (time.perf_counter() - t0) / len(items)
+
+
+def main(n=3000, n_sympy=30):
+    random.seed(0)
+    kind = get_kind("def_int_form")
+    problems = [kind.create(kind.difficulties[i % 3]) for i in range(n)]
+    payloads = [kind.dump(p) for p in problems]
+
+    quad, t_quad = _timed(lambda p: integrate(p.terms, p.a, p.b, QUAD_TOL), problems)
+    closed, t_closed = _timed(lambda p: closed_form(p.terms, p.a, p.b), problems)
+    _, t_decode = _timed(kind.load, payloads)
+    rules = Counter(n * m for n, m in (pick_rule(p.terms, p.a, p.b, QUAD_TOL / 2) for p in problems))
+
+    sample = problems[:n_sympy]
+    exprs = [_expr_from_terms(p.terms) for p in sample]  # built outside the timing
+    t0 = time.perf_counter()
+    exact = [float(sp.integrate(f, (x, p.a, p.b)).evalf(30)) for f, p in zip(exprs, sample)]
+    t_sympy = (time.perf_counter() - t0) / len(sample)
+
+    errors = [abs(v - e) for (v, _), e in zip(quad, exact)]
+    within = sum(err <= bound for err, (_, bound) in zip(errors, quad))
+    max_bound = max(bound for _, bound in quad)
+    closed_gap = max(abs(v - c) for (v, _), c in zip(quad, closed))
+
+    print(f"{n} problems, {len(sample)} with a SymPy value; QUAD_TOL {QUAD_TOL:g}")
+    print(f"  sp.integrate + evalf {t_sympy * 1e3:10.1f} ms/integral")
+    print(f"  quad.integrate       {t_quad * 1e6:10.1f} us/integral  ({t_sympy / t_quad:.0f}x)")
+    print(f"  quad.closed_form     {t_closed * 1e6:10.1f} us/integral")
+    print(f"  decode (quadrature)  {t_decode * 1e6:10.1f} us/problem")
+    print("nodes per integral: " + ", ".join(f"{k}: {v}" for k, v in sorted(rules.items())))
+    print(f"error vs SymPy: max {max(errors):.2e}, within the bound on {within}/{len(sample)}")
+    print(f"bound: max {max_bound:.2e} (<= QUAD_TOL: {max_bound <= QUAD_TOL}); "
+          f"max |quad - closed form| over all {n}: {closed_gap:.2e}")
+    return 0 if within == len(sample) and max_bound <= QUAD_TOL else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:3])))
@@ -0,0 +1,142 @@
+"""
+Load test for tournament mode: N players in one tournament on one machine.
+
+Starts the API with uvicorn (one process) and creates a tournament over HTTP.
+It then connects N players over /ws/tournament/{id}, with a gentle ramp.
+Each player works through the set with a think time between answers, and
+answers correctly with probability --skill. The bench rebuilds the seeded set
+locally, so it knows the answers and can check that every prompt it receives
+matches. Standings frames pushed by the server are counted per player.
+
+Reports answer round-trip latency, standings pushes per player per second,
+prompt mismatches, and the server's CPU use (a single core also runs this
+client, so on small boxes the two compete).
+
+Needs the `websockets` package.
+Run from backend/:  python -m bench.tournament_load --players 1000 --seconds 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+import websockets
+
+from app.calcduo.engine.tournament import problem_set
+from bench.ws_sessions import _cpu_seconds
+
+
+def _create(port, rounds, seed, seconds, kinds):
+    body = json.dumps({"rounds": rounds, "seed": seed, "seconds": seconds, "kinds": kinds}).encode()
+    req = urllib.request.Request(f"http://127.0.0.1:{port}/tournaments", data=body,
+                                 headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req) as resp:
+        return json.loads(resp.read())
+
+
+async def _player(i, url, problems, args, stats):
+    rng = random.Random(i)
+    try:
+        async with websockets.connect(url, max_queue=None) as ws:
+            await ws.send(json.dumps({"type": "join", "player": f"p{i:04d}"}))
+            stats["joined"] += 1
+            sent_at = None
+            async for raw in ws:
+                msg = json.loads(raw)
+                kind = msg["type"]
+                if kind == "standings":
+                    stats["standings"] += 1
+                elif kind == "result":
+                    stats["latencies"].append(time.perf_counter() - sent_at)
+                    stats["correct"] += msg["ok"]
+                elif kind == "problem":
+                    p = problems[msg["index"]]
+                    stats["mismatch"] += msg["prompt"] != p.prompt()
+                    await asyncio.sleep(rng.uniform(0.5, 1.5) * args.think)
+                    answer = str(p.value) if rng.random() < args.skill else "0.123"
+                    sent_at = time.perf_counter()
+                    await ws.send(json.dumps({"type": "answer", "answer": answer}))
+                elif kind == "end":
+                    stats["finished"] += 1
+                    stats["final"].append(msg["state"])
+                    return
+                else:
+                    stats["errors"] += 1
+    except websockets.ConnectionClosedOK:
+        stats["bell"] += 1  # time ran out while this player was thinking; the end frame went unread
+    except (OSError, websockets.WebSocketException):
+        stats["dropped"] += 1
+
+
+async def _run(args, tid, problems):
+    url = f"ws://127.0.0.1:{args.port}/ws/tournament/{tid}"
+    stats = {"joined": 0, "finished": 0, "bell": 0, "dropped": 0, "errors": 0, "mismatch": 0,
+             "standings": 0, "correct": 0, "latencies": [], "final": []}
+    players = []
+    t0 = time.monotonic()
+    for i in range(args.players):
+        players.append(asyncio.create_task(_player(i, url, problems, args, stats)))
+        await asyncio.sleep(args.ramp / args.players)
+    await asyncio.gather(*players)
+    return stats, time.monotonic() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--players", type=int, default=1000)
+    ap.add_argument("--rounds", type=int, default=10)
+    ap.add_argument("--seconds", type=float, default=30, help="tournament time limit")
+    ap.add_argument("--think", type=float, default=2.0, help="mean seconds per answer")
+    ap.add_argument("--skill", type=float, default=0.7, help="chance a player answers right")
+    ap.add_argument("--ramp", type=float, default=3.0, help="seconds to connect everyone")
+    ap.add_argument("--kinds", nargs="*", default=["limit", "deriv_point", "def_int"])
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--port", type=int, default=8766)
+    args = ap.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, 4 * args.players + 256)), hard))
+
+    env = dict(os.environ, CALCDUO_LEADERBOARD=os.devnull)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port),
+         "--log-level", "warning", "--ws-max-queue", "64"],
+        env=env,
+        start_new_session=True,
+    )
+    try:
+        time.sleep(5)
+        info = _create(args.port, args.rounds, args.seed, args.seconds, args.kinds)
+        problems = problem_set(info["seed"], [(p["kind"], p["difficulty"]) for p in info["plan"]])
+        cpu0 = _cpu_seconds(server.pid)
+        stats, wall = asyncio.run(_run(args, info["id"], problems))
+        cpu = _cpu_seconds(server.pid) - cpu0
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait()
+
+    lat = sorted(stats["latencies"]) or [0.0]
+    answers = len(stats["latencies"])
+    ranks = sorted(s["rank"] for s in stats["final"])
+    print(f"players joined / finished         : {stats['joined']} / {stats['finished']} "
+          f"(+{stats['bell']} cut off by the time limit, {stats['dropped']} dropped)")
+    print(f"answers                           : {answers} ({answers / wall:.0f}/s, {stats['correct']} right)")
+    print(f"answer RTT p50/p99                : {statistics.median(lat) * 1e3:.2f} / "
+          f"{lat[int(len(lat) * 0.99) - 1] * 1e3:.2f} ms")
+    print(f"standings pushes per player       : {stats['standings'] / max(1, stats['joined']) / wall:.2f}/s")
+    print(f"prompt mismatches / errors        : {stats['mismatch']} / {stats['errors']}")
+    if ranks:
+        print(f"final ranks                       : best {ranks[0]}, worst {ranks[-1]} of {len(ranks)}")
+    print(f"server CPU                        : {cpu / wall:.2f} cores over {wall:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
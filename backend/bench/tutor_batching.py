@@ -0,0 +1,110 @@
+"""
+Tutor benchmark: diagnosis accuracy on injected slips, and latency /
+throughput of the micro-batched service against one-request-per-call.
+
+1. Accuracy: for N random deriv_form problems, write a wrong answer with one
+   slip from the mutation library and check the tutor names it. Some slips
+   coincide (e.g. e^(x+b) left undifferentiated is also its derivative), so
+   "explained" counts any diagnosis of a wrong answer.
+2. Load: C concurrent clients call TutorBatcher.explain() back to back for a
+   few seconds, unbatched (batch of 1, no window) and batched (defaults);
+   reports answers/s, p50/p99 latency, mean batch size and the targets.
+
+Run from backend/:  python -m bench.tutor_batching [problems] [clients] [seconds]
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+from app import offload
+from app.calcduo.problems.sympy_deriv_form import SymPyDerivativeFormProblem
+from app.calcduo.solution import spec_str, sum_str, term_result, term_str
+from app.calcduo.tutor import _mutations, diagnose_batch
+from app.tutor import TARGET_P50_MS, TARGET_P99_MS, TutorBatcher
+
+
+def _slipped_answer(problem, rng):
+    """A wrong answer with one slip on one term, and the slip's name."""
+    i = rng.randrange(len(problem.terms))
+    error, wrong = rng.choice(_mutations(problem.terms[i]))
+    parts = []
+    for j, spec in enumerate(problem.terms):
+        if j != i:
+            parts += [term_str(*r) for r in term_result(spec)]
+        elif error == "undifferentiated":
+            parts.append(spec_str(spec))
+        else:
+            parts += [term_str(*r) for r in wrong]
+    return (sum_str(parts) if parts else "0").replace("ln(", "log("), error
+
+
+def accuracy(items, errors):
+    t0 = time.perf_counter()
+    results = diagnose_batch([(p.terms, a) for p, a in items])
+    cold = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    diagnose_batch([(p.terms, a) for p, a in items])
+    warm = time.perf_counter() - t0
+    named = sum(1 for r, e in zip(results, errors) if r["errors"] and r["errors"][0]["error"] == e)
+    explained = sum(1 for r in results if r["diagnosed"])
+    n = len(items)
+    print(f"accuracy ({n} answers)  : slip named {named / n:.1%}, explained {explained / n:.1%}")
+    print(f"one batch of {n}        : cold {cold * 1000:.0f} ms (parse+compile), warm {warm * 1000:.1f} ms "
+          f"({warm / n * 1e6:.0f} us/answer)")
+
+
+async def _load(items, clients, seconds, batcher):
+    latencies = []
+    rng = random.Random(1)
+
+    async def client():
+        while time.monotonic() < deadline:
+            problem, answer = rng.choice(items)
+            t0 = time.perf_counter()
+            await batcher.explain(problem, answer)
+            latencies.append(time.perf_counter() - t0)
+
+    batcher.start()
+    # warm every worker's caches with the whole set
+    for _ in range(offload.WORKERS):
+        await asyncio.gather(*(batcher.explain(p, a) for p, a in items))
+    batcher.batches = batcher.items = 0
+    deadline = time.monotonic() + seconds
+    await asyncio.gather(*(client() for _ in range(clients)))
+    await batcher.stop()
+    return latencies
+
+
+def load(items, clients, seconds):
+    print(f"\n{clients} clients, {seconds}s each, {offload.WORKERS} workers")
+    print(f"{'mode':<10} {'answers/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'batch':>6}  targets p50<{TARGET_P50_MS} p99<{TARGET_P99_MS}")
+    for mode, batcher in (
+        ("unbatched", TutorBatcher(window_ms=0, max_batch=1)),
+        ("batched", TutorBatcher()),
+    ):
+        lat = asyncio.run(_load(items, clients, seconds, batcher))
+        lat.sort()
+        p50 = statistics.median(lat) * 1000
+        p99 = lat[int(len(lat) * 0.99)] * 1000
+        ok = "ok" if p50 < TARGET_P50_MS and p99 < TARGET_P99_MS else "MISSED"
+        print(f"{mode:<10} {len(lat) / seconds:>10.0f} {p50:>8.1f} {p99:>8.1f} "
+              f"{batcher.items / max(1, batcher.batches):>6.1f}  {ok}")
+    offload.shutdown()
+
+
+def main(n_problems=300, clients=64, seconds=5):
+    rng = random.Random(0)
+    items, errors = [], []
+    for _ in range(n_problems):
+        p = SymPyDerivativeFormProblem(rng.choice(["easy", "medium", "hard"]))
+        answer, error = _slipped_answer(p, rng)
+        items.append((p, answer))
+        errors.append(error)
+    accuracy(items, errors)
+    load(items, clients, seconds)
+
+
+if __name__ == "__main__":
+    main(*(int(a) for a in sys.argv[1:4]))
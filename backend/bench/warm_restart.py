@@ -0,0 +1,129 @@
+"""
+Warm restart (app/snapshot.py): snapshot size and save time, time-to-ready
+after a restart, and the cold start it replaces.
+
+The state before the "restart" is N live problems (a quarter deriv_form,
+with their miss feedback built as the workers build it, the rest fast
+kinds) and a full ProblemPool with no bank. The bench:
+1. encodes and writes a snapshot, the work of one periodic or shutdown save
+2. restores it into a fresh store and pool, and reports time-to-ready: the
+   mmap, the index pass over the record headers and decoding the pooled
+   problems
+3. looks every live problem up once, the per-problem decode on first
+   /answer, and checks that each matches the original (codec bytes and
+   feedback)
+4. for comparison, starts an empty pool and times the worker refill until
+   every bucket is full: the old time-to-ready, with every live problem lost
+
+Run from backend/:  python -m bench.warm_restart [n_live]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ["CALCDUO_BANK"] = os.path.join(tempfile.gettempdir(), "calcduo-no-bank.bin")  # generate everything
+
+from app import offload
+from app.calcduo.registry import all_kinds, get_kind
+from app.pool import ProblemPool
+from app.snapshot import _HEADER, LiveProblems, Snapshotter, encode, write
+
+SYMBOLIC_SHARE = 0.25
+N_SYMBOLIC = 60  # distinct deriv_form problems built here (SymPy); the store holds copies
+
+
+def _copy(problem):
+    kind = get_kind(problem.kind)
+    copy = kind.load(kind.dump(problem))
+    copy._miss = problem.miss()
+    return copy
+
+
+def _state(n, rng):
+    symbolic = get_kind("deriv_form")
+    fast = [k for k in all_kinds() if k.fast_path]
+    originals = [symbolic.create(rng.choice(symbolic.difficulties)) for _ in range(N_SYMBOLIC)]
+    problems = LiveProblems()
+    for i in range(n):
+        if rng.random() < SYMBOLIC_SHARE:
+            p = _copy(rng.choice(originals))
+        else:
+            kind = rng.choice(fast)
+            p = kind.create(rng.choice(kind.difficulties))
+            p.miss()
+        problems[f"{i:08x}-bench"] = p
+    return problems, originals
+
+
+async def bench(n):
+    rng = random.Random(0)
+    t0 = time.perf_counter()
+    problems, originals = _state(n, rng)
+    print(f"{n} live problems built in {time.perf_counter() - t0:.1f} s")
+    path = os.path.join(tempfile.mkdtemp(), "snapshot.bin")
+
+    pool = ProblemPool()
+    pool.start()
+    await pool.stop()  # no refill: filled by hand below
+    for p in originals * 2:
+        pool.put(_copy(p))
+    print(f"pool: {sum(pool.levels().values())} problems in {len(pool.levels())} buckets")
+
+    t0 = time.perf_counter()
+    data = encode(problems, pool)
+    t_encode = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    write(path, data)
+    t_write = time.perf_counter() - t0
+    print(f"save     : {len(data) / 1024:.0f} KiB ({len(data) / n:.0f} B/problem), "
+          f"encode {t_encode * 1e3:.1f} ms, write {t_write * 1e3:.1f} ms")
+
+    # --- warm restart ---
+    restored = LiveProblems()
+    new_pool = ProblemPool()
+    new_pool.start()
+    await new_pool.stop()
+    snapshots = Snapshotter(restored, new_pool, path, every=0)
+    snapshots.restore()
+    print(f"restore  : time-to-ready {snapshots.stats['ready_ms']:.1f} ms, "
+          f"{snapshots.stats['restored_live']} live indexed, {snapshots.stats['restored_pooled']} pooled")
+
+    pids = list(problems)
+    t0 = time.perf_counter()
+    for pid in pids:
+        restored.get(pid)
+    t_lookup = time.perf_counter() - t0
+    bad = 0
+    for pid in pids:
+        a, b = problems[pid], restored.get(pid)
+        kind = get_kind(a.kind)
+        if kind.dump(a) != kind.dump(b) or a.miss() != b.miss():
+            bad += 1
+    print(f"lookups  : first lookup {t_lookup / n * 1e6:.1f} us/problem (decode), "
+          f"{bad} mismatches")
+
+    t0 = time.perf_counter()
+    data2 = encode(restored, new_pool)
+    print(f"re-save  : encode {(time.perf_counter() - t0) * 1e3:.1f} ms after the restore, "
+          f"identical records: {data2[_HEADER.size:] == data[_HEADER.size:]}")
+
+    # --- cold start, for comparison ---
+    cold = ProblemPool()
+    t0 = time.perf_counter()
+    cold.start()
+    target = sum(q.maxsize for q in cold._queues.values())
+    while sum(cold.levels().values()) < target:
+        await asyncio.sleep(0.05)
+    t_cold = time.perf_counter() - t0
+    await cold.stop()
+    offload.shutdown()
+    print(f"cold     : {offload.WORKERS} workers refill {target} pooled problems in {t_cold:.1f} s; "
+          f"{n} live problems expired")
+    return bad
+
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(bench(*(int(a) for a in sys.argv[1:2]))) else 0)
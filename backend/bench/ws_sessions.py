@@ -0,0 +1,111 @@
+"""
+Load generator for the WebSocket session endpoint.
+
+Starts the API with uvicorn (one process), opens N concurrent sessions that
+play start -> problem/answer ... -> end in a loop with a think time between
+answers, and reports answer round-trip latency plus the server's CPU use, from
+which it derives how many concurrent sessions one core sustains.
+
+Needs the `websockets` package.
+Run from backend/:  python -m bench.ws_sessions --sessions 500 --seconds 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+import websockets
+
+CLK_TCK = os.sysconf("SC_CLK_TCK")
+
+
+def _cpu_seconds(pid: int) -> float:
+    """CPU time of pid plus its live children (the offload worker processes)."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    total = (int(fields[11]) + int(fields[12])) / CLK_TCK  # utime + stime
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(c) for c in f.read().split()]
+    except OSError:
+        children = []
+    return total + sum(_cpu_seconds(c) for c in children)
+
+
+async def _player(url, lesson, think, deadline, latencies, counters):
+    while time.monotonic() < deadline:
+        async with websockets.connect(url) as ws:
+            await ws.send(json.dumps({"type": "start", "player": "load", "lesson": lesson, "rounds": 10}))
+            counters["sessions"] += 1
+            while True:
+                msg = json.loads(await ws.recv())
+                if msg["type"] == "end":
+                    break
+                if msg["type"] != "problem":
+                    continue
+                await asyncio.sleep(random.uniform(0.5, 1.5) * think)
+                t0 = time.perf_counter()
+                await ws.send(json.dumps({"type": "answer", "answer": str(random.randint(-5, 5))}))
+                json.loads(await ws.recv())  # result
+                latencies.append(time.perf_counter() - t0)
+                counters["answers"] += 1
+                if time.monotonic() >= deadline:
+                    return
+
+
+async def _run(args):
+    url = f"ws://127.0.0.1:{args.port}/ws/session"
+    latencies, counters = [], {"sessions": 0, "answers": 0}
+    deadline = time.monotonic() + args.seconds
+    players = []
+    for _ in range(args.sessions):  # ramp up gently
+        players.append(asyncio.create_task(
+            _player(url, args.lesson, args.think, deadline, latencies, counters)))
+        await asyncio.sleep(0.002)
+    await asyncio.gather(*players, return_exceptions=True)
+    return latencies, counters
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=200)
+    ap.add_argument("--seconds", type=float, default=15)
+    ap.add_argument("--think", type=float, default=1.0, help="mean seconds between answers")
+    ap.add_argument("--lesson", default="limit", help="kind key or 'practice'")
+    ap.add_argument("--port", type=int, default=8765)
+    args = ap.parse_args()
+
+    env = dict(os.environ, CALCDUO_LEADERBOARD=os.devnull)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env,
+        start_new_session=True,  # own process group, so its offload workers go down with it
+    )
+    try:
+        time.sleep(5)  # let it import, spawn workers and warm the pool
+        cpu0, wall0 = _cpu_seconds(server.pid), time.monotonic()
+        latencies, counters = asyncio.run(_run(args))
+        cpu = _cpu_seconds(server.pid) - cpu0
+        wall = time.monotonic() - wall0
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait()
+
+    cores_used = cpu / wall if wall else 0.0
+    lat = sorted(latencies) or [0.0]
+    print(f"sessions opened     : {counters['sessions']} ({args.sessions} concurrent)")
+    print(f"answers             : {counters['answers']} ({counters['answers'] / wall:.0f}/s)")
+    print(f"answer RTT p50/p99  : {statistics.median(lat) * 1e3:.2f} / {lat[int(len(lat) * 0.99) - 1] * 1e3:.2f} ms")
+    print(f"server CPU          : {cores_used:.2f} cores")
+    if cores_used:
+        print(f"sessions per core   : {args.sessions / cores_used:.0f} (at {args.think:.1f}s think time)")
+
+
+if __name__ == "__main__":
+    main()
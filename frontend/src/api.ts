@@ -4,7 +4,8 @@ import { Platform } from "react-native";
 export const BASE_URL =
   Platform.OS === "android" ? "http://10.0.2.2:8005" : "http://127.0.0.1:8005";
 
-export type NewProblemResp = { problem_id: string | number; prompt: string };
+export type ProblemKind = "limit" | "limit_form" | "deriv_point" | "deriv_form" | "def_int" | "def_int_form";
+export type NewProblemResp = { problem_id: string | number; kind: ProblemKind; prompt: string };
 export type AnswerResp = { ok: boolean; feedback?: string };
 
 async function json<T>(path: string, init?: RequestInit): Promise<T> {
@@ -19,16 +20,152 @@ async function json<T>(path: string, init?: RequestInit): Promise<T> {
   return res.json();
 }
 
-export function newProblem(difficulty = "easy") {
+export function newProblem(difficulty = "easy", kind: ProblemKind = "deriv_form") {
   return json<NewProblemResp>("/new-problem", {
     method: "POST",
-    body: JSON.stringify({ difficulty }),
+    body: JSON.stringify({ difficulty, kind }),
   });
 }
 
-export function submitAnswer(problem_id: string | number, answer: string) {
+export type LeaderboardRow = { player: string; best: number; total: number; plays: number };
+
+export function getLeaderboard(n = 10) {
+  // Server sends an ETag; the platform HTTP cache revalidates with If-None-Match
+  return json<LeaderboardRow[]>(`/leaderboard?n=${n}`);
+}
+
+export function submitAnswer(problem_id: string | number, answer: string, player?: string) {
   return json<AnswerResp>("/answer", {
+    method: "POST",
+    body: JSON.stringify({ problem_id, answer, player }),
+  });
+}
+
+export type AdaptiveProblemResp = NewProblemResp & { difficulty: string };
+
+// Kind and difficulty picked by the server for this player's level; pass the
+// same player to submitAnswer so the rating updates.
+export function nextAdaptiveProblem(player: string) {
+  return json<AdaptiveProblemResp>("/adaptive/next", {
+    method: "POST",
+    body: JSON.stringify({ player }),
+  });
+}
+
+export type StreamedProblem = NewProblemResp & {
+  difficulty: string;
+  index: number;
+  total: number;
+};
+
+/**
+ * Stream a lesson's problems from /lesson/stream (server-sent events).
+ * onProblem fires as each problem arrives, so the first one can be shown
+ * while the rest are still being generated. Returns a function that aborts
+ * the stream.
+ */
+export function streamLesson(
+  kind: ProblemKind,
+  onProblem: (p: StreamedProblem) => void,
+  opts: { difficulty?: string; onDone?: () => void; onError?: (e: Error) => void } = {}
+) {
+  const params = new URLSearchParams({ kind });
+  if (opts.difficulty) params.set("difficulty", opts.difficulty);
+
+  // React Native's fetch doesn't expose a streaming body; XHR progress events do.
+  const xhr = new XMLHttpRequest();
+  let seen = 0;
+
+  const drain = () => {
+    const text = xhr.responseText;
+    let end;
+    while ((end = text.indexOf("\n\n", seen)) !== -1) {
+      const frame = text.slice(seen, end);
+      seen = end + 2;
+      let event = "message";
+      let data = "";
+      for (const line of frame.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      if (event === "problem") onProblem(JSON.parse(data));
+      else if (event === "done") opts.onDone?.();
+      else if (event === "error") opts.onError?.(new Error(JSON.parse(data).detail));
+    }
+  };
+
+  xhr.open("GET", `${BASE_URL}/lesson/stream?${params.toString()}`);
+  xhr.setRequestHeader("Accept", "text/event-stream");
+  xhr.onprogress = drain;
+  xhr.onload = drain;
+  xhr.onerror = () => opts.onError?.(new Error(`stream failed (${xhr.status})`));
+  xhr.send();
+
+  return () => xhr.abort();
+}
+
+export type ReviewItem = { kind: ProblemKind; difficulty: string; due_in: number; misses: number };
+
+export function getReviews(player: string) {
+  return json<ReviewItem[]>(`/review/due?player=${encodeURIComponent(player)}`);
+}
+
+// problem_id is null when nothing is due yet
+export function nextReviewProblem(player: string) {
+  return json<AdaptiveProblemResp | { problem_id: null }>("/review/next", {
+    method: "POST",
+    body: JSON.stringify({ player }),
+  });
+}
+
+export type SolutionFormat = "text" | "latex";
+export type SolutionResp = { problem_id: string; format: SolutionFormat; steps: string[] };
+
+export function getSolution(problem_id: string | number, format: SolutionFormat = "text") {
+  return json<SolutionResp>(`/solution/${encodeURIComponent(String(problem_id))}?format=${format}`);
+}
+
+export type TutorError = { error: string; term: string; expected: string; got: string; message: string };
+export type TutorResp = { diagnosed: boolean; correct: boolean; errors: TutorError[]; message: string };
+
+export function explainAnswer(problem_id: string | number, answer: string) {
+  return json<TutorResp>("/tutor/explain", {
     method: "POST",
     body: JSON.stringify({ problem_id, answer }),
   });
 }
+
+// results[i] is null when items[i]'s problem has expired
+export function gradeBulk(items: { problem_id: string | number; answer: string }[]) {
+  return json<{ results: (boolean | null)[] }>("/grade/bulk", {
+    method: "POST",
+    body: JSON.stringify({ items }),
+  });
+}
+
+export type TournamentInfo = {
+  id: string;
+  seed: number;
+  rounds: number;
+  seconds: number | null;
+  plan: { kind: ProblemKind; difficulty: string }[];
+};
+export type Standings = {
+  id: string;
+  players: number;
+  top: { rank: number; player: string; score: number }[];
+  ends_in: number | null;
+};
+
+export function createTournament(opts: { rounds?: number; seed?: number; seconds?: number; kinds?: ProblemKind[] } = {}) {
+  return json<TournamentInfo>("/tournaments", { method: "POST", body: JSON.stringify(opts) });
+}
+
+export function getStandings(id: string, n = 10) {
+  return json<Standings>(`/tournaments/${encodeURIComponent(id)}?n=${n}`);
+}
+
+// Live play happens over the socket (protocol in backend/app/tournaments.py)
+export function tournamentSocketUrl(id: string) {
+  return `${BASE_URL.replace(/^http/, "ws")}/ws/tournament/${encodeURIComponent(id)}`;
+}